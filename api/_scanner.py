@@ -0,0 +1,501 @@
+import asyncio
+import collections
+import errno
+import ipaddress
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+from urllib.parse import urlparse
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+# Shared by web_server.py's /scan-ports and the serverless api/scan.py. The
+# leading underscore keeps Vercel from deploying this file as a function.
+
+COMMON_PORTS = (21, 22, 23, 25, 53, 80, 110, 143, 443, 465, 587, 993, 995, 3306, 3389, 5432, 6379, 8080, 8443)
+CONNECT_TIMEOUT = 1.0
+# Concurrency starts here, doubles per round until latency rises, then grows additively
+INITIAL_CONCURRENCY = 256
+MIN_CONCURRENCY = 16
+MAX_CONCURRENCY = 4096
+# Connects per second per host (token bucket, bursts up to one second's worth)
+PER_HOST_RATE = 2000.0
+MAX_PORTS = 65535
+# Largest CIDR block accepted as a host list
+MAX_HOSTS = 1024
+# Upper bound on hosts x ports for one request
+MAX_PROBES = 1 << 20
+# Connect latency above this multiple of the fastest one seen means we are
+# queueing in the network or on the target: back off
+LATENCY_TOLERANCE = 2.0
+# Local resource exhaustion: back off and retry the port instead of reporting it
+RETRY_ERRNOS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.EAGAIN, errno.EADDRNOTAVAIL}
+UNREACHABLE_ERRNOS = {errno.EHOSTUNREACH, errno.ENETUNREACH}
+# Seconds between progress lines on a streamed scan
+PROGRESS_INTERVAL = 0.5
+
+ScanResult = collections.namedtuple("ScanResult", "host port state latency_ms")
+
+
+def extract_host(value):
+    """Hostname from a URL, or the value itself if it is not one."""
+    value = value.strip()
+    if "://" not in value:
+        return value
+    return urlparse(value).hostname or value
+
+
+def parse_hosts(spec):
+    """Hosts from "a.com, b.com", URLs, or a CIDR block like 10.0.0.0/28."""
+    items = spec if isinstance(spec, (list, tuple)) else spec.replace(",", " ").split()
+    hosts = []
+    for item in items:
+        item = extract_host(str(item))
+        if not item:
+            continue
+        if "/" in item:
+            network = ipaddress.ip_network(item, strict=False)
+            if network.num_addresses > MAX_HOSTS:
+                raise ValueError(f"{item} has more than {MAX_HOSTS} addresses")
+            addresses = list(network.hosts()) or [network.network_address]
+            hosts.extend(str(a) for a in addresses)
+        else:
+            hosts.append(item)
+    if not hosts:
+        raise ValueError("Host is required")
+    if len(hosts) > MAX_HOSTS:
+        raise ValueError(f"At most {MAX_HOSTS} hosts per scan")
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(hosts))
+
+
+def parse_ports(spec=None):
+    """Ports from "common", "1-1024", "22,80,8000-8100", or a list of ints."""
+    if spec is None or spec == "" or spec == "common":
+        return list(COMMON_PORTS)
+    if isinstance(spec, int):
+        spec = [spec]
+    items = spec if isinstance(spec, (list, tuple)) else spec.replace(" ", "").split(",")
+    ports = []
+    for item in items:
+        if isinstance(item, int):
+            low = high = item
+        elif item == "common":
+            ports.extend(COMMON_PORTS)
+            continue
+        elif "-" in item:
+            low, high = (int(p) for p in item.split("-", 1))
+        else:
+            low = high = int(item)
+        if not 1 <= low <= high <= 65535:
+            raise ValueError(f"Invalid port range: {item}")
+        ports.extend(range(low, high + 1))
+    ports = list(dict.fromkeys(ports))
+    if len(ports) > MAX_PORTS:
+        raise ValueError(f"At most {MAX_PORTS} ports per host")
+    return ports
+
+
+def fd_budget():
+    # Every in-flight connect holds a descriptor; leave room for the rest of the process
+    if resource is None:
+        return MAX_CONCURRENCY
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < MAX_CONCURRENCY + 256:
+        wanted = MAX_CONCURRENCY + 256 if hard == resource.RLIM_INFINITY else min(MAX_CONCURRENCY + 256, hard)
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+            soft = wanted
+        except (ValueError, OSError):
+            pass
+    if soft == resource.RLIM_INFINITY:
+        return MAX_CONCURRENCY
+    return max(MIN_CONCURRENCY, min(MAX_CONCURRENCY, soft - 256))
+
+
+class AdaptiveLimit:
+    """Concurrency limit for in-flight connects, adjusted from connect latency.
+
+    Every answered connect (open or refused) is a latency sample. Once per
+    round (`limit` samples) the smoothed latency is compared with the fastest
+    seen: within LATENCY_TOLERANCE the limit grows (doubling until the first
+    back-off, additively after), above it the limit is cut by a quarter.
+    Timeouts are not counted: firewalls drop probes to closed ports, so they
+    say nothing about load. Local resource errors cut the limit in half.
+    """
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, minimum=MIN_CONCURRENCY, maximum=MAX_CONCURRENCY):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = max(minimum, min(initial, self.maximum))
+        self.in_flight = 0
+        self.min_latency = None
+        self.smoothed = None
+        self.samples = 0
+        self.slow_start = True
+        self.waiters = collections.deque()
+
+    async def acquire(self):
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release() # Slot was handed over as we were cancelled
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        # Slots are handed over directly, so a woken waiter never has to re-check
+        while self.waiters and self.in_flight < self.limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def on_latency(self, latency):
+        if self.min_latency is None or latency < self.min_latency:
+            self.min_latency = latency
+        self.smoothed = latency if self.smoothed is None else self.smoothed + 0.1 * (latency - self.smoothed)
+        self.samples += 1
+        if self.samples < self.limit:
+            return
+        self.samples = 0
+        # A millisecond of slack so loopback's microsecond connects don't look congested
+        if self.smoothed > self.min_latency * LATENCY_TOLERANCE + 0.001:
+            self._decrease(0.75)
+        else:
+            self._increase()
+
+    def on_resource_error(self):
+        self._decrease(0.5)
+
+    def _increase(self):
+        step = self.limit if self.slow_start else max(1, self.limit // 16)
+        self.limit = min(self.maximum, self.limit + step)
+        self._wake()
+
+    def _decrease(self, factor):
+        self.slow_start = False
+        self.samples = 0
+        self.limit = max(self.minimum, int(self.limit * factor))
+
+
+class TokenBucket:
+    """Per-host connect rate limit."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def take(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class PortScanner:
+    """TCP connect scanner: many hosts and ports, results streamed as they resolve.
+
+    Each host gets its own dispatcher (so one slow or rate-limited host does
+    not hold up the others), its address resolved once, and a token bucket.
+    All dispatchers share one AdaptiveLimit on in-flight connects. A result's
+    state is "open", "closed" (refused), "filtered" (timed out) or
+    "unreachable".
+    """
+
+    def __init__(self, timeout=CONNECT_TIMEOUT, concurrency=INITIAL_CONCURRENCY,
+                 max_concurrency=None, per_host_rate=PER_HOST_RATE):
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.per_host_rate = per_host_rate
+        self.limit = None
+        self.stats = collections.Counter()
+
+    async def scan(self, hosts, ports):
+        """Async generator of ScanResult, in completion order."""
+        ports = list(ports)
+        maximum = min(self.max_concurrency or MAX_CONCURRENCY, fd_budget())
+        self.limit = AdaptiveLimit(initial=min(self.concurrency, maximum), maximum=maximum)
+        results = asyncio.Queue()
+        dispatchers = [asyncio.create_task(self._scan_host(host, ports, results)) for host in hosts]
+        pending = len(dispatchers)
+        try:
+            while pending:
+                result = await results.get()
+                if result is None: # A dispatcher finished
+                    pending -= 1
+                    continue
+                self.stats[result.state] += 1
+                yield result
+        finally:
+            for task in dispatchers:
+                task.cancel()
+
+    async def _scan_host(self, host, ports, results):
+        probes = set()
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+            except socket.gaierror:
+                for port in ports:
+                    results.put_nowait(ScanResult(host, port, "unreachable", None))
+                return
+            family, _, _, _, sockaddr = infos[0]
+            address = sockaddr[0]
+            bucket = TokenBucket(self.per_host_rate)
+            for port in ports:
+                await bucket.take()
+                await self.limit.acquire()
+                task = asyncio.create_task(self._probe(host, family, address, port, results))
+                probes.add(task)
+                task.add_done_callback(probes.discard)
+            if probes:
+                await asyncio.gather(*probes)
+        finally:
+            for task in probes:
+                task.cancel()
+            results.put_nowait(None)
+
+    async def _probe(self, host, family, address, port, results):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                sock = None
+                start = time.monotonic()
+                try:
+                    sock = socket.socket(family, socket.SOCK_STREAM)
+                    sock.setblocking(False)
+                    # Close with RST: thousands of open ports would otherwise pile up in TIME_WAIT
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                    await asyncio.wait_for(loop.sock_connect(sock, (address, port)), self.timeout)
+                    state = "open"
+                except asyncio.TimeoutError:
+                    state = "filtered"
+                except ConnectionRefusedError:
+                    state = "closed"
+                except OSError as e:
+                    if e.errno in RETRY_ERRNOS:
+                        self.limit.on_resource_error()
+                        await asyncio.sleep(0.05)
+                        continue
+                    state = "unreachable" if e.errno in UNREACHABLE_ERRNOS else "filtered"
+                finally:
+                    if sock is not None:
+                        sock.close()
+                latency = time.monotonic() - start
+                if state in ("open", "closed"):
+                    self.limit.on_latency(latency)
+                results.put_nowait(ScanResult(host, port, state, round(latency * 1000, 2)))
+                return
+        finally:
+            self.limit.release()
+
+
+def iter_scan(hosts, ports, cancel_event=None, **options):
+    """Blocking iterator over ScanResult for threaded callers.
+
+    The scan runs on its own event loop in a background thread; results are
+    handed over through a queue as they resolve. Stopping early (or setting
+    `cancel_event`) cancels the remaining connects.
+    """
+    handoff = queue.Queue(maxsize=4096)
+    done = object()
+    stop = cancel_event or threading.Event()
+
+    async def run():
+        scanner = PortScanner(**options)
+        async for result in scanner.scan(hosts, ports):
+            if stop.is_set():
+                break
+            # Never block the loop on a slow consumer
+            while True:
+                try:
+                    handoff.put_nowait(result)
+                    break
+                except queue.Full:
+                    await asyncio.sleep(0.01)
+                    if stop.is_set():
+                        return
+
+    def hand_over(item):
+        # Once the consumer has stopped nobody drains the queue, so don't wait on it forever
+        while True:
+            try:
+                handoff.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if stop.is_set():
+                    return
+
+    def worker():
+        try:
+            asyncio.run(run())
+        except Exception as e:
+            hand_over(e)
+        finally:
+            hand_over(done)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    try:
+        while True:
+            try:
+                item = handoff.get(timeout=0.1)
+            except queue.Empty:
+                # The worker gave up on a full queue after cancel_event was set
+                if not thread.is_alive() and handoff.empty():
+                    return
+                continue
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def format_report(hosts, results, elapsed, ports_count):
+    """Text output in the style the dashboard (and the old Java scanner) shows."""
+    lines = []
+    multi = len(hosts) > 1
+    lines.append(f"Starting scan for {', '.join(hosts)}...")
+    lines.append(f"Scanning {ports_count} ports" + (f" on {len(hosts)} hosts..." if multi else "..."))
+    for r in results:
+        if r.state == "open":
+            lines.append(f"✅ Port {r.port} is OPEN" + (f" on {r.host}" if multi else ""))
+    lines.append(f"Scan completed in {int(elapsed * 1000)}ms.")
+    return "\n".join(lines)
+
+
+def parse_request(data):
+    """(hosts, ports, scanner options) from a /scan-ports JSON body."""
+    hosts = parse_hosts(data.get("hosts") or data.get("host") or "")
+    ports = parse_ports(data.get("ports"))
+    options = {}
+    if data.get("timeout") is not None:
+        options["timeout"] = max(0.05, min(float(data["timeout"]), 10.0))
+    if data.get("concurrency") is not None:
+        options["max_concurrency"] = max(MIN_CONCURRENCY, min(int(data["concurrency"]), MAX_CONCURRENCY))
+    if data.get("rate") is not None:
+        options["per_host_rate"] = max(1.0, float(data["rate"]))
+    if len(hosts) * len(ports) > MAX_PROBES:
+        raise ValueError(f"At most {MAX_PROBES} host/port pairs per scan")
+    return hosts, ports, options
+
+
+def summarize(hosts, ports, open_results, counts, elapsed):
+    """Response body for a finished scan: the text report plus the open ports."""
+    open_results = sorted(open_results, key=lambda r: (r.host, r.port))
+    return {
+        "output": format_report(hosts, open_results, elapsed, len(ports)),
+        "open": [r._asdict() for r in open_results],
+        "counts": dict(counts),
+        "scanned": sum(counts.values()),
+        "elapsed_ms": int(elapsed * 1000),
+    }
+
+
+class ScanTally:
+    """Running totals of a scan, and the JSON lines a streamed scan sends."""
+
+    def __init__(self, hosts, ports):
+        self.hosts = hosts
+        self.ports = ports
+        self.total = len(hosts) * len(ports)
+        self.open_results = []
+        self.counts = collections.Counter()
+        self.started = time.time()
+        self.last_progress = self.started
+
+    def start_line(self):
+        return encode_line({"type": "start", "hosts": self.hosts, "ports": len(self.ports), "total": self.total})
+
+    def add(self, result):
+        """Counts a result; returns the lines it produces (an open port, a progress tick)."""
+        self.counts[result.state] += 1
+        lines = []
+        if result.state == "open":
+            self.open_results.append(result)
+            lines.append(encode_line({"type": "open", **result._asdict()}))
+        now = time.time()
+        if now - self.last_progress >= PROGRESS_INTERVAL:
+            self.last_progress = now
+            lines.append(encode_line({"type": "progress", "done": sum(self.counts.values()), "total": self.total}))
+        return lines
+
+    def summary(self):
+        return summarize(self.hosts, self.ports, self.open_results, self.counts, time.time() - self.started)
+
+    def done_line(self):
+        return encode_line({"type": "done", **self.summary()})
+
+
+def encode_line(payload):
+    return json.dumps(payload).encode() + b"\n"
+
+
+def run_scan(hosts, ports, **options):
+    """Scans to completion and returns the summary. Only open ports are kept."""
+    tally = ScanTally(hosts, ports)
+    for result in iter_scan(hosts, ports, **options):
+        tally.add(result)
+    return tally.summary()
+
+
+def stream_scan(hosts, ports, write, **options):
+    """Runs a scan, writing it as JSON lines: start, each open port, progress, done.
+
+    `write` takes bytes; if it raises (client went away) the scan is cancelled.
+    """
+    tally = ScanTally(hosts, ports)
+    write(tally.start_line())
+    for result in iter_scan(hosts, ports, **options):
+        for line in tally.add(result):
+            write(line)
+    write(tally.done_line())
+
+
+async def run_scan_async(hosts, ports, **options):
+    """run_scan() on the caller's event loop."""
+    tally = ScanTally(hosts, ports)
+    async for result in PortScanner(**options).scan(hosts, ports):
+        tally.add(result)
+    return tally.summary()
+
+
+async def stream_scan_async(hosts, ports, write, **options):
+    """stream_scan() on the caller's event loop, awaiting write(bytes)."""
+    tally = ScanTally(hosts, ports)
+    await write(tally.start_line())
+    results = PortScanner(**options).scan(hosts, ports)
+    try:
+        async for result in results:
+            for line in tally.add(result):
+                await write(line)
+    finally:
+        await results.aclose()
+    await write(tally.done_line())
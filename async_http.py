@@ -0,0 +1,184 @@
+import asyncio
+import email.utils
+import json
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+# Largest request head (request line + headers) and body accepted
+MAX_HEAD = 64 * 1024
+MAX_BODY = 10 * 1024 * 1024
+# Seconds an idle keep-alive connection is held open waiting for its next request
+KEEPALIVE_TIMEOUT = 60.0
+
+SERVER_NAME = "LoadBalancerDashboard/1.0"
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+
+
+class Request:
+    """One HTTP request and the means to answer it.
+
+    `respond()` sends a complete response; the connection may then carry the
+    next request. `start_stream()` sends only the head, after which the body
+    is written with `write()` and the connection closes when the handler
+    returns (no Content-Length, so the close ends the body).
+    """
+
+    def __init__(self, method, target, version, headers, body, writer):
+        self.method = method
+        self.target = target
+        self.path = urlsplit(target).path or "/"
+        self.query = urlsplit(target).query
+        self.version = version
+        self.headers = headers
+        self.body = body
+        self.writer = writer
+        self.responded = False
+        self.streaming = False
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.1":
+            return connection != "close"
+        return connection == "keep-alive"
+
+    def json(self):
+        return json.loads(self.body or b"{}")
+
+    def _head(self, status, headers, length=None):
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                 f"Server: {SERVER_NAME}",
+                 f"Date: {email.utils.formatdate(usegmt=True)}"]
+        lines.extend(f"{name}: {value}" for name, value in headers)
+        if length is not None:
+            lines.append(f"Content-Length: {length}")
+        lines.append("Connection: keep-alive" if self.keep_alive and not self.streaming else "Connection: close")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def respond(self, status, headers=(), body=b""):
+        self.responded = True
+        # 304s carry no body, and HEAD gets the headers of the GET it mirrors
+        no_body = self.method == "HEAD" or status == 304
+        self.writer.write(self._head(status, headers, None if status == 304 else len(body)))
+        if not no_body:
+            self.writer.write(body)
+        await self.writer.drain()
+
+    async def start_stream(self, status, headers=()):
+        self.responded = True
+        self.streaming = True
+        self.writer.write(self._head(status, headers))
+        await self.writer.drain()
+
+    async def write(self, chunk):
+        """Raises ConnectionResetError once the client has gone away."""
+        if self.writer.is_closing():
+            raise ConnectionResetError("client disconnected")
+        self.writer.write(chunk)
+        await self.writer.drain()
+
+
+async def read_request(reader, writer):
+    """Next request on the connection, or None when the client closed it."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise HTTPError(400)
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431)
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(400)
+    if not version.startswith("HTTP/1."):
+        raise HTTPError(505)
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise HTTPError(400)
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        raise HTTPError(411) # Every client we serve sends Content-Length
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400)
+    if length > MAX_BODY:
+        raise HTTPError(413)
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target, version, headers, body, writer)
+
+
+class AsyncHTTPServer:
+    """HTTP/1.1 server on one asyncio loop.
+
+    Every connection is a coroutine, not a thread, so idle keep-alive and
+    streaming connections only cost their buffers. `handler(request)` is a
+    coroutine that must answer with `request.respond()` or
+    `request.start_stream()`; blocking work belongs in an executor.
+    """
+
+    def __init__(self, handler, host="", port=8000):
+        self.handler = handler
+        self.host = host or None
+        self.port = port
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self._serve_connection, self.host, self.port,
+                                            limit=MAX_HEAD, reuse_address=True, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader, writer), KEEPALIVE_TIMEOUT)
+                except HTTPError as e:
+                    await self._send_error(writer, e.status, str(e))
+                    return
+                if request is None:
+                    return
+                try:
+                    await self.handler(request)
+                except HTTPError as e:
+                    if request.responded:
+                        return
+                    await request.respond(e.status, [("Content-Type", "text/plain; charset=utf-8")],
+                                          str(e).encode())
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    return
+                except Exception as e:
+                    print(f"Error handling {request.method} {request.path}: {e}")
+                    if request.responded:
+                        return
+                    await request.respond(500, [("Content-Type", "text/plain; charset=utf-8")], b"Internal Server Error")
+                if not request.responded or request.streaming or not request.keep_alive:
+                    return
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send_error(self, writer, status, message):
+        body = message.encode()
+        writer.write(f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                     f"Content-Type: text/plain; charset=utf-8\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
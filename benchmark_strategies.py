@@ -0,0 +1,111 @@
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from load_generator import LoadGenerator
+
+# Compares balancing strategies on the same set of mock backends, one of
+# which is slower than the others, and prints the latency each achieves.
+#
+#   python3 benchmark_strategies.py --backend 9181:2 --backend 9182:2 --backend 9183:40
+#
+# Needs javac/java on PATH. Uses the balancer's fixed listening ports
+# (8080-8083, 8888), so stop any running balancer first.
+
+LB_URL = "http://localhost:8080"
+DEFAULT_BACKENDS = ["9181:2", "9182:2", "9183:40"]
+DEFAULT_STRATEGIES = ["least-connections", "adaptive"]
+
+
+def wait_for_port(port, timeout=15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("localhost", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def compile_balancer(out_dir):
+    sources = [os.path.join("src/main/java/com/loadbalancer", f)
+               for f in os.listdir("src/main/java/com/loadbalancer") if f.endswith(".java")]
+    subprocess.run(["javac", "-d", out_dir] + sources, check=True)
+
+
+def run_strategy(classes, strategy, ports, args):
+    cmd = ["java", f"-Dlb.strategy={strategy}", f"-Dlb.engine={args.engine}",
+           "-Dlb.autoscale=false",
+           "-cp", classes, "com.loadbalancer.LoadBalancer"] + [str(p) for p in ports]
+    lb = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_port(8080):
+            raise RuntimeError(f"Load balancer did not start for {strategy}")
+
+        # Warm up the JIT and the strategy's latency estimates
+        warmup = LoadGenerator(LB_URL, args.warmup, args.concurrency)
+        warmup.verbose = False
+        warmup.run()
+
+        generator = LoadGenerator(LB_URL, args.requests, args.concurrency)
+        generator.verbose = False
+        return generator.run()
+    finally:
+        lb.terminate()
+        lb.wait()
+        # Let the listening ports close before the next run
+        time.sleep(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare strategy tail latency against mock backends")
+    parser.add_argument("--backend", action="append", metavar="PORT:DELAY_MS",
+                        help=f"Mock backend and its injected delay (default: {' '.join(DEFAULT_BACKENDS)})")
+    parser.add_argument("--strategy", action="append",
+                        help=f"Strategy to run (default: {' '.join(DEFAULT_STRATEGIES)})")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--warmup", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--engine", default="blocking", choices=["nio", "blocking"])
+    args = parser.parse_args()
+
+    if not shutil.which("javac"):
+        sys.exit("❌ javac not found; the benchmark needs a JDK")
+
+    backends = [b.split(":") for b in (args.backend or DEFAULT_BACKENDS)]
+    strategies = args.strategy or DEFAULT_STRATEGIES
+
+    classes = tempfile.mkdtemp(prefix="lb-bench-")
+    mocks = []
+    try:
+        compile_balancer(classes)
+        for port, delay in backends:
+            mocks.append(subprocess.Popen([sys.executable, "mock_server.py", port, delay],
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        for port, _ in backends:
+            if not wait_for_port(int(port)):
+                sys.exit(f"❌ Mock backend on {port} did not start")
+
+        print(f"Backends: {', '.join(f'{p} ({d}ms)' for p, d in backends)}")
+        print(f"{args.requests} requests, concurrency {args.concurrency}, {args.engine} engine\n")
+        print(f"{'strategy':<20}{'rps':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'p99.9':>9}{'failed':>8}")
+        for strategy in strategies:
+            result = run_strategy(classes, strategy, [int(p) for p, _ in backends], args)
+            lat = result["latency"]
+            print(f"{strategy:<20}{result['rps']:>9.1f}{lat['p50']:>9.1f}{lat['p90']:>9.1f}"
+                  f"{lat['p99']:>9.1f}{lat['p999']:>9.1f}{result['failed']:>8}")
+        print("\n(latencies in ms)")
+    finally:
+        for mock in mocks:
+            mock.terminate()
+        shutil.rmtree(classes, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
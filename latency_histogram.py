@@ -0,0 +1,112 @@
+import math
+from array import array
+
+# Log-linear bucketing (HDR style): values below SUB_BUCKET_COUNT microseconds
+# get one bucket each; above that every power of two is split into
+# SUB_BUCKET_HALF linear buckets, so any recorded value is reported within
+# 1/SUB_BUCKET_HALF (~1.6%) of its true value.
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+PERCENTILES = (("p50", 50.0), ("p90", 90.0), ("p99", 99.0), ("p999", 99.9))
+
+
+def _bucket_index(value_us):
+    if value_us < SUB_BUCKET_COUNT:
+        return value_us
+    shift = value_us.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + (value_us >> shift) - SUB_BUCKET_HALF
+
+
+def _bucket_high(index):
+    # Highest value (in us) that maps to this bucket
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift, sub = divmod(index - SUB_BUCKET_COUNT, SUB_BUCKET_HALF)
+    shift += 1
+    return ((sub + SUB_BUCKET_HALF + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Fixed-memory latency histogram.
+
+    Latencies are recorded in seconds and stored as microsecond counts in a
+    preallocated array, so recording never grows memory no matter how many
+    samples are taken. Histograms with the same range merge exactly.
+    """
+
+    def __init__(self, max_seconds=60):
+        self.max_us = int(max_seconds * 1_000_000)
+        self.counts = array("Q", bytes(8 * (_bucket_index(self.max_us) + 1)))
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def record(self, seconds):
+        value_us = int(seconds * 1_000_000)
+        if value_us < 0:
+            value_us = 0
+        elif value_us > self.max_us:
+            value_us = self.max_us
+        self.counts[_bucket_index(value_us)] += 1
+
+        self.count += 1
+        self.total += seconds
+        self.total_sq += seconds * seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        if len(other.counts) != len(self.counts):
+            raise ValueError("Cannot merge histograms with different ranges")
+        counts = self.counts
+        for i, c in enumerate(other.counts):
+            if c:
+                counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max > self.max:
+            self.max = other.max
+        return self
+
+    def percentile(self, pct):
+        """Latency in seconds at or below which `pct` percent of samples fall."""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(self.count * pct / 100.0))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                # Never report beyond the exact max
+                return min(_bucket_high(i) / 1_000_000, self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def stddev(self):
+        if self.count < 2:
+            return 0.0
+        mean = self.mean()
+        variance = self.total_sq / self.count - mean * mean
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+    def summary(self):
+        """Percentiles/mean/stddev in milliseconds, as reported in results."""
+        result = {"count": self.count}
+        for name, pct in PERCENTILES:
+            result[name] = self.percentile(pct) * 1000
+        result["min"] = (self.min or 0.0) * 1000
+        result["max"] = self.max * 1000
+        result["mean"] = self.mean() * 1000
+        result["stddev"] = self.stddev() * 1000
+        return result
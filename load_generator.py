@@ -1,64 +1,620 @@
 import argparse
+import asyncio
+import http.client
+import multiprocessing
+import socket
+import ssl
+import threading
+import urllib.parse
 import urllib.request
 import concurrent.futures
 import time
 import sys
+import queue
+from latency_histogram import LatencyHistogram
+from load_profiles import LoadProfile, PROFILES
 
-def send_request(url, request_id):
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+ENGINES = ("thread", "async")
+REQUEST_TIMEOUT = 5
+# How often engines check for finished windows and cancellation
+WINDOW_TICK = 0.1
+
+def send_request(url, request_id, scheduled_at=None):
+    # Open-loop runs measure latency from the intended send time, so queueing
+    # behind a slow target is counted instead of hidden (coordinated omission)
     try:
-        start = time.time()
-        with urllib.request.urlopen(url, timeout=5) as response:
+        start = scheduled_at if scheduled_at is not None else time.time()
+        with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT) as response:
             status = response.status
         duration = time.time() - start
         return (True, status, duration)
     except Exception as e:
         return (False, str(e), 0)
 
+def _shard_worker(generator, start_event, stop_event, results, window):
+    # Runs in a child process: wait so every shard starts together, stream
+    # progress windows if asked to, then report the shard's totals
+    def forward(success_count, fail_count, histogram):
+        results.put(("window", success_count, fail_count, histogram, None))
+
+    stats = RunStats(window=window, forward=forward) if window else RunStats()
+    start_event.wait()
+    stats.started = stats.window_start = time.time()
+    try:
+        generator._run_local(stats, stop_event)
+        stats.flush_window(final=True)
+        results.put(("done", stats.success_count, stats.fail_count, stats.histogram, None))
+    except Exception as e:
+        results.put(("done", 0, 0, None, f"{type(e).__name__}: {e}"))
+
+def raise_fd_limit(wanted):
+    # Every in-flight request holds a socket; lift the soft limit towards the hard one
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY or soft >= wanted:
+        return
+    new_soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+    except (ValueError, OSError):
+        pass
+
+class KeepAliveClient:
+    """Thread engine client that reuses one persistent connection per worker thread.
+
+    http.client reconnects transparently when the server closes the
+    connection (HTTP/1.0 or `Connection: close`), so this also works against
+    backends without keep-alive; they just don't get the reuse.
+    """
+
+    def __init__(self, url):
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {parsed.scheme!r}")
+        self.connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parsed.netloc.rsplit("@", 1)[-1]
+        self.path = parsed.path or "/"
+        if parsed.query:
+            self.path += "?" + parsed.query
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.connection_class(self.netloc, timeout=REQUEST_TIMEOUT)
+            self.local.conn = conn
+        return conn
+
+    def send(self, scheduled_at=None):
+        start = scheduled_at if scheduled_at is not None else time.time()
+        conn = self._connection()
+        # A kept-alive connection may have been closed by the server while idle;
+        # retry once on a fresh connection in that case
+        for attempt in range(2):
+            reused = conn.sock is not None
+            try:
+                conn.request("GET", self.path, headers={"User-Agent": "load-generator"})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                conn.close()
+                if not reused or attempt:
+                    return (False, str(e), 0)
+            except Exception as e:
+                conn.close()
+                return (False, str(e), 0)
+
+        if status >= 400:
+            return (False, f"HTTP Error {status}", 0)
+        return (True, status, time.time() - start)
+
+class AsyncTarget:
+    """Pre-resolved target for the asyncio engine.
+
+    DNS is resolved once up front (asyncio would otherwise push every connect's
+    getaddrinfo through its small default thread pool) and the request bytes
+    are built once and shared by every connection. With `keep_alive`, finished
+    connections go back to an idle pool and are reused by the next request.
+    """
+
+    def __init__(self, url, keep_alive=False):
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {parsed.scheme!r}")
+        self.host = parsed.hostname or "localhost"
+        self.ssl = ssl.create_default_context() if parsed.scheme == "https" else None
+        self.port = parsed.port or (443 if self.ssl else 80)
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+
+        self.keep_alive = keep_alive
+        self.idle = []
+        host_header = parsed.netloc.rsplit("@", 1)[-1]
+        self.request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host_header}\r\n"
+            "User-Agent: load-generator\r\n"
+            "Accept: */*\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode("latin-1")
+
+        sockaddr = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)[0][4]
+        self.addr = sockaddr[0]
+
+    async def send(self, scheduled_at=None):
+        start = scheduled_at if scheduled_at is not None else time.time()
+        try:
+            status = await asyncio.wait_for(self._exchange(), REQUEST_TIMEOUT)
+            if status >= 400:
+                return (False, f"HTTP Error {status}", 0)
+            return (True, status, time.time() - start)
+        except Exception as e:
+            return (False, str(e) or type(e).__name__, 0)
+
+    async def _exchange(self):
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if reader.at_eof():
+                writer.close()
+                continue
+            try:
+                return await self._request(reader, writer)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                # Server dropped the idle connection; fall through to a fresh one
+                pass
+
+        reader, writer = await asyncio.open_connection(
+            self.addr, self.port, ssl=self.ssl,
+            server_hostname=self.host if self.ssl else None)
+        return await self._request(reader, writer)
+
+    async def _request(self, reader, writer):
+        reusable = False
+        try:
+            writer.write(self.request)
+            status, reusable = await self._read_response(reader)
+            return status
+        finally:
+            if reusable and self.keep_alive:
+                self.idle.append((reader, writer))
+            else:
+                writer.close()
+
+    async def _read_response(self, reader):
+        """Reads one response; returns (status, connection_reusable)."""
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b"", None)
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+            raise ConnectionError("Invalid HTTP response")
+        status = int(parts[1])
+        reusable = parts[0] == b"HTTP/1.1"
+
+        content_length = None
+        chunked = False
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            value = value.strip().lower()
+            if name == b"content-length":
+                content_length = int(value)
+            elif name == b"transfer-encoding":
+                chunked = b"chunked" in value
+            elif name == b"connection":
+                if value == b"close":
+                    reusable = False
+                elif value == b"keep-alive":
+                    reusable = True
+
+        if chunked:
+            while True:
+                size = int((await reader.readline()).split(b";", 1)[0], 16)
+                if size == 0:
+                    # Trailers end with an empty line
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                await reader.readexactly(size + 2)
+        elif content_length is not None:
+            await reader.readexactly(content_length)
+        else:
+            # No framing -> the body ends at EOF
+            while await reader.read(65536):
+                pass
+            reusable = False
+        return status, reusable
+
+class RunStats:
+    """Counters for one run, plus optional per-window progress.
+
+    Every `window` seconds the requests completed in that window are reported
+    to `on_window` as a summary dict (completed, errors, rps, latency). Shards
+    of a multi-process run pass `forward` instead, which receives the raw
+    window counts and histogram so the parent can merge them.
+    """
+
+    def __init__(self, on_window=None, window=1.0, forward=None):
+        self.success_count = 0
+        self.fail_count = 0
+        self.histogram = LatencyHistogram()
+        self.on_window = on_window
+        self.forward = forward
+        self.window = window
+        self.started = time.time()
+        self.window_start = self.started
+        self.window_index = 0
+        self.window_success = 0
+        self.window_failed = 0
+        self.window_histogram = LatencyHistogram() if (on_window or forward) else None
+
+    def record(self, success, duration):
+        if success:
+            self.success_count += 1
+            self.histogram.record(duration)
+        else:
+            self.fail_count += 1
+        if self.window_histogram is not None:
+            self.add_window(1 if success else 0, 0 if success else 1)
+            if success:
+                self.window_histogram.record(duration)
+
+    def add_window(self, success, failed, histogram=None):
+        self.window_success += success
+        self.window_failed += failed
+        if histogram is not None:
+            self.window_histogram.merge(histogram)
+
+    def tick(self, now=None):
+        if self.window_histogram is None:
+            return
+        now = time.time() if now is None else now
+        if now - self.window_start >= self.window:
+            self.flush_window(now)
+
+    def flush_window(self, now=None, final=False):
+        if self.window_histogram is None:
+            return
+        # Idle windows are still reported (a stalled target shows as 0 rps),
+        # except for an empty tail at the very end of the run
+        if final and not (self.window_success or self.window_failed):
+            return
+        now = time.time() if now is None else now
+        if self.forward is not None:
+            self.forward(self.window_success, self.window_failed, self.window_histogram)
+        else:
+            completed = self.window_success + self.window_failed
+            elapsed = now - self.window_start
+            self.on_window({
+                "window": self.window_index,
+                "elapsed": now - self.started,
+                "completed": completed,
+                "errors": self.window_failed,
+                "rps": completed / elapsed if elapsed > 0 else 0.0,
+                "latency": self.window_histogram.summary(),
+            })
+        self.window_index += 1
+        self.window_start = now
+        self.window_success = 0
+        self.window_failed = 0
+        self.window_histogram = LatencyHistogram()
+
 class LoadGenerator:
-    def __init__(self, url, requests_count, concurrency):
+    """Closed-loop by default: `concurrency` workers send `requests_count`
+    requests back to back. Given a LoadProfile it runs open-loop instead:
+    requests fire on the profile's schedule whether or not earlier ones have
+    finished, `requests_count` is ignored and `concurrency` caps the number in
+    flight (requests over the cap wait, and that wait counts as latency).
+
+    `keep_alive` switches from one connection per request to persistent,
+    reused connections, to separate accept-path cost from forwarding cost.
+
+    `processes` > 1 shards the request budget (or the profile's rate) and the
+    concurrency across that many worker processes, each running its own
+    engine, and merges their counts and latency histograms exactly.
+    """
+
+    def __init__(self, url, requests_count, concurrency, engine="thread", profile=None, keep_alive=False,
+                 processes=1):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine!r} (expected one of {', '.join(ENGINES)})")
         self.url = url
         self.requests_count = requests_count
         self.concurrency = concurrency
+        self.engine = engine
+        self.profile = profile
+        self.keep_alive = keep_alive
+        self.processes = max(1, int(processes))
+        self.verbose = True
 
-    def run(self):
-        print(f"🚀 Starting Load Test: {self.requests_count} requests to {self.url} with {self.concurrency} threads.")
-        
-        success_count = 0
-        fail_count = 0
-        total_time_start = time.time()
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
-            futures = [executor.submit(send_request, self.url, i) for i in range(self.requests_count)]
-            
-            for i, future in enumerate(concurrent.futures.as_completed(futures)):
-                success, status, duration = future.result()
-                if success:
-                    success_count += 1
+    def run(self, on_window=None, window=1.0, cancel_event=None):
+        """Runs the test and returns the result dict.
+
+        `on_window(summary)` is called every `window` seconds with progress for
+        the requests completed in that window. Setting `cancel_event` stops
+        issuing new requests; the result then has "cancelled": True.
+        """
+        stats = RunStats(on_window, window)
+        if self.processes > 1:
+            duration = self._run_processes(stats, cancel_event)
+        else:
+            duration = self._run_local(stats, cancel_event)
+        stats.flush_window(final=True)
+        result = self._result(stats.success_count, stats.fail_count, duration, stats.histogram)
+        result["cancelled"] = cancel_event is not None and cancel_event.is_set()
+        return result
+
+    def _run_local(self, stats, cancel_event=None):
+        if self.engine == "async":
+            return self._run_async(stats, cancel_event)
+        return self._run_threads(stats, cancel_event)
+
+    def _shards(self):
+        shards = []
+        for i in range(self.processes):
+            requests_count = self.requests_count // self.processes + (i < self.requests_count % self.processes)
+            concurrency = max(1, self.concurrency // self.processes + (i < self.concurrency % self.processes))
+            profile = self.profile.scaled(1 / self.processes) if self.profile is not None else None
+            shard = LoadGenerator(self.url, requests_count, concurrency, engine=self.engine,
+                                  profile=profile, keep_alive=self.keep_alive)
+            shard.verbose = False
+            shards.append(shard)
+        return shards
+
+    def _run_processes(self, stats, cancel_event=None):
+        if self.verbose:
+            print(f"🚀 Starting Load Test: {self._describe('connections')} across {self.processes} processes ({self.engine} engine).")
+
+        # Never fork: the caller may be a threaded server (web_server.py), and a forked
+        # child inherits its held locks and open sockets. forkserver forks from a clean
+        # single-threaded process; spawn is the fallback where it isn't available
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        start_event = ctx.Event()
+        stop_event = ctx.Event()
+        results = ctx.Queue()
+        # Shards forward partial windows more often than the parent reports them,
+        # so each parent window lines up with the traffic sent during it
+        window = stats.window / 5 if stats.window_histogram is not None else None
+        workers = [ctx.Process(target=_shard_worker, args=(shard, start_event, stop_event, results, window),
+                               daemon=True)
+                   for shard in self._shards()]
+        for w in workers:
+            w.start()
+
+        errors = []
+        reported = 0
+        start_event.set()
+        try:
+            while reported < len(workers):
+                if cancel_event is not None and cancel_event.is_set():
+                    stop_event.set()
+                try:
+                    kind, success_count, fail_count, histogram, error = results.get(timeout=0.1)
+                except queue.Empty:
+                    if not any(w.is_alive() for w in workers) and results.empty():
+                        raise RuntimeError("Load generator worker process exited without reporting")
+                    stats.tick()
+                    continue
+
+                if kind == "window":
+                    stats.add_window(success_count, fail_count, histogram)
+                elif error:
+                    errors.append(error)
+                    reported += 1
                 else:
-                    fail_count += 1
-                
-                # Simple progress bar logic (only if running as script?)
-                # We'll skip TUI progress bar when called from API to avoid log spam, 
-                # or we could keep it. Let's keep it simple.
-        
-        total_duration = time.time() - total_time_start
-        rps = self.requests_count / total_duration if total_duration > 0 else 0
-        
-        return {
+                    # Final totals are exact; windows above are only for progress
+                    stats.success_count += success_count
+                    stats.fail_count += fail_count
+                    stats.histogram.merge(histogram)
+                    reported += 1
+                stats.tick()
+            total_duration = time.time() - stats.started
+        finally:
+            for w in workers:
+                w.join(timeout=1)
+                if w.is_alive():
+                    w.terminate()
+
+        if errors:
+            raise RuntimeError("Worker process failed: " + "; ".join(errors))
+        return total_duration
+
+    def _result(self, success_count, fail_count, total_duration, histogram):
+        completed = success_count + fail_count
+        rps = completed / total_duration if total_duration > 0 else 0
+
+        result = {
+            "processes": self.processes,
+            "keep_alive": self.keep_alive,
             "success": success_count,
             "failed": fail_count,
             "duration": total_duration,
-            "rps": rps
+            "rps": rps,
+            # Successful requests only, in milliseconds
+            "latency": histogram.summary()
         }
+        if self.profile is not None:
+            result["profile"] = self.profile.describe()
+        return result
+
+    def _describe(self, unit):
+        if self.profile is None:
+            return f"{self.requests_count} requests to {self.url} with {self.concurrency} {unit}"
+        p = self.profile
+        return f"{p.kind} profile at {p.rate:g} req/s for {p.duration:g}s to {self.url} (max {self.concurrency} {unit} in flight)"
+
+    def _run_threads(self, stats, cancel_event=None):
+        if self.verbose:
+            print(f"🚀 Starting Load Test: {self._describe('threads')}.")
+
+        if self.keep_alive:
+            client = KeepAliveClient(self.url)
+            send = lambda i, scheduled_at=None: client.send(scheduled_at)
+        else:
+            send = lambda i, scheduled_at=None: send_request(self.url, i, scheduled_at)
+
+        def cancelled():
+            return cancel_event is not None and cancel_event.is_set()
+
+        # Futures report through a queue so handling each completion is O(1)
+        finished = queue.Queue()
+        futures = set()
+        outstanding = 0
+
+        def submit(*args):
+            nonlocal outstanding
+            future = executor.submit(send, *args)
+            futures.add(future)
+            outstanding += 1
+            future.add_done_callback(finished.put)
+
+        def collect(timeout):
+            # Wait up to `timeout` for completions; windows keep ticking while idle
+            nonlocal outstanding
+            try:
+                future = finished.get(timeout=timeout)
+                while True:
+                    outstanding -= 1
+                    futures.discard(future)
+                    if not future.cancelled():
+                        success, status, duration = future.result()
+                        stats.record(success, duration)
+                    future = finished.get_nowait()
+            except queue.Empty:
+                pass
+            stats.tick()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            if self.profile is None:
+                # Keep a bounded backlog queued instead of submitting everything up front
+                issued = 0
+                while issued < self.requests_count and not cancelled():
+                    while issued < self.requests_count and outstanding < self.concurrency * 2:
+                        submit(issued)
+                        issued += 1
+                    collect(WINDOW_TICK)
+            else:
+                for i, offset in enumerate(self.profile.send_times()):
+                    if cancelled():
+                        break
+                    scheduled_at = stats.started + offset
+                    delay = scheduled_at - time.time()
+                    while delay > 0:
+                        collect(min(delay, WINDOW_TICK))
+                        delay = scheduled_at - time.time()
+                    submit(i, scheduled_at)
+
+            while outstanding > 0:
+                if cancelled():
+                    # Requests still queued behind busy threads are dropped
+                    for future in list(futures):
+                        future.cancel()
+                collect(WINDOW_TICK)
+
+        return time.time() - stats.started
+
+    def _run_async(self, stats, cancel_event=None):
+        if self.verbose:
+            print(f"🚀 Starting Load Test: {self._describe('concurrent connections')} (asyncio).")
+        raise_fd_limit(self.concurrency + 256)
+        # asyncio.run creates a fresh loop, so this also works from web_server's handler threads
+        return asyncio.run(self._async_main(stats, cancel_event))
+
+    async def _async_main(self, stats, cancel_event=None):
+        target = AsyncTarget(self.url, keep_alive=self.keep_alive)
+        issued = 0
+        stopping = False
+
+        async def worker():
+            nonlocal issued
+            while issued < self.requests_count and not stopping:
+                issued += 1
+                success, status, duration = await target.send()
+                stats.record(success, duration)
+
+        async def fire(scheduled_at):
+            async with in_flight:
+                success, status, duration = await target.send(scheduled_at)
+            stats.record(success, duration)
+
+        async def ticker():
+            nonlocal stopping
+            while True:
+                await asyncio.sleep(WINDOW_TICK)
+                stats.tick()
+                if cancel_event is not None and cancel_event.is_set() and not stopping:
+                    stopping = True
+                    for task in list(running):
+                        task.cancel()
+
+        if self.profile is None:
+            workers = min(self.concurrency, self.requests_count)
+            running = {asyncio.create_task(worker()) for _ in range(workers)}
+        else:
+            running = set()
+
+        ticker_task = asyncio.create_task(ticker())
+        if self.profile is not None:
+            in_flight = asyncio.Semaphore(self.concurrency)
+            for offset in self.profile.send_times():
+                if stopping:
+                    break
+                scheduled_at = stats.started + offset
+                delay = scheduled_at - time.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.create_task(fire(scheduled_at))
+                running.add(task)
+                task.add_done_callback(running.discard)
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        ticker_task.cancel()
+
+        total_duration = time.time() - stats.started
+        for reader, writer in target.idle:
+            writer.close()
+        return total_duration
 
 def main():
     parser = argparse.ArgumentParser(description="Load Generator for Load Balancer")
     parser.add_argument("--url", default="http://localhost:8080", help="Target URL")
     parser.add_argument("--requests", type=int, default=100, help="Total number of requests")
-    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent threads")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent threads (or connections with --engine async)")
+    parser.add_argument("--engine", choices=ENGINES, default="thread",
+                        help="thread: one OS thread per concurrent request; async: asyncio streams, scales to 10k+ in flight")
+    parser.add_argument("--profile", choices=("closed",) + PROFILES, default="closed",
+                        help="closed: --requests as fast as --concurrency allows; otherwise open-loop at a target rate")
+    parser.add_argument("--rate", type=float, default=100, help="Target requests/sec (final rate for ramp/step, base rate for spike)")
+    parser.add_argument("--duration", type=float, default=10, help="Open-loop test length in seconds")
+    parser.add_argument("--start-rate", type=float, default=0, help="Initial requests/sec for ramp/step")
+    parser.add_argument("--steps", type=int, default=5, help="Number of plateaus for the step profile")
+    parser.add_argument("--peak-rate", type=float, default=None, help="Spike rate (default 5x --rate)")
+    parser.add_argument("--keep-alive", action="store_true",
+                        help="Reuse persistent connections instead of opening one per request")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Worker processes to shard the load across (sidesteps the GIL); results are merged")
     args = parser.parse_args()
 
-    generator = LoadGenerator(args.url, args.requests, args.concurrency)
+    profile = None
+    if args.profile != "closed":
+        profile = LoadProfile(args.profile, args.rate, args.duration,
+                              start_rate=args.start_rate, steps=args.steps, peak_rate=args.peak_rate)
+
+    generator = LoadGenerator(args.url, args.requests, args.concurrency, engine=args.engine, profile=profile,
+                              keep_alive=args.keep_alive, processes=args.processes)
     result = generator.run()
 
     print("\n\n=== Test Complete ===")
@@ -66,6 +622,13 @@ def main():
     print(f"❌ Failed:  {result['failed']}")
     print(f"⏱️  Duration: {result['duration']:.2f}s")
     print(f"📊 RPS:      {result['rps']:.2f}")
+    print(f"🔌 Connections: {'keep-alive' if result['keep_alive'] else 'one per request'}")
+    print(f"🧵 Processes:  {result['processes']}")
+
+    lat = result["latency"]
+    print("\n=== Latency (ms) ===")
+    print(f"p50: {lat['p50']:.2f}  p90: {lat['p90']:.2f}  p99: {lat['p99']:.2f}  p99.9: {lat['p999']:.2f}  max: {lat['max']:.2f}")
+    print(f"mean: {lat['mean']:.2f}  stddev: {lat['stddev']:.2f}")
 
 if __name__ == "__main__":
     main()
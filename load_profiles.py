@@ -0,0 +1,77 @@
+import math
+
+PROFILES = ("constant", "ramp", "step", "spike")
+
+# The schedule is built from slices of piecewise-constant rate; requests that
+# fall into a slice are spread evenly across it.
+SLICE_SECONDS = 0.01
+
+# Spike profile: the peak rate holds for the middle fifth of the run
+SPIKE_START = 0.4
+SPIKE_END = 0.6
+
+
+class LoadProfile:
+    """Target arrival rate over time for open-loop load generation.
+
+    - constant: `rate` for the whole run
+    - ramp:     linear from `start_rate` to `rate`
+    - step:     `steps` equal plateaus from `start_rate` up to `rate`
+    - spike:    `rate`, jumping to `peak_rate` for the middle fifth of the run
+    """
+
+    def __init__(self, kind, rate, duration, start_rate=0.0, steps=5, peak_rate=None):
+        if kind not in PROFILES:
+            raise ValueError(f"Unknown profile: {kind!r} (expected one of {', '.join(PROFILES)})")
+        if rate <= 0 or duration <= 0:
+            raise ValueError("Profile rate and duration must be positive")
+        self.kind = kind
+        self.rate = float(rate)
+        self.duration = float(duration)
+        self.start_rate = max(0.0, float(start_rate))
+        self.steps = max(1, int(steps))
+        self.peak_rate = float(peak_rate) if peak_rate else self.rate * 5
+
+    def scaled(self, fraction):
+        """Same shape at `fraction` of the rate (one shard of a multi-process run)."""
+        return LoadProfile(self.kind, self.rate * fraction, self.duration,
+                           start_rate=self.start_rate * fraction, steps=self.steps,
+                           peak_rate=self.peak_rate * fraction)
+
+    def rate_at(self, t):
+        """Target requests/sec at `t` seconds into the run."""
+        frac = min(max(t / self.duration, 0.0), 1.0)
+        if self.kind == "ramp":
+            return self.start_rate + (self.rate - self.start_rate) * frac
+        if self.kind == "step":
+            if self.steps == 1:
+                return self.rate
+            step = min(self.steps - 1, int(frac * self.steps))
+            return self.start_rate + (self.rate - self.start_rate) * step / (self.steps - 1)
+        if self.kind == "spike":
+            return self.peak_rate if SPIKE_START <= frac < SPIKE_END else self.rate
+        return self.rate
+
+    def send_times(self):
+        """Yields intended send offsets (seconds from start), in order."""
+        credit = 0.0
+        slices = int(math.ceil(self.duration / SLICE_SECONDS))
+        for i in range(slices):
+            start = i * SLICE_SECONDS
+            width = min(SLICE_SECONDS, self.duration - start)
+            credit += self.rate_at(start + width / 2) * width
+            n = int(credit + 1e-9)
+            if n:
+                credit -= n
+                for k in range(n):
+                    yield start + width * k / n
+
+    def describe(self):
+        info = {"profile": self.kind, "rate": self.rate, "duration": self.duration}
+        if self.kind in ("ramp", "step"):
+            info["start_rate"] = self.start_rate
+        if self.kind == "step":
+            info["steps"] = self.steps
+        if self.kind == "spike":
+            info["peak_rate"] = self.peak_rate
+        return info
@@ -0,0 +1,136 @@
+import asyncio
+import collections
+import json
+import threading
+import time
+import uuid
+
+# Finished jobs kept around for late /run-test/<id> lookups
+MAX_FINISHED_JOBS = 20
+# Per-second windows retained per job (replayed to streams that join late)
+MAX_WINDOWS = 3600
+
+
+class LoadTestJob:
+    """A load test running in the background, with its progress windows."""
+
+    def __init__(self, generator, description):
+        self.id = uuid.uuid4().hex[:12]
+        self.generator = generator
+        self.description = description
+        self.status = "running"
+        self.created = time.time()
+        self.result = None
+        self.error = None
+        self.windows = collections.deque(maxlen=MAX_WINDOWS)
+        self.window_count = 0
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        # Called (under lock) on every change; asyncio streams wake through these
+        self._wakers = set()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        try:
+            result = self.generator.run(on_window=self._add_window, cancel_event=self.cancel_event)
+            status = "cancelled" if result.get("cancelled") else "completed"
+            error = None
+        except Exception as e:
+            result, status, error = None, "failed", str(e)
+        with self.lock:
+            self.result = result
+            self.error = error
+            self.status = status
+            self._notify()
+
+    def _add_window(self, window):
+        with self.lock:
+            self.windows.append(window)
+            self.window_count += 1
+            self._notify()
+
+    def _notify(self):
+        for wake in self._wakers:
+            wake()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def finished(self):
+        return self.status != "running"
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "test": self.description,
+                "windows": self.window_count,
+                "result": self.result,
+                "error": self.error,
+            }
+
+    def _pending(self, sent):
+        """Windows after the first `sent`, and the final event if the job is done. Caller holds lock."""
+        # Windows that fell out of the ring are skipped
+        skip = max(0, len(self.windows) - (self.window_count - sent))
+        frames = [f"event: window\ndata: {json.dumps(w)}\n\n".encode() for w in list(self.windows)[skip:]]
+        final = None
+        if self.finished:
+            payload = {"status": self.status, "result": self.result, "error": self.error}
+            final = f"event: {self.status}\ndata: {json.dumps(payload)}\n\n".encode()
+        return self.window_count, frames, final
+
+    async def stream_async(self, write, keepalive=15.0):
+        """Awaits write(frame) for every window, then one final event; holds no thread while waiting."""
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(changed.set)
+
+        with self.lock:
+            self._wakers.add(wake)
+        sent = 0
+        try:
+            while True:
+                with self.lock:
+                    changed.clear()
+                    sent, frames, final = self._pending(sent)
+                for frame in frames:
+                    await write(frame)
+                if final is not None:
+                    await write(final)
+                    return
+                if not frames:
+                    try:
+                        await asyncio.wait_for(changed.wait(), keepalive)
+                    except asyncio.TimeoutError:
+                        await write(b": keepalive\n\n")
+        finally:
+            with self.lock:
+                self._wakers.discard(wake)
+
+
+class JobRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = collections.OrderedDict()
+
+    def submit(self, generator, description):
+        job = LoadTestJob(generator, description)
+        with self.lock:
+            self.jobs[job.id] = job
+            # Forget the oldest finished jobs; running ones are always kept
+            finished = [j for j in self.jobs.values() if j.finished]
+            for old in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self.jobs[old.id]
+        job.start()
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
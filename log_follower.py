@@ -0,0 +1,112 @@
+import os
+import re
+import threading
+import collections
+
+FORWARD_RE = re.compile(r"Forwarding request to localhost:(\d+)")
+
+# Read at most this many bytes per chunk so the first pass over a large log
+# doesn't load the whole file into memory.
+READ_CHUNK_SIZE = 1024 * 1024
+# Leading bytes remembered to detect a replaced file that reused the inode
+HEAD_SIZE = 64
+
+
+class LogFollower:
+    """Tails lb.log incrementally and keeps running counters.
+
+    Only bytes appended since the previous poll are read, so the cost of a
+    poll depends on the new traffic, not on the size of the log. Truncation
+    (size shrinks) and rotation (inode changes) restart parsing from the top
+    of the new file, exactly like re-reading it would.
+    """
+
+    def __init__(self, path, max_logs=10):
+        self.path = path
+        self.max_logs = max_logs
+        self.lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, inode):
+        self._inode = inode
+        self._offset = 0
+        self._partial = b""
+        self._head = b""
+        self.total = 0
+        self.success = 0
+        self.failed = 0
+        self.backend_counts = {}
+        self.recent_logs = collections.deque(maxlen=self.max_logs)
+
+    def poll(self):
+        """Consume new lines. Returns False if the log does not exist."""
+        with self.lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return False
+
+            # Rotated (new file) or truncated (copytruncate / restart)
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                self._reset(st.st_ino)
+
+            if st.st_size == self._offset:
+                return True
+
+            with open(self.path, "rb") as f:
+                if self._head and f.read(len(self._head)) != self._head:
+                    self._reset(st.st_ino)
+                f.seek(self._offset)
+                while True:
+                    chunk = f.read(READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if len(self._head) < HEAD_SIZE:
+                        self._head += chunk[:HEAD_SIZE - len(self._head)]
+                    self._offset += len(chunk)
+                    self._consume(chunk)
+            return True
+
+    def _consume(self, chunk):
+        data = self._partial + chunk
+        lines = data.split(b"\n")
+        # Last element is an incomplete line (or b"" if chunk ended on newline)
+        self._partial = lines.pop()
+        for raw in lines:
+            self._parse_line(raw.decode("utf-8", errors="replace").strip())
+
+    def _parse_line(self, line):
+        if not line:
+            return
+
+        if "Forwarding request to localhost:" in line:
+            match = FORWARD_RE.search(line)
+            if match:
+                port = match.group(1)
+                self.backend_counts[port] = self.backend_counts.get(port, 0) + 1
+                self.total += 1
+                self.success += 1
+        elif "No backend servers available" in line or "Error forwarding" in line:
+            self.failed += 1
+            self.total += 1
+
+        # Meaningful lines for the dashboard console
+        if "Forwarding request" in line:
+            self.recent_logs.append("➡️ " + line)
+        elif "status changed" in line:
+            self.recent_logs.append("⚠️ " + line)
+        elif "No backend" in line:
+            self.recent_logs.append("❌ NO BACKENDS AVAILABLE")
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "total_requests": self.total,
+                "success_requests": self.success,
+                "failed_requests": self.failed,
+                "backend_counts": dict(self.backend_counts),
+                # Chronological [Oldest ... Newest]
+                "recent_logs": list(self.recent_logs),
+                # Counters from different sources start from different baselines
+                "source": "log",
+            }
@@ -0,0 +1,128 @@
+import collections
+import json
+import socket
+import threading
+import time
+
+# Where the balancer's MetricsReporter listens (-Dlb.metrics.port)
+FEED_HOST = "localhost"
+FEED_PORT = 9998
+# Subscriptions expire on the balancer after 10s of silence; renew well before
+SUBSCRIBE_INTERVAL = 2.0
+# Without a snapshot for this long the feed counts as down (callers fall back to lb.log)
+STALE_AFTER = 3.0
+
+
+class MetricsFeed:
+    """Subscribes to the balancer's UDP metrics feed and keeps the latest state.
+
+    Snapshots carry cumulative counters, so `snapshot()` has the same keys as
+    LogFollower.snapshot() and the two can be swapped. `on_message`, if given,
+    is called from the feed thread with every decoded message; snapshot
+    messages get a "deltas" dict ({port: new requests since the previous one}).
+    """
+
+    def __init__(self, host=FEED_HOST, port=FEED_PORT, max_logs=10, on_message=None):
+        self.addr = (host, port)
+        self.on_message = on_message
+        self.lock = threading.Lock()
+        self.last_snapshot = None
+        self.last_snapshot_at = 0.0
+        self.backend_counts = {}
+        self.recent_logs = collections.deque(maxlen=max_logs)
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    @property
+    def active(self):
+        return time.time() - self.last_snapshot_at < STALE_AFTER
+
+    def _run(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(0.5)
+        last_subscribe = 0.0
+        while True:
+            now = time.time()
+            if now - last_subscribe >= SUBSCRIBE_INTERVAL:
+                try:
+                    sock.sendto(b"SUBSCRIBE", self.addr)
+                except OSError:
+                    pass # Balancer not up yet
+                last_subscribe = now
+            try:
+                data = sock.recv(65536)
+            except (socket.timeout, OSError):
+                # ICMP port unreachable surfaces here as ConnectionRefusedError
+                continue
+            for line in data.splitlines():
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    continue
+                self._handle(msg)
+
+    def _handle(self, msg):
+        with self.lock:
+            if msg.get("type") == "snapshot":
+                counts = {str(b["port"]): b["requests"] for b in msg.get("backends", [])}
+                prev = self.backend_counts
+                # A balancer restart resets its counters: count from zero again
+                restarted = self.last_snapshot is not None and msg["total"] < self.last_snapshot["total"]
+                deltas = {}
+                for port, n in counts.items():
+                    delta = n - (0 if restarted else prev.get(port, 0))
+                    if delta > 0:
+                        deltas[port] = delta
+                        self.recent_logs.append(f"➡️ Forwarded {delta} request(s) to localhost:{port}")
+                msg["deltas"] = deltas
+                self.backend_counts = counts
+                self.last_snapshot = msg
+                self.last_snapshot_at = time.time()
+            elif msg.get("type") == "event":
+                line = describe_event(msg)
+                if line:
+                    self.recent_logs.append(line)
+        if self.on_message:
+            self.on_message(msg)
+
+    def snapshot(self):
+        with self.lock:
+            snap = self.last_snapshot or {}
+            return {
+                "total_requests": snap.get("total", 0),
+                "success_requests": snap.get("success", 0),
+                "failed_requests": snap.get("failed", 0),
+                "backend_counts": dict(self.backend_counts),
+                "backend_errors": {str(b["port"]): b.get("errors", 0) for b in snap.get("backends", [])},
+                # Chronological [Oldest ... Newest]
+                "recent_logs": list(self.recent_logs),
+                # Counters from different sources start from different baselines
+                "source": "feed",
+                "backends": snap.get("backends", []),
+            }
+
+
+def describe_event(msg):
+    """One dashboard log line for a feed event (None for events not shown)."""
+    event = msg.get("event")
+    if event == "health":
+        status = "HEALTHY" if msg.get("healthy") else "UNHEALTHY"
+        return f"⚠️ Server {msg.get('backend')} status changed to: {status}"
+    if event == "no_backend":
+        return "❌ NO BACKENDS AVAILABLE"
+    if event == "forward_error":
+        return f"❌ Failed to connect to {msg.get('backend')}"
+    if event == "backend_added":
+        return f"✅ Added new backend: {msg.get('backend')}"
+    if event == "outlier_ejected":
+        return f"🚫 Ejected {msg.get('backend')} for {msg.get('duration_ms')}ms"
+    if event == "outlier_rejoined":
+        return f"✅ {msg.get('backend')} rejoined"
+    if event == "autoscale":
+        return f"📈 Autoscale {msg.get('action')}: {msg.get('detail')}"
+    return None
@@ -0,0 +1,336 @@
+import contextlib
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+# One uint32 count per slot; a slot's position in the file is its timestamp
+RECORD = struct.Struct("<I")
+# Raw segments: one slot per second, one file per hour
+SEGMENT_SECONDS = 3600
+# Rollup segments: one slot per minute, one file per day
+ROLLUP_STEP = 60
+ROLLUP_SECONDS = 86400
+# Raw seconds are kept this long, then folded into minute rollups
+RAW_RETENTION = 2 * 86400
+# Rollups older than this are deleted
+RETENTION = 30 * 86400
+# Most points a range query returns; longer ranges get a coarser step
+MAX_POINTS = 1000
+
+COUNTERS = ("requests", "errors")
+# Series covering the whole balancer rather than one backend
+ALL_BACKENDS = "all"
+SEGMENT_RE = re.compile(r"^([sm])(\d+)\.seg$")
+SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def series_name(backend, counter):
+    return f"{SAFE_NAME_RE.sub('_', str(backend))}.{counter}"
+
+
+class Segment:
+    """A fixed-size file of RECORD slots, memory-mapped read-only for queries."""
+
+    def __init__(self, path, start, step, span):
+        self.path = path
+        self.start = start
+        self.step = step
+        self.span = span
+
+    @property
+    def end(self):
+        return self.start + self.span
+
+    @contextlib.contextmanager
+    def slots(self):
+        """Slot counts as a memoryview of uint32 (None if the file is gone), unmapped on exit."""
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError): # ValueError: empty file
+            yield None
+            return
+        view = memoryview(mapped).cast("I")
+        try:
+            yield view
+        finally:
+            view.release()
+            mapped.close()
+
+
+class MetricsStore:
+    """Per-second request and error counts per backend, kept on disk for weeks.
+
+    Every series (backend x counter, plus "all") is a directory of segment
+    files. A raw segment holds one hour as 3600 fixed-width slots, so a
+    second's count is written straight to its offset and a range read is a
+    slice of a memory map; files are created sparse at full size, so idle
+    seconds cost neither writes nor disk. `compact()` folds raw hours older
+    than RAW_RETENTION into per-minute day segments and deletes rollups
+    older than RETENTION.
+    """
+
+    def __init__(self, root="metrics"):
+        self.root = root
+        self.lock = threading.Lock()
+        self._last = None
+        self._second = None
+        self._pending = {}
+        self._fds = {}
+        os.makedirs(root, exist_ok=True)
+
+    # --- Writing ---
+
+    def record(self, stats, now=None):
+        """Adds the change in cumulative counters since the previous call to the current second."""
+        now = time.time() if now is None else now
+        total = stats.get("total_requests", 0)
+        failed = stats.get("failed_requests", 0)
+        counts = {str(k): v for k, v in stats.get("backend_counts", {}).items()}
+        errors = {str(k): v for k, v in stats.get("backend_errors", {}).items()}
+        source = stats.get("source")
+        with self.lock:
+            last = self._last
+            self._last = (total, failed, counts, errors, source)
+            if last is None or total < last[0] or source != last[4]:
+                # First sample, the balancer restarted, or a switch between feed and
+                # lb.log (different baselines): nothing to attribute yet
+                return
+            second = int(now)
+            if self._second is not None and second > self._second:
+                self._write_pending()
+                self._pending = {}
+            self._second = second if self._second is None else max(self._second, second)
+            deltas = {
+                series_name(ALL_BACKENDS, "requests"): total - last[0],
+                series_name(ALL_BACKENDS, "errors"): failed - last[1],
+            }
+            for backend, count in counts.items():
+                deltas[series_name(backend, "requests")] = count - last[2].get(backend, 0)
+            for backend, count in errors.items():
+                deltas[series_name(backend, "errors")] = count - last[3].get(backend, 0)
+            for name, delta in deltas.items():
+                if delta > 0:
+                    self._pending[name] = self._pending.get(name, 0) + delta
+
+    def flush(self):
+        """Writes the counts of the second in progress (they stay pending until it ends)."""
+        with self.lock:
+            self._write_pending()
+
+    def _write_pending(self):
+        if self._second is None:
+            return
+        second = self._second
+        start = second - second % SEGMENT_SECONDS
+        # A new hour: earlier segments are finished, close them (compact() skips open ones)
+        for name, (seg_start, fd) in list(self._fds.items()):
+            if seg_start != start:
+                os.close(fd)
+                del self._fds[name]
+        for name, count in self._pending.items():
+            fd = self._segment_fd(name, start)
+            # The second's full count every time, so rewriting the slot is idempotent
+            os.pwrite(fd, RECORD.pack(min(count, 0xFFFFFFFF)), (second - start) * RECORD.size)
+
+    def _segment_fd(self, name, start):
+        fd = self._fds.get(name)
+        if fd is not None:
+            return fd[1]
+        directory = os.path.join(self.root, name)
+        os.makedirs(directory, exist_ok=True)
+        handle = os.open(os.path.join(directory, f"s{start}.seg"), os.O_RDWR | os.O_CREAT, 0o644)
+        # Full size up front (sparse), so every slot has a fixed offset
+        if os.fstat(handle).st_size < SEGMENT_SECONDS * RECORD.size:
+            os.ftruncate(handle, SEGMENT_SECONDS * RECORD.size)
+        self._fds[name] = (start, handle)
+        return handle
+
+    # --- Reading ---
+
+    def series(self):
+        try:
+            return sorted(os.listdir(self.root))
+        except FileNotFoundError:
+            return []
+
+    def backends(self):
+        names = {name.rsplit(".", 1)[0] for name in self.series()}
+        return sorted(names - {ALL_BACKENDS}) + ([ALL_BACKENDS] if ALL_BACKENDS in names else [])
+
+    def _segments(self, name, start, end):
+        """Raw and rollup segments of a series overlapping [start, end)."""
+        raw, rollups = [], []
+        directory = os.path.join(self.root, name)
+        try:
+            files = os.listdir(directory)
+        except FileNotFoundError:
+            return raw, rollups
+        for filename in files:
+            match = SEGMENT_RE.match(filename)
+            if not match:
+                continue
+            kind, seg_start = match.group(1), int(match.group(2))
+            if kind == "s":
+                segment = Segment(os.path.join(directory, filename), seg_start, 1, SEGMENT_SECONDS)
+                target = raw
+            else:
+                segment = Segment(os.path.join(directory, filename), seg_start, ROLLUP_STEP, ROLLUP_SECONDS)
+                target = rollups
+            if segment.start < end and segment.end > start:
+                target.append(segment)
+        return raw, rollups
+
+    def _bucket_sums(self, name, start, end, step):
+        """Counts of one series summed into `step`-second buckets over [start, end).
+
+        Seconds still held raw are read at full resolution. Compacted hours
+        come from minute rollups, so a bucket narrower than a minute gets the
+        whole minute's count at the minute's start.
+        """
+        buckets = [0] * ((end - start) // step)
+        raw, rollups = self._segments(name, start, end)
+        raw_hours = set()
+        for segment in raw:
+            with segment.slots() as slots:
+                if slots is not None:
+                    raw_hours.add(segment.start)
+                    add_slots(buckets, slots, segment, start, step)
+        for segment in rollups:
+            with segment.slots() as slots:
+                if slots is not None:
+                    # Hours that still have raw data were not folded into this rollup yet
+                    add_slots(buckets, slots, segment, start, step, skip_hours=raw_hours)
+        return buckets
+
+    def query(self, start, end, step=None, backends=None):
+        """Requests and errors per backend between `start` and `end` (epoch seconds).
+
+        Returns per-bucket counts and rates plus totals for the range. `step`
+        defaults to the smallest of 1 s / whole minutes / whole hours that
+        keeps the answer under MAX_POINTS buckets; an explicit step too fine
+        for that is raised to the smallest one that fits.
+        """
+        start, end = int(start), int(end)
+        if end <= start:
+            raise ValueError("end must be after start")
+        if step is None:
+            step = default_step(end - start)
+        step = max(1, int(step), -(-(end - start) // MAX_POINTS))
+        # Aligning to the step can add a bucket at either end
+        while aligned_buckets(start, end, step) > MAX_POINTS:
+            step += 1
+        start -= start % step
+        end += -end % step
+        with self.lock:
+            # Make the second in progress visible too
+            if self._pending and start <= self._second < end:
+                self._write_pending()
+        wanted = set(backends or self.backends())
+        result = {"start": start, "end": end, "step": step, "t": list(range(start, end, step)), "backends": {}}
+        for backend in self.backends():
+            if backend not in wanted:
+                continue
+            entry = {}
+            for counter in COUNTERS:
+                sums = self._bucket_sums(series_name(backend, counter), start, end, step)
+                entry[counter] = sums
+                entry[f"total_{counter}"] = sum(sums)
+            entry["rps"] = [n / step for n in entry["requests"]]
+            entry["avg_rps"] = entry["total_requests"] / (end - start)
+            entry["error_rate"] = entry["total_errors"] / entry["total_requests"] if entry["total_requests"] else 0.0
+            result["backends"][backend] = entry
+        return result
+
+    # --- Compaction and retention ---
+
+    def compact(self, now=None):
+        """Folds old raw hours into minute rollups and retires old rollups. Returns files removed."""
+        now = time.time() if now is None else now
+        removed = 0
+        for name in self.series():
+            directory = os.path.join(self.root, name)
+            raw, rollups = self._segments(name, 0, 1 << 62)
+            for segment in sorted(raw, key=lambda s: s.start):
+                if segment.end > now - RAW_RETENTION:
+                    continue
+                with self.lock:
+                    current = self._fds.get(name)
+                    if current is not None and current[0] == segment.start:
+                        continue
+                self._fold(directory, segment)
+                os.remove(segment.path)
+                removed += 1
+            for segment in rollups:
+                if segment.end <= now - RETENTION:
+                    os.remove(segment.path)
+                    removed += 1
+            try:
+                os.rmdir(directory) # Only succeeds once a retired series is empty
+            except OSError:
+                pass
+        return removed
+
+    def _fold(self, directory, segment):
+        with segment.slots() as slots:
+            if slots is None:
+                return
+            minutes = [sum(slots[i:i + ROLLUP_STEP]) for i in range(0, SEGMENT_SECONDS, ROLLUP_STEP)]
+        day = segment.start - segment.start % ROLLUP_SECONDS
+        path = os.path.join(directory, f"m{day}.seg")
+        handle = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(handle).st_size < (ROLLUP_SECONDS // ROLLUP_STEP) * RECORD.size:
+                os.ftruncate(handle, (ROLLUP_SECONDS // ROLLUP_STEP) * RECORD.size)
+            # Whole-hour overwrite, not an add, so re-folding after a crash is harmless
+            data = b"".join(RECORD.pack(min(n, 0xFFFFFFFF)) for n in minutes)
+            os.pwrite(handle, data, ((segment.start - day) // ROLLUP_STEP) * RECORD.size)
+            os.fsync(handle)
+        finally:
+            os.close(handle)
+
+    def close(self):
+        with self.lock:
+            self._write_pending()
+            # Written out: a later query() must not write them again (and recreate a compacted hour)
+            self._pending = {}
+            self._second = None
+            for _, fd in self._fds.values():
+                os.close(fd)
+            self._fds = {}
+
+
+def add_slots(buckets, slots, segment, start, step, skip_hours=()):
+    """Adds a segment's slots into `step`-second buckets starting at `start`, by slot start time."""
+    width, origin, count = segment.step, segment.start, len(slots)
+    if skip_hours:
+        slots = list(slots)
+        per_hour = SEGMENT_SECONDS // width
+        for hour in skip_hours:
+            if origin <= hour < segment.end:
+                k = (hour - origin) // width
+                slots[k:k + per_hour] = [0] * per_hour
+    first = max(0, (origin - start) // step)
+    last = min(len(buckets), -(-(segment.end - start) // step))
+    for b in range(first, last):
+        b0 = start + b * step
+        # The first bucket also takes a slot that began just before the range
+        lo = max(0, (b0 - origin) // width if b == 0 else -(-(b0 - origin) // width))
+        hi = min(count, -(-(b0 + step - origin) // width))
+        if lo < hi:
+            buckets[b] += sum(slots[lo:hi])
+
+
+def aligned_buckets(start, end, step):
+    return (end + -end % step - (start - start % step)) // step
+
+
+def default_step(span):
+    step = max(1, -(-span // MAX_POINTS))
+    for unit in (3600, 60):
+        if step > unit:
+            return -(-step // unit) * unit
+    return step
@@ -1,17 +1,203 @@
+import argparse
+import asyncio
 import http.server
+import math
+import random
 import socketserver
-import sys
+import threading
+import time
 
-PORT = int(sys.argv[1])
+# Mock backend for the balancer.
+#
+#   python3 mock_server.py 9081                      # threaded, instant replies
+#   python3 mock_server.py 9081 40                   # fixed 40ms delay (shorthand)
+#   python3 mock_server.py 9081 --mode asyncio --latency lognormal --latency-ms 20 \
+#       --latency-sigma 0.6 --payload-bytes 4096 --error-rate 0.01 --keep-alive --seed 1
 
-class MyHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'text/plain')
-        self.end_headers()
-        response = f"Hello from Backend Server on Port {PORT}\n"
-        self.wfile.write(response.encode())
+MODES = ("threaded", "asyncio", "single")
+LATENCIES = ("fixed", "uniform", "lognormal")
 
-with socketserver.TCPServer(("", PORT), MyHandler) as httpd:
-    print(f"Serving at port {PORT}")
-    httpd.serve_forever()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mock HTTP backend with controllable behaviour")
+    parser.add_argument("port", type=int)
+    parser.add_argument("delay_ms", type=float, nargs="?", default=None,
+                        help="Shorthand for --latency fixed --latency-ms DELAY_MS")
+    parser.add_argument("--mode", choices=MODES, default="threaded",
+                        help="threaded (thread per connection), asyncio, or single (one connection at a time)")
+    parser.add_argument("--latency", choices=LATENCIES, default="fixed",
+                        help="Distribution of the injected response delay")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="fixed: the delay; uniform: lower bound; lognormal: median")
+    parser.add_argument("--latency-max-ms", type=float, default=None, help="uniform: upper bound")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal: sigma of the underlying normal")
+    parser.add_argument("--payload-bytes", type=int, default=None,
+                        help="Response body size (default: a short greeting)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--keep-alive", action="store_true", help="Serve HTTP/1.1 persistent connections")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible latency/error draws")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+    if args.delay_ms is not None:
+        args.latency, args.latency_ms = "fixed", args.delay_ms
+    if not 0.0 <= args.error_rate <= 1.0:
+        parser.error("--error-rate must be between 0 and 1")
+    return args
+
+
+class Behaviour:
+    """Draws per-request delay/outcome and holds the prebuilt responses."""
+
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+
+        if args.payload_bytes is None:
+            body = f"Hello from Backend Server on Port {args.port}\n".encode()
+        else:
+            pattern = f"port {args.port} ".encode()
+            body = (pattern * (args.payload_bytes // len(pattern) + 1))[:args.payload_bytes]
+        self.ok = self._response(200, "OK", body, args.keep_alive)
+        self.ok_close = self._response(200, "OK", body, False)
+        self.error = self._response(500, "Internal Server Error", b"Injected error\n", args.keep_alive)
+        self.error_close = self._response(500, "Internal Server Error", b"Injected error\n", False)
+
+    @staticmethod
+    def _response(code, reason, body, keep_alive):
+        # Status line, headers and body go out in one write
+        version = "HTTP/1.1" if keep_alive else "HTTP/1.0"
+        connection = "keep-alive" if keep_alive else "close"
+        head = (f"{version} {code} {reason}\r\n"
+                f"Content-Type: text/plain\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {connection}\r\n\r\n")
+        return head.encode() + body
+
+    def draw(self):
+        """(delay in seconds, whether to fail) for one request."""
+        args = self.args
+        with self.lock:
+            if args.latency == "uniform":
+                high = args.latency_max_ms if args.latency_max_ms is not None else args.latency_ms * 2
+                delay_ms = self.random.uniform(args.latency_ms, high)
+            elif args.latency == "lognormal":
+                delay_ms = self.random.lognormvariate(math.log(args.latency_ms), args.latency_sigma) \
+                    if args.latency_ms > 0 else 0.0
+            else:
+                delay_ms = args.latency_ms
+            fail = args.error_rate > 0 and self.random.random() < args.error_rate
+        return delay_ms / 1000.0, fail
+
+    def response(self, fail, keep_alive):
+        if fail:
+            return self.error if keep_alive else self.error_close
+        return self.ok if keep_alive else self.ok_close
+
+
+def wants_keep_alive(behaviour, request_version, connection_header):
+    if not behaviour.args.keep_alive:
+        return False
+    connection = (connection_header or "").lower()
+    if request_version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+def make_handler(behaviour):
+    class MockHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" if behaviour.args.keep_alive else "HTTP/1.0"
+
+        def do_GET(self):
+            delay, fail = behaviour.draw()
+            if delay:
+                time.sleep(delay)
+            keep_alive = wants_keep_alive(behaviour, self.request_version, self.headers.get("Connection"))
+            self.close_connection = not keep_alive
+            self.wfile.write(behaviour.response(fail, keep_alive))
+
+        do_POST = do_GET
+
+        def log_message(self, format, *args):
+            if behaviour.args.verbose:
+                super().log_message(format, *args)
+
+    return MockHandler
+
+
+class ThreadedServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+
+class SingleServer(http.server.HTTPServer):
+    allow_reuse_address = True
+
+
+async def handle_async(reader, writer, behaviour):
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            parts = lines[0].split()
+            version = parts[2] if len(parts) == 3 else "HTTP/1.0"
+            headers = {}
+            for line in lines[1:]:
+                name, sep, value = line.partition(":")
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+            # Drain a request body so the next request on the connection parses cleanly
+            length = int(headers.get("content-length", 0) or 0)
+            if length:
+                await reader.readexactly(length)
+
+            delay, fail = behaviour.draw()
+            if delay:
+                await asyncio.sleep(delay)
+            keep_alive = wants_keep_alive(behaviour, version, headers.get("connection"))
+            writer.write(behaviour.response(fail, keep_alive))
+            await writer.drain()
+            if behaviour.args.verbose:
+                print(f"{writer.get_extra_info('peername')} {lines[0]} {'500' if fail else '200'}")
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_async(behaviour):
+    server = await asyncio.start_server(lambda r, w: handle_async(r, w, behaviour),
+                                        "", behaviour.args.port, backlog=1024, reuse_address=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    behaviour = Behaviour(args)
+    print(f"Serving at port {args.port} ({args.mode}, {args.latency} latency {args.latency_ms}ms"
+          f"{', keep-alive' if args.keep_alive else ''})", flush=True)
+
+    if args.mode == "asyncio":
+        try:
+            asyncio.run(serve_async(behaviour))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    server_class = ThreadedServer if args.mode == "threaded" else SingleServer
+    with server_class(("", args.port), make_handler(behaviour)) as httpd:
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ import java.util.List;
 public class AdaptiveStrategy implements LoadBalancingStrategy {
     // We use Round Robin as a fallback/tie-breaker
     private final RoundRobinStrategy roundRobin = new RoundRobinStrategy();
+    private static final double LATENCY_FLOOR_MS = 1.0;
 
     @Override
     public BackendServer getNextServer(List<BackendServer> servers, String clientIp) {
@@ -27,28 +28,20 @@ public class AdaptiveStrategy implements LoadBalancingStrategy {
         }
 
         // 2. Adaptive Logic: Find the server(s) with the minimum score
-        // Score = ActiveConnections + (AvgLatencyMs * 0.1)
-        // We weigh connections more heavily than latency.
+        // Score = (ActiveConnections + 1) * PeakEwmaLatencyMs
+        // i.e. the expected wait if we queue behind the requests already in flight.
+        // The latency floor keeps connection counts meaningful when every
+        // backend answers in under a millisecond (or hasn't been measured yet).
 
         List<BackendServer> bestCandidates = new ArrayList<>();
         double minScore = Double.MAX_VALUE;
 
         for (BackendServer server : healthyServers) {
             int active = server.getActiveRequests();
-            // We need average latency. BackendServer tracks min/max.
-            // Let's assume (min+max)/2 roughly, or just 0 if no data.
-            // Ideally we should track avg, but min/max is what we have.
-            // Let's rely on active connections primarily if latency is unknown.
+            double latency = Math.max(server.getLatencyEwma(), LATENCY_FLOOR_MS);
+            double score = (active + 1) * latency;
 
-            // For now, let's stick to pure "Least Connections" if latency is not granular
-            // enough,
-            // or just use Active Connections as the main driver, which is usually
-            // "Adaptive" enough.
-            // The prompt asked for "Adaptive".
-
-            double score = (double) active;
-
-            if (score < minScore) {
+            if (score < minScore - 0.001) {
                 minScore = score;
                 bestCandidates.clear();
                 bestCandidates.add(server);
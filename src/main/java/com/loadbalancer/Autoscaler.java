@@ -0,0 +1,287 @@
+package com.loadbalancer;
+
+import java.io.IOException;
+import java.net.InetSocketAddress;
+import java.net.Socket;
+import java.util.ArrayDeque;
+import java.util.Deque;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.Executors;
+import java.util.concurrent.ScheduledExecutorService;
+import java.util.concurrent.TimeUnit;
+
+/**
+ * Scales the backend pool with load by spawning / stopping mock_server.py
+ * processes.
+ *
+ * Every TICK_MS the controller folds the cluster RPS (from the backends'
+ * request counters) and the mean peak-EWMA latency into exponentially
+ * smoothed signals, then compares them with a per-backend capacity:
+ *
+ *   desired = ceil(rps / (capacityRps * targetUtilization))
+ *
+ * plus one more backend while latency is above targetLatencyMs. It scales
+ * up one backend at a time when desired exceeds the current count, and down
+ * only when the load would still fit under SCALE_DOWN_HEADROOM of the target
+ * with one backend fewer. Separate up/down cooldowns keep it from
+ * oscillating. Only backends the autoscaler started are ever removed: they are
+ * drained first (no new traffic, in-flight requests finish or drainTimeoutMs
+ * passes) and then the process is stopped.
+ *
+ * Every decision is printed and sent as an "autoscale" event on the metrics
+ * feed.
+ */
+public class Autoscaler {
+    public static final boolean ENABLED = !"false".equals(System.getProperty("lb.autoscale"));
+    private static final long TICK_MS = 1000;
+    // Smoothing time constant for RPS/latency
+    private static final double SMOOTHING_MS = Long.getLong("lb.autoscale.smoothingMs", 10000);
+    private static final double CAPACITY_RPS = Double.parseDouble(System.getProperty("lb.autoscale.capacityRps", "15"));
+    private static final double TARGET_UTILIZATION = Double
+            .parseDouble(System.getProperty("lb.autoscale.targetUtilization", "0.7"));
+    // 0 disables the latency signal
+    private static final double TARGET_LATENCY_MS = Double
+            .parseDouble(System.getProperty("lb.autoscale.targetLatencyMs", "0"));
+    private static final double SCALE_DOWN_HEADROOM = 0.8;
+    private static final long SCALE_UP_COOLDOWN_MS = Long.getLong("lb.autoscale.upCooldownMs", 20000);
+    private static final long SCALE_DOWN_COOLDOWN_MS = Long.getLong("lb.autoscale.downCooldownMs", 60000);
+    private static final long DRAIN_TIMEOUT_MS = Long.getLong("lb.autoscale.drainTimeoutMs", 30000);
+    private static final int MAX_BACKENDS = Integer.getInteger("lb.autoscale.max", 10);
+    private static final long STARTUP_TIMEOUT_MS = 5000;
+
+    private final List<BackendServer> backendServers;
+    private final int minBackends;
+    private final ScheduledExecutorService scheduler = Executors.newSingleThreadScheduledExecutor(r -> {
+        Thread t = new Thread(r, "autoscaler");
+        t.setDaemon(true);
+        return t;
+    });
+
+    // Backends we started (newest last), and the process behind each
+    private final Deque<BackendServer> spawned = new ArrayDeque<>();
+    private final Map<BackendServer, Process> processes = new HashMap<>();
+    private BackendServer draining;
+    private long drainStarted;
+
+    private double smoothedRps = -1;
+    private double smoothedLatency = -1;
+    private long lastTotal = -1;
+    private long lastTick;
+    private long lastScaleUp;
+    private long lastScaleDown;
+    private boolean atMaxReported;
+    private int nextPort = Integer.getInteger("lb.autoscale.firstPort", 9084);
+
+    public Autoscaler(List<BackendServer> backendServers) {
+        this.backendServers = backendServers;
+        this.minBackends = Integer.getInteger("lb.autoscale.min", Math.max(1, backendServers.size()));
+    }
+
+    public void start() {
+        if (!ENABLED) {
+            System.out.println("Autoscaler disabled (-Dlb.autoscale=false)");
+            return;
+        }
+        System.out.println("📈 Autoscaler started (capacity " + CAPACITY_RPS + " RPS/backend at "
+                + (int) (TARGET_UTILIZATION * 100) + "% target, " + minBackends + "-" + MAX_BACKENDS + " backends)");
+        scheduler.scheduleWithFixedDelay(this::tick, TICK_MS, TICK_MS, TimeUnit.MILLISECONDS);
+        // Stop what we spawned when the balancer exits
+        Runtime.getRuntime().addShutdownHook(new Thread(() -> processes.values().forEach(Process::destroy)));
+    }
+
+    private void tick() {
+        try {
+            long now = System.currentTimeMillis();
+            sample(now);
+            if (draining != null) {
+                continueDrain(now);
+                return;
+            }
+            decide(now);
+        } catch (Exception e) {
+            System.err.println("Autoscaler tick failed: " + e.getMessage());
+        }
+    }
+
+    private void sample(long now) {
+        long total = 0;
+        double latencySum = 0;
+        int healthy = 0;
+        for (BackendServer server : backendServers) {
+            total += server.getRequestCount();
+            if (server.isHealthy()) {
+                latencySum += server.getLatencyEwma();
+                healthy++;
+            }
+        }
+        double latency = healthy > 0 ? latencySum / healthy : 0;
+
+        if (lastTotal >= 0 && now > lastTick) {
+            // Removed backends take their counts with them; never report negative load
+            double rps = Math.max(0, total - lastTotal) * 1000.0 / (now - lastTick);
+            double alpha = 1 - Math.exp(-(now - lastTick) / SMOOTHING_MS);
+            smoothedRps = smoothedRps < 0 ? rps : smoothedRps + alpha * (rps - smoothedRps);
+            smoothedLatency = smoothedLatency < 0 ? latency : smoothedLatency + alpha * (latency - smoothedLatency);
+        }
+        lastTotal = total;
+        lastTick = now;
+    }
+
+    private void decide(long now) {
+        if (smoothedRps < 0) {
+            return;
+        }
+        int current = activeBackends();
+        int desired = (int) Math.ceil(smoothedRps / (CAPACITY_RPS * TARGET_UTILIZATION));
+        boolean slow = TARGET_LATENCY_MS > 0 && smoothedLatency > TARGET_LATENCY_MS;
+        if (slow) {
+            desired = Math.max(desired, current + 1);
+        }
+        desired = Math.max(minBackends, desired);
+
+        if (desired > current) {
+            if (current >= MAX_BACKENDS) {
+                if (!atMaxReported) {
+                    report("at_max", "wanted " + desired + " backends, capped at " + MAX_BACKENDS, null);
+                    atMaxReported = true;
+                }
+                return;
+            }
+            if (now - lastScaleUp < SCALE_UP_COOLDOWN_MS) {
+                return;
+            }
+            scaleUp(slow ? "latency above target" : "load above target", current);
+            return;
+        }
+        atMaxReported = false;
+
+        // Down: only with clear headroom on one backend fewer (hysteresis) and no recent change
+        double capacityAfter = (current - 1) * CAPACITY_RPS * TARGET_UTILIZATION * SCALE_DOWN_HEADROOM;
+        if (current > minBackends && !spawned.isEmpty() && !slow && smoothedRps < capacityAfter
+                && now - lastScaleDown >= SCALE_DOWN_COOLDOWN_MS && now - lastScaleUp >= SCALE_DOWN_COOLDOWN_MS) {
+            startDrain(spawned.peekLast(), now);
+        }
+    }
+
+    private int activeBackends() {
+        int n = 0;
+        for (BackendServer server : backendServers) {
+            if (!server.isDraining()) {
+                n++;
+            }
+        }
+        return n;
+    }
+
+    private void scaleUp(String reason, int current) {
+        int port = freePort();
+        System.out.println("🚀 Scaling up (" + reason + ", RPS " + String.format("%.2f", smoothedRps) + "): "
+                + current + " -> " + (current + 1) + " backends");
+        try {
+            // Spawn new backend process
+            Process process = new ProcessBuilder("python3", "mock_server.py", String.valueOf(port))
+                    .redirectErrorStream(true)
+                    .inheritIO()
+                    .start();
+
+            // Only route to it once it accepts connections
+            if (!waitForPort(port)) {
+                process.destroy();
+                report("scale_up_failed", "backend on port " + port + " did not start", null);
+                lastScaleUp = System.currentTimeMillis();
+                return;
+            }
+
+            BackendServer newServer = new BackendServer("localhost", port);
+            processes.put(newServer, process);
+            spawned.addLast(newServer);
+            backendServers.add(newServer);
+            BackendServer.bumpTopologyVersion();
+            MetricsReporter.backendAdded(newServer);
+            lastScaleUp = System.currentTimeMillis();
+            report("scale_up", reason + ", now " + activeBackends() + " backends", newServer);
+        } catch (IOException e) {
+            System.err.println("❌ Failed to scale up: " + e.getMessage());
+            report("scale_up_failed", e.getMessage(), null);
+            lastScaleUp = System.currentTimeMillis();
+        }
+    }
+
+    private void startDrain(BackendServer server, long now) {
+        draining = server;
+        drainStarted = now;
+        server.setDraining(true);
+        report("drain_start", "RPS " + String.format("%.2f", smoothedRps) + " fits in one backend fewer", server);
+    }
+
+    private void continueDrain(long now) {
+        BackendServer server = draining;
+        // <= rather than ==: a counter that ever drifted below zero must not stall the drain
+        boolean idle = server.getActiveRequests() <= 0;
+        if (!idle && now - drainStarted < DRAIN_TIMEOUT_MS) {
+            return;
+        }
+        backendServers.remove(server);
+        spawned.remove(server);
+        BackendServer.bumpTopologyVersion();
+        server.getConnectionPool().shutdown();
+        Process process = processes.remove(server);
+        if (process != null) {
+            process.destroy();
+        }
+        draining = null;
+        lastScaleDown = now;
+        report("scale_down", (idle ? "drained" : "drain timed out with " + server.getActiveRequests() + " active")
+                + ", now " + activeBackends() + " backends", server);
+    }
+
+    private int freePort() {
+        while (true) {
+            int port = nextPort++;
+            boolean inUse = false;
+            for (BackendServer server : backendServers) {
+                if (server.getPort() == port) {
+                    inUse = true;
+                    break;
+                }
+            }
+            if (!inUse) {
+                return port;
+            }
+        }
+    }
+
+    private static boolean waitForPort(int port) {
+        long deadline = System.currentTimeMillis() + STARTUP_TIMEOUT_MS;
+        while (System.currentTimeMillis() < deadline) {
+            try (Socket socket = new Socket()) {
+                socket.connect(new InetSocketAddress("localhost", port), 200);
+                return true;
+            } catch (IOException e) {
+                try {
+                    Thread.sleep(100);
+                } catch (InterruptedException ie) {
+                    Thread.currentThread().interrupt();
+                    return false;
+                }
+            }
+        }
+        return false;
+    }
+
+    private void report(String action, String detail, BackendServer server) {
+        System.out.println("📈 Autoscale " + action + ": " + detail);
+        StringBuilder fields = new StringBuilder();
+        fields.append("\"action\":\"").append(action).append('"')
+                .append(",\"detail\":\"").append(detail.replace("\\", "\\\\").replace("\"", "\\\"")).append('"')
+                .append(",\"rps\":").append(String.format(java.util.Locale.ROOT, "%.2f", smoothedRps))
+                .append(",\"latency_ms\":").append(String.format(java.util.Locale.ROOT, "%.2f", smoothedLatency))
+                .append(",\"backends\":").append(activeBackends());
+        if (server != null) {
+            fields.append(",\"backend\":\"").append(server.getHost()).append(':').append(server.getPort()).append('"');
+        }
+        MetricsReporter.event("autoscale", fields.toString());
+    }
+}
@@ -0,0 +1,202 @@
+package com.loadbalancer;
+
+import java.io.IOException;
+import java.net.InetSocketAddress;
+import java.nio.ByteBuffer;
+import java.nio.channels.SocketChannel;
+import java.util.concurrent.ConcurrentLinkedDeque;
+import java.util.concurrent.Executors;
+import java.util.concurrent.ScheduledExecutorService;
+import java.util.concurrent.ScheduledFuture;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicBoolean;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.concurrent.atomic.LongAdder;
+
+/**
+ * Pre-warmed backend connections for one BackendServer.
+ *
+ * The balancer proxies raw TCP and cannot tell where one request ends and the
+ * next begins, so a connection that has carried a client's bytes is never
+ * handed to another client. What the pool saves is the handshake: it keeps
+ * up to MAX_IDLE connected-but-unused sockets ready, hands one out per
+ * client, and refills in the background.
+ *
+ * Off by default (-Dlb.pool.enabled=true): a single-threaded backend (such
+ * as mock_server.py --mode single) blocks on an idle connection that never
+ * sends a request.
+ */
+public class BackendConnectionPool {
+    public static final boolean ENABLED = Boolean.getBoolean("lb.pool.enabled");
+    private static final int MAX_IDLE = Integer.getInteger("lb.pool.maxIdle", 8);
+    // Idle + connecting + in-flight connections to one backend
+    private static final int MAX_TOTAL = Integer.getInteger("lb.pool.maxTotal", 256);
+    private static final long IDLE_TIMEOUT_MS = Long.getLong("lb.pool.idleTimeoutMs", 30000);
+    private static final int CONNECT_TIMEOUT_MS = 2000;
+    private static final long EVICT_INTERVAL_MS = 5000;
+
+    private static final ScheduledExecutorService refiller = Executors.newScheduledThreadPool(2, r -> {
+        Thread t = new Thread(r, "backend-pool");
+        t.setDaemon(true);
+        return t;
+    });
+
+    private final BackendServer server;
+    private final ConcurrentLinkedDeque<IdleConnection> idle = new ConcurrentLinkedDeque<>();
+    private final AtomicInteger idleCount = new AtomicInteger();
+    private final AtomicInteger connecting = new AtomicInteger();
+    private final AtomicBoolean refillScheduled = new AtomicBoolean();
+    private final LongAdder hits = new LongAdder();
+    private final LongAdder misses = new LongAdder();
+    // The periodic eviction task; cancelled by shutdown() so a removed backend isn't kept reachable
+    private final ScheduledFuture<?> evictor;
+    private volatile boolean shutdown;
+
+    private static final class IdleConnection {
+        final SocketChannel channel;
+        final long since;
+
+        IdleConnection(SocketChannel channel, long since) {
+            this.channel = channel;
+            this.since = since;
+        }
+    }
+
+    public BackendConnectionPool(BackendServer server) {
+        this.server = server;
+        if (ENABLED) {
+            evictor = refiller.scheduleWithFixedDelay(this::evictIdle, EVICT_INTERVAL_MS, EVICT_INTERVAL_MS,
+                    TimeUnit.MILLISECONDS);
+            scheduleRefill();
+        } else {
+            evictor = null;
+        }
+    }
+
+    /**
+     * A connected, never-used channel in blocking mode, or null if none is
+     * ready (the caller connects itself). Callers own the channel afterwards.
+     */
+    public SocketChannel acquire() {
+        if (!ENABLED) {
+            return null;
+        }
+        IdleConnection conn;
+        long now = System.currentTimeMillis();
+        // Most recently added first: the least likely to have been dropped by the backend
+        while ((conn = idle.pollFirst()) != null) {
+            idleCount.decrementAndGet();
+            if (now - conn.since <= IDLE_TIMEOUT_MS && isAlive(conn.channel)) {
+                hits.increment();
+                scheduleRefill();
+                return conn.channel;
+            }
+            close(conn.channel);
+        }
+        misses.increment();
+        scheduleRefill();
+        return null;
+    }
+
+    /** Closes every idle connection (the server went down). */
+    public void invalidate() {
+        IdleConnection conn;
+        while ((conn = idle.pollFirst()) != null) {
+            idleCount.decrementAndGet();
+            close(conn.channel);
+        }
+    }
+
+    /** Stops eviction and refills for good and closes the idle connections (the server was removed). */
+    public void shutdown() {
+        shutdown = true;
+        if (evictor != null) {
+            evictor.cancel(false);
+        }
+        invalidate();
+    }
+
+    public void scheduleRefill() {
+        if (ENABLED && !shutdown && refillScheduled.compareAndSet(false, true)) {
+            refiller.execute(this::refill);
+        }
+    }
+
+    private void refill() {
+        try {
+            while (!shutdown && server.isHealthy()
+                    && idleCount.get() + connecting.get() < MAX_IDLE
+                    && idleCount.get() + connecting.get() + server.getActiveRequests() < MAX_TOTAL) {
+                connecting.incrementAndGet();
+                try {
+                    SocketChannel channel = SocketChannel.open();
+                    try {
+                        channel.socket().setTcpNoDelay(true);
+                        channel.socket().connect(new InetSocketAddress(server.getHost(), server.getPort()),
+                                CONNECT_TIMEOUT_MS);
+                    } catch (IOException e) {
+                        close(channel);
+                        // Leave failure handling to the health check; try again on the next acquire
+                        return;
+                    }
+                    idle.offerFirst(new IdleConnection(channel, System.currentTimeMillis()));
+                    idleCount.incrementAndGet();
+                } finally {
+                    connecting.decrementAndGet();
+                }
+            }
+            if (shutdown || !server.isHealthy()) {
+                invalidate();
+            }
+        } catch (IOException e) {
+            // SocketChannel.open failed (fd exhaustion); next acquire retries
+        } finally {
+            refillScheduled.set(false);
+        }
+    }
+
+    private void evictIdle() {
+        long cutoff = System.currentTimeMillis() - IDLE_TIMEOUT_MS;
+        // Oldest connections sit at the tail
+        IdleConnection conn;
+        while ((conn = idle.peekLast()) != null && conn.since < cutoff) {
+            if (idle.removeLastOccurrence(conn)) {
+                idleCount.decrementAndGet();
+                close(conn.channel);
+            }
+        }
+    }
+
+    // Non-blocking 1-byte read: -1 means the backend closed it while idle, and
+    // unsolicited bytes mean it is not a fresh connection either.
+    private static boolean isAlive(SocketChannel channel) {
+        try {
+            channel.configureBlocking(false);
+            int n = channel.read(ByteBuffer.allocate(1));
+            channel.configureBlocking(true);
+            return n == 0;
+        } catch (IOException e) {
+            return false;
+        }
+    }
+
+    private static void close(SocketChannel channel) {
+        try {
+            channel.close();
+        } catch (IOException e) {
+            // Already gone
+        }
+    }
+
+    public long getHits() {
+        return hits.sum();
+    }
+
+    public long getMisses() {
+        return misses.sum();
+    }
+
+    public int getIdleCount() {
+        return idleCount.get();
+    }
+}
@@ -6,13 +6,17 @@ import java.util.List;
 public class BackendServer {
     private String host;
     private int port;
-    private boolean isHealthy;
+    private volatile boolean isHealthy; // Probe health (HealthCheckService)
+    private volatile boolean draining; // Being removed by the Autoscaler: no new traffic
     private long lastCheckTime;
     private int successfulChecks;
     private int failedChecks;
     private int consecutiveFailures;
+    private int consecutiveSuccesses;
     private List<Long> failureTimestamps;
     private java.util.concurrent.atomic.AtomicInteger requestCount;
+    // Failed forwarding attempts to this backend (connect errors), for the metrics feed
+    private java.util.concurrent.atomic.AtomicInteger errorCount;
     private java.util.concurrent.atomic.AtomicInteger activeRequests;
 
     // Metrics
@@ -22,8 +26,26 @@ public class BackendServer {
     private long minRPSTimestamp;
 
     private int previousRequestCount;
-    private long minLatency;
-    private long maxLatency;
+    private final java.util.concurrent.atomic.AtomicLong minLatency;
+    private final java.util.concurrent.atomic.AtomicLong maxLatency;
+
+    // Peak-EWMA latency (ms), stored as double bits so updates are a CAS loop instead of a lock
+    private static final double EWMA_DECAY_MS = Long.getLong("lb.ewma.decayMs", 10000);
+    private final java.util.concurrent.atomic.AtomicLong ewmaBits;
+    private final java.util.concurrent.atomic.AtomicLong ewmaStamp;
+
+    // Last LATENCY_WINDOW samples (ms) for percentiles; slots are overwritten round-robin
+    private static final int LATENCY_WINDOW = 128;
+    private final java.util.concurrent.atomic.AtomicLongArray latencyWindow;
+    private final java.util.concurrent.atomic.AtomicLong latencySamples;
+
+    private final BackendConnectionPool connectionPool;
+    private final OutlierDetector.State outlierState = new OutlierDetector.State();
+
+    // Bumped whenever any server's health or the server set changes, so
+    // strategies can cache per-topology state and skip rescanning the list
+    private static final java.util.concurrent.atomic.AtomicLong topologyVersion =
+            new java.util.concurrent.atomic.AtomicLong();
 
     public BackendServer(String host, int port) {
         this.host = host;
@@ -34,8 +56,8 @@ public class BackendServer {
         this.failedChecks = 0;
         this.consecutiveFailures = 0;
         this.failureTimestamps = new ArrayList<>();
-        this.failureTimestamps = new ArrayList<>();
         this.requestCount = new java.util.concurrent.atomic.AtomicInteger(0);
+        this.errorCount = new java.util.concurrent.atomic.AtomicInteger(0);
         this.activeRequests = new java.util.concurrent.atomic.AtomicInteger(0);
 
         this.maxRPS = 0;
@@ -44,8 +66,16 @@ public class BackendServer {
         this.minRPSTimestamp = 0;
 
         this.previousRequestCount = 0;
-        this.minLatency = -1;
-        this.maxLatency = 0;
+        this.minLatency = new java.util.concurrent.atomic.AtomicLong(-1);
+        this.maxLatency = new java.util.concurrent.atomic.AtomicLong(0);
+
+        this.ewmaBits = new java.util.concurrent.atomic.AtomicLong(Double.doubleToRawLongBits(0.0));
+        this.ewmaStamp = new java.util.concurrent.atomic.AtomicLong(System.nanoTime());
+        this.latencyWindow = new java.util.concurrent.atomic.AtomicLongArray(LATENCY_WINDOW);
+        this.latencySamples = new java.util.concurrent.atomic.AtomicLong(0);
+
+        // Last: the pool may start pre-warming right away
+        this.connectionPool = new BackendConnectionPool(this);
     }
 
     public String getHost() {
@@ -56,12 +86,60 @@ public class BackendServer {
         return port;
     }
 
+    /** Whether traffic may be sent here: probe-healthy and not ejected by the outlier detector. */
     public boolean isHealthy() {
+        return isHealthy && !draining && OutlierDetector.isAvailable(this);
+    }
+
+    /**
+     * Probe-healthy and not draining, ignoring outlier ejection. Changes to this
+     * always bump the topology version, so strategies can cache it.
+     */
+    public boolean isInRotation() {
+        return isHealthy && !draining;
+    }
+
+    /** Health as seen by the active probes alone. */
+    public boolean isProbeHealthy() {
         return isHealthy;
     }
 
+    public boolean isDraining() {
+        return draining;
+    }
+
+    public void setDraining(boolean draining) {
+        this.draining = draining;
+        bumpTopologyVersion();
+    }
+
+    public OutlierDetector.State getOutlierState() {
+        return outlierState;
+    }
+
     public void setHealthy(boolean healthy) {
+        boolean wasHealthy = this.isHealthy;
         this.isHealthy = healthy;
+        if (wasHealthy != healthy) {
+            bumpTopologyVersion();
+        }
+        if (wasHealthy && !healthy) {
+            connectionPool.invalidate();
+        } else if (!wasHealthy && healthy) {
+            connectionPool.scheduleRefill();
+        }
+    }
+
+    public static long getTopologyVersion() {
+        return topologyVersion.get();
+    }
+
+    public static void bumpTopologyVersion() {
+        topologyVersion.incrementAndGet();
+    }
+
+    public BackendConnectionPool getConnectionPool() {
+        return connectionPool;
     }
 
     public long getLastCheckTime() {
@@ -104,7 +182,19 @@ public class BackendServer {
         this.consecutiveFailures = 0;
     }
 
-    public void addFailureTimestamp(long timestamp) {
+    public int getConsecutiveSuccesses() {
+        return consecutiveSuccesses;
+    }
+
+    public void incrementConsecutiveSuccesses() {
+        this.consecutiveSuccesses++;
+    }
+
+    public void resetConsecutiveSuccesses() {
+        this.consecutiveSuccesses = 0;
+    }
+
+    public synchronized void addFailureTimestamp(long timestamp) {
         failureTimestamps.add(timestamp);
         // Keep only last 50 failures to avoid memory growth
         if (failureTimestamps.size() > 50) {
@@ -112,7 +202,7 @@ public class BackendServer {
         }
     }
 
-    public List<Long> getFailureTimestamps() {
+    public synchronized List<Long> getFailureTimestamps() {
         return new ArrayList<>(failureTimestamps);
     }
 
@@ -124,6 +214,14 @@ public class BackendServer {
         return requestCount.get();
     }
 
+    public void incrementErrorCount() {
+        errorCount.incrementAndGet();
+    }
+
+    public int getErrorCount() {
+        return errorCount.get();
+    }
+
     public void incrementActiveRequests() {
         activeRequests.incrementAndGet();
     }
@@ -136,13 +234,65 @@ public class BackendServer {
         return activeRequests.get();
     }
 
-    public synchronized void recordLatency(long latency) {
-        if (minLatency == -1 || latency < minLatency) {
-            minLatency = latency;
+    public void recordLatency(long latency) {
+        minLatency.accumulateAndGet(latency, (cur, x) -> cur == -1 || x < cur ? x : cur);
+        maxLatency.accumulateAndGet(latency, Math::max);
+
+        long slot = latencySamples.getAndIncrement();
+        latencyWindow.set((int) (slot % LATENCY_WINDOW), latency);
+
+        updateEwma(latency);
+    }
+
+    // Peak-EWMA: a slower sample takes effect at once, faster ones pull the
+    // average down with a weight that grows with the time since the last update.
+    private void updateEwma(double sample) {
+        while (true) {
+            long bits = ewmaBits.get();
+            double ewma = Double.longBitsToDouble(bits);
+            long now = System.nanoTime();
+            long prev = ewmaStamp.get();
+            double next;
+            if (sample > ewma) {
+                next = sample;
+            } else {
+                double w = Math.exp(-Math.max(0, now - prev) / 1e6 / EWMA_DECAY_MS);
+                next = ewma * w + sample * (1 - w);
+            }
+            if (ewmaBits.compareAndSet(bits, Double.doubleToRawLongBits(next))) {
+                ewmaStamp.set(now);
+                return;
+            }
+        }
+    }
+
+    /**
+     * Peak-EWMA latency in ms, decayed towards zero for the time since the
+     * last sample so that a backend that stopped getting traffic after a slow
+     * spell is tried again.
+     */
+    public double getLatencyEwma() {
+        double ewma = Double.longBitsToDouble(ewmaBits.get());
+        long idleNanos = System.nanoTime() - ewmaStamp.get();
+        if (idleNanos <= 0) {
+            return ewma;
+        }
+        return ewma * Math.exp(-idleNanos / 1e6 / EWMA_DECAY_MS);
+    }
+
+    /** Latency (ms) at percentile `p` (0-100) over the last LATENCY_WINDOW samples, or -1 if none. */
+    public long getLatencyPercentile(double p) {
+        int n = (int) Math.min(latencySamples.get(), LATENCY_WINDOW);
+        if (n == 0) {
+            return -1;
         }
-        if (latency > maxLatency) {
-            maxLatency = latency;
+        long[] samples = new long[n];
+        for (int i = 0; i < n; i++) {
+            samples[i] = latencyWindow.get(i);
         }
+        java.util.Arrays.sort(samples);
+        int rank = (int) Math.ceil(p / 100.0 * n) - 1;
+        return samples[Math.max(0, Math.min(n - 1, rank))];
     }
 
     public synchronized void updateRPS(int currentRPS, long timestamp) {
@@ -174,10 +324,14 @@ public class BackendServer {
 
     @Override
     public String toString() {
-        String lastFail = failureTimestamps.isEmpty() ? "None"
-                : String.valueOf(failureTimestamps.get(failureTimestamps.size() - 1));
+        List<Long> failures = getFailureTimestamps();
+        String lastFail = failures.isEmpty() ? "None" : String.valueOf(failures.get(failures.size() - 1));
+        String health = !isHealthy ? "DOWN"
+                : draining ? "DRAINING" : outlierState.isEjected() ? "EJECTED" : "UP";
 
-        String latStr = (minLatency == -1) ? "N/A" : (minLatency + "-" + maxLatency + "ms");
+        String latStr = (minLatency.get() == -1) ? "N/A"
+                : (minLatency.get() + "-" + maxLatency.get() + "ms, EWMA " + String.format("%.1f", getLatencyEwma())
+                        + "ms, p99 " + getLatencyPercentile(99) + "ms");
 
         String rpsStr;
         if (minRPS == -1) {
@@ -187,12 +341,17 @@ public class BackendServer {
                     maxRPS + " (at " + formatTime(maxRPSTimestamp) + ")";
         }
 
-        return host + ":" + port + " [Health: " + (isHealthy ? "UP" : "DOWN") +
+        return host + ":" + port + " [Health: " + health +
                 ", Active: " + activeRequests.get() +
                 ", Req: " + requestCount.get() +
                 ", RPS Range: " + rpsStr +
                 ", Latency Range: " + latStr +
                 ", Fails: " + consecutiveFailures +
-                ", LastFail: " + lastFail + "]";
+                ", LastFail: " + lastFail +
+                (BackendConnectionPool.ENABLED
+                        ? ", Pool: " + connectionPool.getHits() + " hits/" + connectionPool.getMisses() + " misses/"
+                                + connectionPool.getIdleCount() + " idle"
+                        : "")
+                + "]";
     }
 }
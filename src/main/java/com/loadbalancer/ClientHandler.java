@@ -31,18 +31,27 @@ public class ClientHandler implements Runnable {
 
             if (targetServer == null) {
                 System.err.println("No backend servers available.");
+                MetricsReporter.recordNoBackend();
                 break;
             }
 
             try {
                 long startTime = System.currentTimeMillis();
-                try (Socket backendSocket = new Socket(targetServer.getHost(), targetServer.getPort())) {
+                // A pre-warmed connection skips the handshake; otherwise connect now
+                java.nio.channels.SocketChannel pooled = targetServer.getConnectionPool().acquire();
+                // Only a connect that succeeded counts as active; the finally also runs when it fails
+                boolean active = false;
+                try (Socket backendSocket = pooled != null ? pooled.socket()
+                        : new Socket(targetServer.getHost(), targetServer.getPort())) {
 
                     // Connection successful
                     targetServer.incrementRequestCount();
                     targetServer.incrementActiveRequests();
-                    System.out.println("Forwarding request to " + targetServer);
-                    System.out.flush(); // Force write to log file for real-time dashboard
+                    active = true;
+                    if (MetricsReporter.LOG_REQUESTS) {
+                        System.out.println("Forwarding request to " + targetServer);
+                        System.out.flush(); // Force write to log file for log-scraping dashboards
+                    }
 
                     // Forwarding via Thread Pool
                     java.util.concurrent.Future<?> f1 = threadPool.submit(
@@ -60,19 +69,26 @@ public class ClientHandler implements Runnable {
 
                     long duration = System.currentTimeMillis() - startTime;
                     targetServer.recordLatency(duration);
+                    OutlierDetector.recordSuccess(targetServer);
                     success = true;
                 } finally {
-                    targetServer.decrementActiveRequests();
+                    if (active) {
+                        targetServer.decrementActiveRequests();
+                    }
                 }
             } catch (IOException | InterruptedException e) {
                 System.err.println(
                         "❌ Failed to connect to " + targetServer + " (Attempt " + attempts + "/" + maxRetries + ")");
-                targetServer.setHealthy(false); // Mark unhealthy immediately
+                MetricsReporter.recordForwardError(targetServer);
+                OutlierDetector.recordFailure(targetServer); // Ejects after repeated failures
                 // Loop will continue to retry with a different server
             }
         }
 
-        if (!success) {
+        if (success) {
+            MetricsReporter.recordSuccess();
+        } else {
+            MetricsReporter.recordFailure();
             System.err.println("Failed to process request after " + maxRetries + " attempts.");
         }
 
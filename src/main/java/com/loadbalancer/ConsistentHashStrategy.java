@@ -1,35 +1,173 @@
 package com.loadbalancer;
 
+import java.util.Arrays;
+import java.util.IdentityHashMap;
 import java.util.List;
-import java.nio.charset.StandardCharsets;
-import java.security.MessageDigest;
+import java.util.Map;
+import java.util.concurrent.ConcurrentHashMap;
 
+/**
+ * Consistent hashing on a ring of virtual nodes.
+ *
+ * Every backend owns VNODES points on a 64-bit ring (a sorted long[]); a
+ * client IP maps to the first point at or after its hash, found by binary
+ * search. Unhealthy owners are skipped by walking on to the next point, so
+ * a backend going down only moves its own clients, and a backend joining
+ * only takes about 1/N of the keys from its neighbours.
+ *
+ * The ring covers every member regardless of health and is only rebuilt
+ * when membership changes. Points are cached per server, so a rebuild
+ * hashes just the new servers and merges them into the existing ring.
+ */
 public class ConsistentHashStrategy implements LoadBalancingStrategy {
+    private static final int VNODES = Integer.getInteger("lb.hash.vnodes", 160);
+
+    private static final class Ring {
+        final long[] points;
+        final BackendServer[] owners;
+        final List<BackendServer> source;
+        final int sourceSize;
+        final long version;
+
+        Ring(long[] points, BackendServer[] owners, List<BackendServer> source, int sourceSize, long version) {
+            this.points = points;
+            this.owners = owners;
+            this.source = source;
+            this.sourceSize = sourceSize;
+            this.version = version;
+        }
+    }
+
+    private static final Ring EMPTY = new Ring(new long[0], new BackendServer[0], null, -1, -1);
+
+    private volatile Ring ring = EMPTY;
+    private final Map<BackendServer, long[]> pointCache = new ConcurrentHashMap<>();
 
     @Override
     public BackendServer getNextServer(List<BackendServer> servers, String clientIp) {
-        if (servers.isEmpty()) {
+        if (servers == null || servers.isEmpty()) {
             return null;
         }
 
-        // Robust Stateless Hashing
-        try {
-            MessageDigest digest = MessageDigest.getInstance("SHA-256");
-            byte[] hash = digest.digest(clientIp.getBytes(StandardCharsets.UTF_8));
+        Ring r = currentRing(servers);
+        long[] points = r.points;
+        int n = points.length;
+        if (n == 0) {
+            return null;
+        }
 
-            // Convert first 4 bytes to integer
-            int hashInt = 0;
-            for (int i = 0; i < 4; i++) {
-                hashInt = (hashInt << 8) | (hash[i] & 0xFF);
+        int idx = Arrays.binarySearch(points, hash64(clientIp));
+        if (idx < 0) {
+            idx = -idx - 1;
+        }
+        // Walk clockwise past unhealthy owners
+        for (int i = 0; i < n; i++) {
+            BackendServer owner = r.owners[(idx + i) % n];
+            if (owner.isHealthy()) {
+                return owner;
             }
+        }
+
+        System.err.println("❌ No healthy backend servers available!");
+        return null;
+    }
+
+    private Ring currentRing(List<BackendServer> servers) {
+        Ring r = ring;
+        long version = BackendServer.getTopologyVersion();
+        if (r.source == servers && r.sourceSize == servers.size() && r.version == version) {
+            return r;
+        }
+        return rebuild(servers, version);
+    }
 
-            // Map to server index
-            int index = Math.abs(hashInt) % servers.size();
-            return servers.get(index);
+    private synchronized Ring rebuild(List<BackendServer> servers, long version) {
+        Ring old = ring;
+        BackendServer[] members = servers.toArray(new BackendServer[0]);
+
+        Map<BackendServer, Boolean> memberSet = new IdentityHashMap<>();
+        for (BackendServer server : members) {
+            memberSet.put(server, Boolean.TRUE);
+        }
+        Map<BackendServer, Boolean> onRing = new IdentityHashMap<>();
+        for (BackendServer owner : old.owners) {
+            onRing.put(owner, Boolean.TRUE);
+        }
+
+        // The version also moves on health changes, which don't affect the ring
+        long[] points = old.points;
+        BackendServer[] owners = old.owners;
+        if (onRing.size() != memberSet.size() || !onRing.keySet().equals(memberSet.keySet())) {
+            // Drop the points of servers that left...
+            int kept = 0;
+            for (BackendServer owner : owners) {
+                if (memberSet.containsKey(owner)) {
+                    kept++;
+                }
+            }
+            long[] keptPoints = new long[kept];
+            BackendServer[] keptOwners = new BackendServer[kept];
+            int k = 0;
+            for (int i = 0; i < owners.length; i++) {
+                if (memberSet.containsKey(owners[i])) {
+                    keptPoints[k] = points[i];
+                    keptOwners[k++] = owners[i];
+                }
+            }
+            points = keptPoints;
+            owners = keptOwners;
+
+            // ...and merge in the (cached or freshly hashed) points of the new ones
+            for (BackendServer server : members) {
+                if (!onRing.containsKey(server)) {
+                    long[] serverPoints = pointCache.computeIfAbsent(server, ConsistentHashStrategy::vnodePoints);
+                    long[] mergedPoints = new long[points.length + serverPoints.length];
+                    BackendServer[] mergedOwners = new BackendServer[mergedPoints.length];
+                    int a = 0, b = 0, m = 0;
+                    while (a < points.length || b < serverPoints.length) {
+                        if (b >= serverPoints.length || (a < points.length && points[a] <= serverPoints[b])) {
+                            mergedPoints[m] = points[a];
+                            mergedOwners[m++] = owners[a++];
+                        } else {
+                            mergedPoints[m] = serverPoints[b++];
+                            mergedOwners[m++] = server;
+                        }
+                    }
+                    points = mergedPoints;
+                    owners = mergedOwners;
+                }
+            }
+            pointCache.keySet().retainAll(memberSet.keySet());
+        }
+
+        Ring r = new Ring(points, owners, servers, members.length, version);
+        ring = r;
+        return r;
+    }
+
+    private static long[] vnodePoints(BackendServer server) {
+        long[] points = new long[VNODES];
+        String base = server.getHost() + ":" + server.getPort() + "#";
+        for (int i = 0; i < VNODES; i++) {
+            points[i] = hash64(base + i);
+        }
+        Arrays.sort(points);
+        return points;
+    }
 
-        } catch (Exception e) {
-            // Fallback to simple hash if SHA-256 fails (unlikely)
-            return servers.get(Math.abs(clientIp.hashCode()) % servers.size());
+    // FNV-1a over the UTF-16 chars, then the MurmurHash3 fmix64 finalizer to
+    // spread FNV's weak low bits across the whole ring. No allocation.
+    static long hash64(String s) {
+        long h = 0xcbf29ce484222325L;
+        for (int i = 0; i < s.length(); i++) {
+            h ^= s.charAt(i);
+            h *= 0x100000001b3L;
         }
+        h ^= h >>> 33;
+        h *= 0xff51afd7ed558ccdL;
+        h ^= h >>> 33;
+        h *= 0xc4ceb9fe1a85ec53L;
+        h ^= h >>> 33;
+        return h;
     }
 }
@@ -1,7 +1,12 @@
 package com.loadbalancer;
 
 import java.io.IOException;
-import java.net.Socket;
+import java.net.InetSocketAddress;
+import java.nio.ByteBuffer;
+import java.nio.channels.SelectionKey;
+import java.nio.channels.Selector;
+import java.nio.channels.SocketChannel;
+import java.nio.charset.StandardCharsets;
 import java.util.List;
 import java.util.concurrent.Executors;
 import java.util.concurrent.ScheduledExecutorService;
@@ -11,24 +16,31 @@ public class HealthCheckService {
     private final List<BackendServer> backendServers;
     private final ScheduledExecutorService scheduler = Executors.newScheduledThreadPool(1);
 
+    // Probe settings (-Dlb.health.*). All probes of a cycle run concurrently on
+    // one selector, so a cycle never takes longer than connect + read timeout.
+    private static final long INTERVAL_MS = Long.getLong("lb.health.intervalMs", 5000);
+    private static final int CONNECT_TIMEOUT_MS = Integer.getInteger("lb.health.connectTimeoutMs", 1000);
+    private static final int READ_TIMEOUT_MS = Integer.getInteger("lb.health.readTimeoutMs", 1000);
+    // "tcp" (connect only) or "http" (GET lb.health.path, expect 2xx/3xx)
+    private static final boolean HTTP_PROBE = "http".equals(System.getProperty("lb.health.mode", "tcp"));
+    private static final String HTTP_PATH = System.getProperty("lb.health.path", "/");
+    // Consecutive probe results needed to mark a server up / down
+    private static final int RISE = Integer.getInteger("lb.health.rise", 2);
+    private static final int FALL = Integer.getInteger("lb.health.fall", 2);
+
     public HealthCheckService(List<BackendServer> backendServers) {
         this.backendServers = backendServers;
     }
 
     public void start() {
         System.out.println("🩺 Health Check Service started...");
-        scheduler.scheduleAtFixedRate(this::checkHealth, 0, 5, TimeUnit.SECONDS);
+        scheduler.scheduleAtFixedRate(this::checkHealth, 0, INTERVAL_MS, TimeUnit.MILLISECONDS);
     }
 
     public void stop() {
         scheduler.shutdown();
     }
 
-    private long lastScaleTime = 0;
-    private int nextPort = 9084;
-    private static final int SCALE_COOLDOWN_MS = 20000;
-    private static final int RPS_THRESHOLD = 10;
-
     private void checkHealth() {
         BackendServer maxReqServer = null;
         BackendServer minReqServer = null;
@@ -38,32 +50,42 @@ public class HealthCheckService {
         long totalCurrentRPS = 0;
         int healthyServerCount = 0;
 
-        for (BackendServer server : backendServers) {
-            boolean isAlive = ping(server.getHost(), server.getPort());
+        BackendServer[] servers = backendServers.toArray(new BackendServer[0]);
+        boolean[] alive = probeAll(servers);
+
+        for (int i = 0; i < servers.length; i++) {
+            BackendServer server = servers[i];
+            boolean isAlive = alive[i];
 
             server.setLastCheckTime(System.currentTimeMillis());
 
             if (isAlive) {
                 server.incrementSuccessfulChecks();
                 server.resetConsecutiveFailures();
-                if (server.isHealthy())
-                    healthyServerCount++;
+                server.incrementConsecutiveSuccesses();
             } else {
                 server.incrementFailedChecks();
                 server.incrementConsecutiveFailures();
+                server.resetConsecutiveSuccesses();
                 server.addFailureTimestamp(System.currentTimeMillis());
             }
 
-            if (server.isHealthy() != isAlive) {
+            // Flip only after RISE/FALL consecutive agreeing probes
+            boolean healthy = server.isProbeHealthy();
+            if ((!healthy && isAlive && server.getConsecutiveSuccesses() >= RISE)
+                    || (healthy && !isAlive && server.getConsecutiveFailures() >= FALL)) {
                 System.out
                         .println("⚠️  Server " + server + " status changed to: " + (isAlive ? "HEALTHY" : "UNHEALTHY"));
                 server.setHealthy(isAlive);
+                MetricsReporter.healthChanged(server, isAlive);
             }
+            if (server.isHealthy())
+                healthyServerCount++;
 
             // Track Max/Min
             int count = server.getRequestCount();
             int prevCount = server.getPreviousRequestCount();
-            int currentRPS = (int) ((count - prevCount) / 5.0); // 5 sec interval
+            int currentRPS = (int) ((count - prevCount) / (INTERVAL_MS / 1000.0));
             if (currentRPS < 0)
                 currentRPS = 0; // Just in case
 
@@ -82,13 +104,9 @@ public class HealthCheckService {
             }
         }
 
-        // Auto-Scaling Logic
+        // Scaling decisions live in Autoscaler; this is just for the Stats line
         double avgRPS = (healthyServerCount > 0) ? (double) totalCurrentRPS / healthyServerCount : 0;
 
-        if (avgRPS > RPS_THRESHOLD && (System.currentTimeMillis() - lastScaleTime) > SCALE_COOLDOWN_MS) {
-            scaleUp(avgRPS);
-        }
-
         if (maxReqServer != null && minReqServer != null) {
             StringBuilder distribution = new StringBuilder();
             distribution.append("[");
@@ -108,35 +126,161 @@ public class HealthCheckService {
         }
     }
 
-    private void scaleUp(double avgRPS) {
-        System.out.println("🚀 High Load Detected (Avg RPS: " + String.format("%.2f", avgRPS) + "). Scaling up!");
+    // One in-flight probe: the channel, its deadline, and the HTTP exchange if any
+    private static final class Probe {
+        final int index;
+        final SocketChannel channel;
+        long deadline;
+        ByteBuffer request;
+        ByteBuffer response;
+
+        Probe(int index, SocketChannel channel, long deadline) {
+            this.index = index;
+            this.channel = channel;
+            this.deadline = deadline;
+        }
+    }
+
+    /** Probes every server at once; alive[i] is the result for servers[i]. */
+    private boolean[] probeAll(BackendServer[] servers) {
+        boolean[] alive = new boolean[servers.length];
+        Selector selector;
         try {
-            // Spawn new backend process
-            new ProcessBuilder("python3", "mock_server.py", String.valueOf(nextPort))
-                    .redirectErrorStream(true)
-                    .inheritIO() // Let it print to console if needed, or we might want to silence it
-                    .start();
+            selector = Selector.open();
+        } catch (IOException e) {
+            System.err.println("Health check skipped: " + e.getMessage());
+            return alive;
+        }
 
-            // Register it
-            BackendServer newServer = new BackendServer("localhost", nextPort);
-            // Give it a moment to start? No, health check will pick it up next cycle
-            backendServers.add(newServer);
+        try {
+            long start = System.currentTimeMillis();
+            for (int i = 0; i < servers.length; i++) {
+                SocketChannel channel = null;
+                try {
+                    channel = SocketChannel.open();
+                    channel.configureBlocking(false);
+                    Probe probe = new Probe(i, channel, start + CONNECT_TIMEOUT_MS);
+                    if (HTTP_PROBE) {
+                        probe.request = ByteBuffer.wrap(("GET " + HTTP_PATH + " HTTP/1.0\r\nHost: "
+                                + servers[i].getHost() + "\r\nConnection: close\r\n\r\n")
+                                .getBytes(StandardCharsets.US_ASCII));
+                        probe.response = ByteBuffer.allocate(64);
+                    }
+                    if (!channel.connect(new InetSocketAddress(servers[i].getHost(), servers[i].getPort()))) {
+                        channel.register(selector, SelectionKey.OP_CONNECT, probe);
+                    } else if (!HTTP_PROBE) {
+                        // Connected immediately (common on localhost)
+                        alive[i] = true;
+                        channel.close();
+                    } else {
+                        probe.deadline = start + READ_TIMEOUT_MS;
+                        channel.register(selector, SelectionKey.OP_WRITE, probe);
+                    }
+                } catch (IOException e) {
+                    closeQuietly(channel);
+                }
+            }
 
-            System.out.println("✅ Spawned new backend server on port " + nextPort);
+            while (!selector.keys().isEmpty()) {
+                long now = System.currentTimeMillis();
+                long nextDeadline = Long.MAX_VALUE;
+                for (SelectionKey key : selector.keys()) {
+                    Probe probe = (Probe) key.attachment();
+                    if (!key.isValid()) {
+                        continue; // Finished, deregistered on the next select
+                    }
+                    if (now >= probe.deadline) {
+                        finish(key, false, alive); // Timed out
+                    } else {
+                        nextDeadline = Math.min(nextDeadline, probe.deadline);
+                    }
+                }
+                selector.selectNow(); // Flush cancelled keys
+                if (selector.keys().isEmpty()) {
+                    break;
+                }
+                selector.select(Math.max(1, nextDeadline - now));
 
-            lastScaleTime = System.currentTimeMillis();
-            nextPort++;
+                for (SelectionKey key : selector.selectedKeys()) {
+                    Probe probe = (Probe) key.attachment();
+                    if (!key.isValid()) {
+                        continue;
+                    }
+                    try {
+                        if (key.isConnectable()) {
+                            probe.channel.finishConnect();
+                            if (!HTTP_PROBE) {
+                                finish(key, true, alive);
+                                continue;
+                            }
+                            probe.deadline = System.currentTimeMillis() + READ_TIMEOUT_MS;
+                            key.interestOps(SelectionKey.OP_WRITE);
+                        }
+                        if (key.isValid() && key.isWritable()) {
+                            probe.channel.write(probe.request);
+                            if (!probe.request.hasRemaining()) {
+                                key.interestOps(SelectionKey.OP_READ);
+                            }
+                        } else if (key.isValid() && key.isReadable()) {
+                            int n = probe.channel.read(probe.response);
+                            if (n < 0 || !probe.response.hasRemaining() || hasStatusLine(probe.response)) {
+                                finish(key, statusOk(probe.response), alive);
+                            }
+                        }
+                    } catch (IOException e) {
+                        finish(key, false, alive);
+                    }
+                }
+                selector.selectedKeys().clear();
+            }
+        } finally {
+            for (SelectionKey key : selector.keys()) {
+                closeQuietly((SocketChannel) key.channel());
+            }
+            try {
+                selector.close();
+            } catch (IOException e) {
+                // Nothing left to clean up
+            }
+        }
+        return alive;
+    }
 
-        } catch (IOException e) {
-            System.err.println("❌ Failed to scale up: " + e.getMessage());
+    private static void finish(SelectionKey key, boolean ok, boolean[] alive) {
+        Probe probe = (Probe) key.attachment();
+        alive[probe.index] = ok;
+        key.cancel();
+        closeQuietly(probe.channel);
+    }
+
+    private static boolean hasStatusLine(ByteBuffer response) {
+        for (int i = 0; i < response.position(); i++) {
+            if (response.get(i) == '\n') {
+                return true;
+            }
         }
+        return false;
     }
 
-    private boolean ping(String host, int port) {
-        try (Socket socket = new Socket(host, port)) {
-            return true;
-        } catch (IOException e) {
+    // "HTTP/1.x 2xx ..." or 3xx counts as healthy
+    private static boolean statusOk(ByteBuffer response) {
+        String head = new String(response.array(), 0, response.position(), StandardCharsets.US_ASCII);
+        if (!head.startsWith("HTTP/")) {
             return false;
         }
+        int space = head.indexOf(' ');
+        return space > 0 && head.length() > space + 1
+                && (head.charAt(space + 1) == '2' || head.charAt(space + 1) == '3');
+    }
+
+    private static void closeQuietly(SocketChannel channel) {
+        if (channel == null) {
+            return;
+        }
+        try {
+            channel.close();
+        } catch (IOException e) {
+            // Already closed
+        }
     }
 }
@@ -0,0 +1,42 @@
+package com.loadbalancer;
+
+import java.util.ArrayList;
+import java.util.List;
+
+// Pure least-connections (what AdaptiveStrategy used to do); kept as a baseline to compare against
+public class LeastConnectionsStrategy implements LoadBalancingStrategy {
+    private final RoundRobinStrategy roundRobin = new RoundRobinStrategy();
+
+    @Override
+    public BackendServer getNextServer(List<BackendServer> servers, String clientIp) {
+        if (servers == null || servers.isEmpty()) {
+            return null;
+        }
+
+        List<BackendServer> bestCandidates = new ArrayList<>();
+        int minActive = Integer.MAX_VALUE;
+        for (BackendServer server : servers) {
+            if (!server.isHealthy()) {
+                continue;
+            }
+            int active = server.getActiveRequests();
+            if (active < minActive) {
+                minActive = active;
+                bestCandidates.clear();
+                bestCandidates.add(server);
+            } else if (active == minActive) {
+                bestCandidates.add(server);
+            }
+        }
+
+        if (bestCandidates.isEmpty()) {
+            System.err.println("❌ No healthy backend servers available!");
+            return null;
+        }
+        if (bestCandidates.size() == 1) {
+            return bestCandidates.get(0);
+        }
+        // Round Robin among the tied servers
+        return roundRobin.getNextServer(bestCandidates, clientIp);
+    }
+}
@@ -51,7 +51,10 @@ public class LoadBalancer {
                             if (parts.length == 3) {
                                 String host = parts[1];
                                 int port = Integer.parseInt(parts[2]);
-                                backendServers.add(new BackendServer(host, port));
+                                BackendServer added = new BackendServer(host, port);
+                                backendServers.add(added);
+                                BackendServer.bumpTopologyVersion();
+                                MetricsReporter.backendAdded(added);
                                 System.out.println("✅ Added new backend: " + host + ":" + port);
                                 out.println("OK");
                             } else {
@@ -74,23 +77,49 @@ public class LoadBalancer {
 
         // LoadBalancingStrategy strategy = new RoundRobinStrategy();
         // Dynamic Strategy Selection
-        LoadBalancingStrategy strategy;
-        try {
-            Class<?> customClass = Class.forName("com.loadbalancer.CustomStrategy");
-            strategy = (LoadBalancingStrategy) customClass.getDeclaredConstructor().newInstance();
-            System.out.println("✨ Custom Strategy Loaded: " + customClass.getSimpleName());
-        } catch (Exception e) {
-            System.out.println("Using Default Adaptive Strategy (No Custom Strategy found)");
-            strategy = new AdaptiveStrategy();
+        // -Dlb.strategy picks a built-in strategy by name; otherwise CustomStrategy if present
+        LoadBalancingStrategy strategy = builtInStrategy(System.getProperty("lb.strategy"));
+        if (strategy != null) {
+            System.out.println("Using Strategy: " + strategy.getClass().getSimpleName());
+        } else {
+            try {
+                Class<?> customClass = Class.forName("com.loadbalancer.CustomStrategy");
+                strategy = (LoadBalancingStrategy) customClass.getDeclaredConstructor().newInstance();
+                System.out.println("✨ Custom Strategy Loaded: " + customClass.getSimpleName());
+            } catch (Exception e) {
+                System.out.println("Using Default Adaptive Strategy (No Custom Strategy found)");
+                strategy = new AdaptiveStrategy();
+            }
         }
 
+        // Structured metrics for the dashboards (replaces per-request log scraping)
+        MetricsReporter.start(backendServers);
+        // Passive health from live traffic (-Dlb.outlier.enabled=false to disable)
+        OutlierDetector.start(backendServers);
+
         // Initialize and start Health Check Service
         HealthCheckService healthCheckService = new HealthCheckService(backendServers);
         healthCheckService.start();
 
+        // Adds/removes mock_server.py backends with load (-Dlb.autoscale=false to disable)
+        new Autoscaler(backendServers).start();
+
         System.out.println("Load Balancer starting on ports: 8080, 8081, 8082, 8083");
         System.out.println("Backend Servers: " + backendServers);
 
+        // Forwarding engine: thread-per-connection ClientHandler by default, -Dlb.engine=nio for
+        // the non-blocking selector loops (not yet proven under real traffic)
+        String engine = System.getProperty("lb.engine", "blocking");
+        if (engine.equals("nio")) {
+            int loops = Integer.getInteger("lb.nio.loops", Runtime.getRuntime().availableProcessors());
+            try {
+                new NioForwardingEngine(backendServers, strategy, loops).start(listeningPorts);
+                return;
+            } catch (IOException e) {
+                System.err.println("NIO engine failed to start (" + e.getMessage() + "), using blocking engine");
+            }
+        }
+
         // Optimizing with a Thread Pool
         java.util.concurrent.ExecutorService threadPool = java.util.concurrent.Executors.newCachedThreadPool();
 
@@ -113,4 +142,27 @@ public class LoadBalancer {
             }).start();
         }
     }
+
+    private static LoadBalancingStrategy builtInStrategy(String name) {
+        if (name == null) {
+            return null;
+        }
+        switch (name) {
+            case "adaptive":
+                return new AdaptiveStrategy();
+            case "least-connections":
+                return new LeastConnectionsStrategy();
+            case "round-robin":
+                return new RoundRobinStrategy();
+            case "p2c":
+                return new PowerOfTwoChoicesStrategy();
+            case "consistent-hash":
+                return new ConsistentHashStrategy();
+            case "custom":
+                return null;
+            default:
+                System.err.println("Unknown strategy '" + name + "', falling back to CustomStrategy");
+                return null;
+        }
+    }
 }
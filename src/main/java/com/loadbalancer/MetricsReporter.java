@@ -0,0 +1,227 @@
+package com.loadbalancer;
+
+import java.io.IOException;
+import java.net.DatagramPacket;
+import java.net.DatagramSocket;
+import java.net.InetAddress;
+import java.net.SocketAddress;
+import java.nio.charset.StandardCharsets;
+import java.util.Collections;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.ArrayBlockingQueue;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.atomic.LongAdder;
+
+/**
+ * Structured metrics feed for the dashboards (web_server.py, visualizer.py).
+ *
+ * Consumers send a "SUBSCRIBE" datagram to the metrics port (default 9998,
+ * localhost only) and repeat it every few seconds; subscribers that go quiet
+ * for SUBSCRIBER_TTL_MS are dropped. Each subscriber then receives one
+ * newline-terminated JSON object per datagram:
+ *
+ *   {"type":"snapshot", "ts":..., "seq":..., "total":..., "success":..., "failed":...,
+ *    "forward_errors":..., "backends":[{"host":..., "port":..., "healthy":..., "requests":..., "errors":..., "active":...}]}
+ *   {"type":"event", "ts":..., "event":"health" | "no_backend" | "forward_error" | ..., ...}
+ *
+ * Snapshots carry cumulative counters, so a lost datagram costs nothing but
+ * freshness. Request handlers only bump counters or enqueue an event; all
+ * socket I/O happens on the reporter thread.
+ */
+public class MetricsReporter {
+    private static final int PORT = Integer.getInteger("lb.metrics.port", 9998);
+    private static final long INTERVAL_MS = Long.getLong("lb.metrics.intervalMs", 500);
+    private static final long SUBSCRIBER_TTL_MS = 10000;
+    private static final int MAX_PENDING_EVENTS = 1024;
+
+    // Per-request "Forwarding request to ..." lines, off unless -Dlb.logRequests=true
+    public static final boolean LOG_REQUESTS = Boolean.getBoolean("lb.logRequests");
+
+    private static final LongAdder success = new LongAdder();
+    private static final LongAdder failed = new LongAdder();
+    private static final LongAdder forwardErrors = new LongAdder();
+    private static final AtomicLong droppedEvents = new AtomicLong();
+    private static final AtomicLong seq = new AtomicLong();
+
+    private static final ArrayBlockingQueue<String> events = new ArrayBlockingQueue<>(MAX_PENDING_EVENTS);
+    private static final Map<SocketAddress, Long> subscribers = new ConcurrentHashMap<>();
+    private static volatile List<BackendServer> backendServers = Collections.emptyList();
+    private static DatagramSocket socket;
+
+    private MetricsReporter() {
+    }
+
+    public static synchronized void start(List<BackendServer> servers) {
+        if (socket != null) {
+            return;
+        }
+        backendServers = servers;
+        try {
+            socket = new DatagramSocket(PORT, InetAddress.getLoopbackAddress());
+        } catch (IOException e) {
+            System.err.println("Metrics feed disabled (port " + PORT + "): " + e.getMessage());
+            return;
+        }
+        System.out.println("📡 Metrics feed on udp://localhost:" + PORT);
+
+        Thread receiver = new Thread(MetricsReporter::receiveLoop, "metrics-subscribe");
+        receiver.setDaemon(true);
+        receiver.start();
+
+        Thread sender = new Thread(MetricsReporter::sendLoop, "metrics-send");
+        sender.setDaemon(true);
+        sender.start();
+    }
+
+    // --- Hot path: counters and bounded event queue only ---
+
+    public static void recordSuccess() {
+        success.increment();
+    }
+
+    public static void recordFailure() {
+        failed.increment();
+    }
+
+    public static void recordForwardError(BackendServer server) {
+        forwardErrors.increment();
+        server.incrementErrorCount();
+        event("forward_error", "\"backend\":" + quote(server.getHost() + ":" + server.getPort()));
+    }
+
+    public static void recordNoBackend() {
+        event("no_backend", null);
+    }
+
+    public static void healthChanged(BackendServer server, boolean healthy) {
+        event("health", "\"backend\":" + quote(server.getHost() + ":" + server.getPort())
+                + ",\"healthy\":" + healthy);
+    }
+
+    public static void backendAdded(BackendServer server) {
+        event("backend_added", "\"backend\":" + quote(server.getHost() + ":" + server.getPort()));
+    }
+
+    /** Queues an event; `fields` is a JSON fragment ("\"k\":v,...") or null. */
+    public static void event(String name, String fields) {
+        if (subscribers.isEmpty()) {
+            return;
+        }
+        String json = "{\"type\":\"event\",\"ts\":" + System.currentTimeMillis()
+                + ",\"event\":" + quote(name) + (fields != null ? "," + fields : "") + "}\n";
+        if (!events.offer(json)) {
+            droppedEvents.incrementAndGet();
+        }
+    }
+
+    // --- Reporter threads ---
+
+    private static void receiveLoop() {
+        byte[] buffer = new byte[256];
+        while (true) {
+            try {
+                DatagramPacket packet = new DatagramPacket(buffer, buffer.length);
+                socket.receive(packet);
+                String msg = new String(packet.getData(), 0, packet.getLength(), StandardCharsets.UTF_8).trim();
+                if (msg.equals("SUBSCRIBE")) {
+                    subscribers.put(packet.getSocketAddress(), System.currentTimeMillis());
+                } else if (msg.equals("UNSUBSCRIBE")) {
+                    subscribers.remove(packet.getSocketAddress());
+                }
+            } catch (IOException e) {
+                // Keep serving; a bad datagram shouldn't stop the feed
+            }
+        }
+    }
+
+    private static void sendLoop() {
+        long nextSnapshot = System.currentTimeMillis();
+        while (true) {
+            try {
+                long wait = nextSnapshot - System.currentTimeMillis();
+                String event = wait > 0 ? events.poll(wait, TimeUnit.MILLISECONDS) : null;
+                if (event != null) {
+                    broadcast(event);
+                    continue;
+                }
+                long now = System.currentTimeMillis();
+                if (now < nextSnapshot) {
+                    continue;
+                }
+                nextSnapshot = now + INTERVAL_MS;
+                subscribers.values().removeIf(seen -> now - seen > SUBSCRIBER_TTL_MS);
+                if (!subscribers.isEmpty()) {
+                    broadcast(snapshotJson(now));
+                }
+            } catch (InterruptedException e) {
+                return;
+            } catch (Exception e) {
+                // Never let one bad send kill the reporter
+            }
+        }
+    }
+
+    private static void broadcast(String json) {
+        byte[] data = json.getBytes(StandardCharsets.UTF_8);
+        for (SocketAddress subscriber : subscribers.keySet()) {
+            try {
+                socket.send(new DatagramPacket(data, data.length, subscriber));
+            } catch (IOException e) {
+                subscribers.remove(subscriber);
+            }
+        }
+    }
+
+    private static String snapshotJson(long now) {
+        long ok = success.sum();
+        long bad = failed.sum();
+        StringBuilder sb = new StringBuilder(256);
+        sb.append("{\"type\":\"snapshot\",\"ts\":").append(now)
+                .append(",\"seq\":").append(seq.incrementAndGet())
+                .append(",\"total\":").append(ok + bad)
+                .append(",\"success\":").append(ok)
+                .append(",\"failed\":").append(bad)
+                .append(",\"forward_errors\":").append(forwardErrors.sum())
+                .append(",\"dropped_events\":").append(droppedEvents.get())
+                .append(",\"backends\":[");
+        boolean first = true;
+        for (BackendServer server : backendServers) {
+            if (!first) {
+                sb.append(',');
+            }
+            first = false;
+            sb.append("{\"host\":").append(quote(server.getHost()))
+                    .append(",\"port\":").append(server.getPort())
+                    .append(",\"healthy\":").append(server.isHealthy())
+                    .append(",\"ejected\":").append(server.getOutlierState().isEjected())
+                    .append(",\"draining\":").append(server.isDraining())
+                    .append(",\"requests\":").append(server.getRequestCount())
+                    .append(",\"errors\":").append(server.getErrorCount())
+                    .append(",\"active\":").append(server.getActiveRequests())
+                    .append(",\"pool_hits\":").append(server.getConnectionPool().getHits())
+                    .append(",\"pool_misses\":").append(server.getConnectionPool().getMisses())
+                    .append(",\"pool_idle\":").append(server.getConnectionPool().getIdleCount())
+                    .append('}');
+        }
+        sb.append("]}\n");
+        return sb.toString();
+    }
+
+    private static String quote(String s) {
+        StringBuilder sb = new StringBuilder(s.length() + 2).append('"');
+        for (int i = 0; i < s.length(); i++) {
+            char c = s.charAt(i);
+            if (c == '"' || c == '\\') {
+                sb.append('\\').append(c);
+            } else if (c < 0x20) {
+                sb.append(String.format("\\u%04x", (int) c));
+            } else {
+                sb.append(c);
+            }
+        }
+        return sb.append('"').toString();
+    }
+}
@@ -0,0 +1,395 @@
+package com.loadbalancer;
+
+import java.io.IOException;
+import java.net.InetSocketAddress;
+import java.nio.ByteBuffer;
+import java.nio.channels.ClosedChannelException;
+import java.nio.channels.SelectionKey;
+import java.nio.channels.Selector;
+import java.nio.channels.ServerSocketChannel;
+import java.nio.channels.SocketChannel;
+import java.util.ArrayDeque;
+import java.util.Iterator;
+import java.util.List;
+import java.util.concurrent.ConcurrentLinkedQueue;
+
+/**
+ * Non-blocking forwarding core: one acceptor thread plus a fixed set of
+ * selector loops (one per core by default, -Dlb.nio.loops). Each client
+ * connection and its backend connection live on a single loop, so a
+ * connection costs two channels and two pooled direct buffers instead of
+ * three threads.
+ *
+ * Backend selection goes through the same LoadBalancingStrategy as the
+ * blocking ClientHandler, with the same retry-on-connect-failure behaviour.
+ */
+public class NioForwardingEngine {
+    private static final int BUFFER_SIZE = Integer.getInteger("lb.nio.bufferSize", 16 * 1024);
+    // Idle buffers each loop keeps around for reuse
+    private static final int MAX_POOLED_BUFFERS = 256;
+    private static final int MAX_ATTEMPTS = 3;
+    // Pause after a failed accept (e.g. EMFILE) so the acceptor doesn't spin on a backlog it can't take
+    private static final long ACCEPT_BACKOFF_MS = 100;
+
+    private final List<BackendServer> backendServers;
+    private final LoadBalancingStrategy strategy;
+    private final EventLoop[] loops;
+    private int nextLoop = 0;
+
+    public NioForwardingEngine(List<BackendServer> backendServers, LoadBalancingStrategy strategy, int loopCount) {
+        this.backendServers = backendServers;
+        this.strategy = strategy;
+        this.loops = new EventLoop[Math.max(1, loopCount)];
+    }
+
+    public void start(int[] ports) throws IOException {
+        for (int i = 0; i < loops.length; i++) {
+            loops[i] = new EventLoop(i);
+            loops[i].start();
+        }
+
+        Selector acceptSelector = Selector.open();
+        for (int port : ports) {
+            try {
+                ServerSocketChannel server = ServerSocketChannel.open();
+                server.bind(new InetSocketAddress(port), 1024);
+                server.configureBlocking(false);
+                server.register(acceptSelector, SelectionKey.OP_ACCEPT);
+                System.out.println("Listening on port " + port);
+            } catch (IOException e) {
+                System.err.println("Error on port " + port + ": " + e.getMessage());
+            }
+        }
+
+        Thread acceptor = new Thread(() -> acceptLoop(acceptSelector), "nio-acceptor");
+        acceptor.start();
+        System.out.println("⚡ NIO engine started with " + loops.length + " event loop(s)");
+    }
+
+    private void acceptLoop(Selector selector) {
+        while (true) {
+            try {
+                selector.select();
+                Iterator<SelectionKey> it = selector.selectedKeys().iterator();
+                while (it.hasNext()) {
+                    SelectionKey key = it.next();
+                    it.remove();
+                    ServerSocketChannel server = (ServerSocketChannel) key.channel();
+                    SocketChannel client;
+                    // Drain the backlog in one go
+                    while ((client = server.accept()) != null) {
+                        client.configureBlocking(false);
+                        client.socket().setTcpNoDelay(true);
+                        loops[nextLoop].add(client);
+                        nextLoop = (nextLoop + 1) % loops.length;
+                    }
+                }
+            } catch (IOException e) {
+                System.err.println("Accept error: " + e.getMessage());
+                // Out of descriptors: the pending connection stays queued, so wait for one to free up
+                try {
+                    Thread.sleep(ACCEPT_BACKOFF_MS);
+                } catch (InterruptedException ie) {
+                    Thread.currentThread().interrupt();
+                    return;
+                }
+            }
+        }
+    }
+
+    /** One selector thread owning a set of connections and a buffer pool. */
+    private final class EventLoop extends Thread {
+        private final Selector selector;
+        private final ConcurrentLinkedQueue<SocketChannel> incoming = new ConcurrentLinkedQueue<>();
+        private final ArrayDeque<ByteBuffer> bufferPool = new ArrayDeque<>();
+
+        EventLoop(int index) throws IOException {
+            super("nio-loop-" + index);
+            setDaemon(true);
+            this.selector = Selector.open();
+        }
+
+        void add(SocketChannel client) {
+            incoming.add(client);
+            selector.wakeup();
+        }
+
+        @Override
+        public void run() {
+            while (true) {
+                try {
+                    selector.select();
+                    SocketChannel client;
+                    while ((client = incoming.poll()) != null) {
+                        Connection conn = new Connection(this, client);
+                        try {
+                            conn.connectBackend();
+                        } catch (RuntimeException e) {
+                            System.err.println("Error opening connection: " + e);
+                            conn.abort();
+                        }
+                    }
+                    Iterator<SelectionKey> it = selector.selectedKeys().iterator();
+                    while (it.hasNext()) {
+                        SelectionKey key = it.next();
+                        it.remove();
+                        Connection conn = (Connection) key.attachment();
+                        // A bug in one connection must not take down every connection on this loop
+                        try {
+                            conn.handle(key);
+                        } catch (RuntimeException e) {
+                            System.err.println("Error handling connection: " + e);
+                            conn.abort();
+                        }
+                    }
+                } catch (IOException e) {
+                    System.err.println("Event loop error: " + e.getMessage());
+                }
+            }
+        }
+
+        ByteBuffer takeBuffer() {
+            ByteBuffer buffer = bufferPool.poll();
+            return buffer != null ? buffer : ByteBuffer.allocateDirect(BUFFER_SIZE);
+        }
+
+        void returnBuffer(ByteBuffer buffer) {
+            if (buffer != null && bufferPool.size() < MAX_POOLED_BUFFERS) {
+                buffer.clear();
+                bufferPool.push(buffer);
+            }
+        }
+    }
+
+    /**
+     * A proxied client/backend pair. Buffers stay in fill mode between events:
+     * `up` holds client bytes not yet written to the backend, `down` holds
+     * backend bytes not yet written to the client. A side is only read while
+     * its buffer has room, which is what applies backpressure.
+     */
+    private final class Connection {
+        private final EventLoop loop;
+        private final SocketChannel client;
+        private final String clientIp;
+        private SocketChannel backend;
+        private BackendServer server;
+        private SelectionKey clientKey;
+        private SelectionKey backendKey;
+        private ByteBuffer up;
+        private ByteBuffer down;
+        private boolean connected;
+        private boolean clientEof;
+        private boolean backendEof;
+        private boolean upShut;
+        private boolean downShut;
+        private boolean closed;
+        private int attempts;
+        private long startTime;
+
+        Connection(EventLoop loop, SocketChannel client) {
+            this.loop = loop;
+            this.client = client;
+            this.clientIp = client.socket().getInetAddress().getHostAddress();
+        }
+
+        void connectBackend() {
+            while (attempts < MAX_ATTEMPTS) {
+                attempts++;
+                server = strategy.getNextServer(backendServers, clientIp);
+                if (server == null) {
+                    System.err.println("No backend servers available.");
+                    MetricsReporter.recordNoBackend();
+                    break;
+                }
+                try {
+                    startTime = System.currentTimeMillis();
+                    backend = server.getConnectionPool().acquire();
+                    if (backend != null) {
+                        backend.configureBlocking(false);
+                        onConnected();
+                        return;
+                    }
+                    backend = SocketChannel.open();
+                    backend.configureBlocking(false);
+                    backend.socket().setTcpNoDelay(true);
+                    if (backend.connect(new InetSocketAddress(server.getHost(), server.getPort()))) {
+                        onConnected();
+                    } else {
+                        backendKey = backend.register(loop.selector, SelectionKey.OP_CONNECT, this);
+                    }
+                    return;
+                } catch (IOException e) {
+                    connectFailed();
+                }
+            }
+            MetricsReporter.recordFailure();
+            System.err.println("Failed to process request after " + MAX_ATTEMPTS + " attempts.");
+            closeQuietly(client);
+            closed = true;
+        }
+
+        private void connectFailed() {
+            System.err.println(
+                    "❌ Failed to connect to " + server + " (Attempt " + attempts + "/" + MAX_ATTEMPTS + ")");
+            MetricsReporter.recordForwardError(server);
+            OutlierDetector.recordFailure(server); // Ejects after repeated failures
+            if (backendKey != null) {
+                backendKey.cancel();
+                backendKey = null;
+            }
+            closeQuietly(backend);
+            backend = null;
+        }
+
+        private void onConnected() throws ClosedChannelException {
+            connected = true;
+            server.incrementRequestCount();
+            server.incrementActiveRequests();
+            if (MetricsReporter.LOG_REQUESTS) {
+                System.out.println("Forwarding request to " + server);
+                System.out.flush();
+            }
+            up = loop.takeBuffer();
+            down = loop.takeBuffer();
+            if (backendKey == null) {
+                backendKey = backend.register(loop.selector, 0, this);
+            }
+            clientKey = client.register(loop.selector, 0, this);
+            updateInterest();
+        }
+
+        void handle(SelectionKey key) {
+            if (closed || !key.isValid()) {
+                return;
+            }
+            try {
+                if (!connected) {
+                    if (key.isConnectable()) {
+                        try {
+                            backend.finishConnect();
+                        } catch (IOException e) {
+                            connectFailed();
+                            connectBackend();
+                            return;
+                        }
+                        onConnected();
+                    }
+                    return;
+                }
+
+                if (key == clientKey) {
+                    if (key.isReadable()) {
+                        clientEof |= client.read(up) < 0;
+                    }
+                    if (key.isWritable()) {
+                        flush(down, client);
+                    }
+                } else {
+                    if (key.isReadable()) {
+                        backendEof |= backend.read(down) < 0;
+                    }
+                    if (key.isWritable()) {
+                        flush(up, backend);
+                    }
+                }
+                // Write through straight away; most writes complete without OP_WRITE
+                flush(up, backend);
+                flush(down, client);
+
+                // Propagate half-closes once everything before the EOF is delivered
+                if (clientEof && !upShut && up.position() == 0) {
+                    backend.shutdownOutput();
+                    upShut = true;
+                }
+                if (backendEof && !downShut && down.position() == 0) {
+                    client.shutdownOutput();
+                    downShut = true;
+                }
+
+                if (upShut && downShut) {
+                    finish();
+                } else {
+                    updateInterest();
+                }
+            } catch (IOException e) {
+                // Connection reset or similar: like the blocking DataTransfer, just end it
+                finish();
+            }
+        }
+
+        private void flush(ByteBuffer buffer, SocketChannel target) throws IOException {
+            if (buffer.position() == 0) {
+                return;
+            }
+            buffer.flip();
+            target.write(buffer);
+            buffer.compact();
+        }
+
+        private void updateInterest() {
+            int clientOps = 0;
+            int backendOps = 0;
+            if (!clientEof && up.hasRemaining()) {
+                clientOps |= SelectionKey.OP_READ;
+            }
+            if (down.position() > 0) {
+                clientOps |= SelectionKey.OP_WRITE;
+            }
+            if (!backendEof && down.hasRemaining()) {
+                backendOps |= SelectionKey.OP_READ;
+            }
+            if (up.position() > 0) {
+                backendOps |= SelectionKey.OP_WRITE;
+            }
+            clientKey.interestOps(clientOps);
+            backendKey.interestOps(backendOps);
+        }
+
+        private void finish() {
+            if (closed) {
+                return;
+            }
+            closed = true;
+            long duration = System.currentTimeMillis() - startTime;
+            server.recordLatency(duration);
+            server.decrementActiveRequests();
+            OutlierDetector.recordSuccess(server);
+            MetricsReporter.recordSuccess();
+            closeQuietly(client);
+            closeQuietly(backend);
+            loop.returnBuffer(up);
+            loop.returnBuffer(down);
+            up = null;
+            down = null;
+        }
+
+        /** Tears the pair down after an unexpected error, counted as a failure. */
+        void abort() {
+            if (closed) {
+                return;
+            }
+            closed = true;
+            if (connected) {
+                server.decrementActiveRequests();
+            }
+            MetricsReporter.recordFailure();
+            closeQuietly(client);
+            closeQuietly(backend);
+            loop.returnBuffer(up);
+            loop.returnBuffer(down);
+            up = null;
+            down = null;
+        }
+    }
+
+    private static void closeQuietly(SocketChannel channel) {
+        if (channel == null) {
+            return;
+        }
+        try {
+            channel.close();
+        } catch (IOException e) {
+            // Already gone
+        }
+    }
+}
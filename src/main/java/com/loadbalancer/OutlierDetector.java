@@ -0,0 +1,287 @@
+package com.loadbalancer;
+
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Collections;
+import java.util.List;
+import java.util.concurrent.Executors;
+import java.util.concurrent.ScheduledExecutorService;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.concurrent.atomic.AtomicLongArray;
+
+/**
+ * Passive health: ejects backends based on what live traffic sees, between
+ * (and independently of) HealthCheckService probes.
+ *
+ * A backend is ejected when it
+ *  - fails CONSECUTIVE_ERRORS forwards in a row (checked on the request path),
+ *  - has a success rate over the last WINDOW_SECONDS that is an outlier among
+ *    its peers (mean - SR_STDEV_FACTOR * stdev) or below 1 - FAILURE_PERCENT,
+ *  - has a peak-EWMA latency LATENCY_FACTOR times the median of its peers.
+ *
+ * Ejections last BASE_EJECTION_MS, doubling for each repeat ejection up to
+ * MAX_EJECTION_MS (the count resets after MAX_EJECTION_MS without one). When
+ * an ejection ends the backend goes half-open: it takes at most
+ * HALF_OPEN_TRIALS concurrent requests, and the first outcome either
+ * restores it or ejects it again for longer. No more than MAX_EJECTION_PERCENT
+ * of backends (and never the last available one) are ejected at once.
+ */
+public class OutlierDetector {
+    public static final boolean ENABLED = !"false".equals(System.getProperty("lb.outlier.enabled"));
+    private static final int CONSECUTIVE_ERRORS = Integer.getInteger("lb.outlier.consecutiveErrors", 3);
+    private static final long BASE_EJECTION_MS = Long.getLong("lb.outlier.baseEjectionMs", 2000);
+    private static final long MAX_EJECTION_MS = Long.getLong("lb.outlier.maxEjectionMs", 60000);
+    private static final int MAX_EJECTION_PERCENT = Integer.getInteger("lb.outlier.maxEjectionPercent", 50);
+    private static final int HALF_OPEN_TRIALS = 1;
+
+    private static final int WINDOW_SECONDS = 10;
+    private static final int MIN_REQUESTS = Integer.getInteger("lb.outlier.minRequests", 20);
+    private static final int SR_MIN_HOSTS = 3;
+    private static final double SR_STDEV_FACTOR = 1.9;
+    private static final double FAILURE_PERCENT = 50;
+    private static final double LATENCY_FACTOR = 3.0;
+    // Latency ejection only kicks in above this, so microsecond noise can't eject anyone
+    private static final double LATENCY_MIN_MS = 50;
+    private static final long SWEEP_MS = 500;
+
+    private static volatile List<BackendServer> backendServers = Collections.emptyList();
+    private static ScheduledExecutorService sweeper;
+
+    /** Per-backend outcome tracking, owned by BackendServer. */
+    public static final class State {
+        private final AtomicInteger consecutiveErrors = new AtomicInteger();
+        // Per-second buckets, indexed by second % WINDOW_SECONDS
+        private final AtomicLongArray bucketSecond = new AtomicLongArray(WINDOW_SECONDS);
+        private final AtomicLongArray bucketOk = new AtomicLongArray(WINDOW_SECONDS);
+        private final AtomicLongArray bucketErr = new AtomicLongArray(WINDOW_SECONDS);
+        private volatile long ejectedUntil; // 0 = not ejected
+        private volatile boolean halfOpen;
+        private int ejectionCount;
+        private long lastRejoin;
+
+        private void record(boolean ok) {
+            long second = System.currentTimeMillis() / 1000;
+            int idx = (int) (second % WINDOW_SECONDS);
+            long stamp = bucketSecond.get(idx);
+            if (stamp != second && bucketSecond.compareAndSet(idx, stamp, second)) {
+                // First write into a recycled bucket clears it (racing writers may lose a count)
+                bucketOk.set(idx, 0);
+                bucketErr.set(idx, 0);
+            }
+            (ok ? bucketOk : bucketErr).incrementAndGet(idx);
+        }
+
+        // {ok, errors} over the last WINDOW_SECONDS
+        private long[] window() {
+            long oldest = System.currentTimeMillis() / 1000 - WINDOW_SECONDS + 1;
+            long ok = 0;
+            long err = 0;
+            for (int i = 0; i < WINDOW_SECONDS; i++) {
+                if (bucketSecond.get(i) >= oldest) {
+                    ok += bucketOk.get(i);
+                    err += bucketErr.get(i);
+                }
+            }
+            return new long[] { ok, err };
+        }
+
+        public boolean isEjected() {
+            return ejectedUntil != 0;
+        }
+    }
+
+    private OutlierDetector() {
+    }
+
+    public static synchronized void start(List<BackendServer> servers) {
+        if (!ENABLED || sweeper != null) {
+            return;
+        }
+        backendServers = servers;
+        sweeper = Executors.newSingleThreadScheduledExecutor(r -> {
+            Thread t = new Thread(r, "outlier-detector");
+            t.setDaemon(true);
+            return t;
+        });
+        sweeper.scheduleWithFixedDelay(OutlierDetector::sweep, SWEEP_MS, SWEEP_MS, TimeUnit.MILLISECONDS);
+    }
+
+    /** Whether traffic may go to `server` (ignoring probe health). */
+    static boolean isAvailable(BackendServer server) {
+        State state = server.getOutlierState();
+        if (state.ejectedUntil == 0) {
+            return true;
+        }
+        return state.halfOpen && server.getActiveRequests() < HALF_OPEN_TRIALS;
+    }
+
+    // --- Request path ---
+
+    public static void recordSuccess(BackendServer server) {
+        if (!ENABLED) {
+            return;
+        }
+        State state = server.getOutlierState();
+        state.consecutiveErrors.set(0);
+        state.record(true);
+        if (state.halfOpen) {
+            rejoin(server, state);
+        }
+    }
+
+    public static void recordFailure(BackendServer server) {
+        server.addFailureTimestamp(System.currentTimeMillis());
+        if (!ENABLED) {
+            // Old behaviour: a failed connect takes the server out until the next probe
+            server.setHealthy(false);
+            return;
+        }
+        State state = server.getOutlierState();
+        state.record(false);
+        int errors = state.consecutiveErrors.incrementAndGet();
+        if (state.halfOpen) {
+            eject(server, "failed half-open trial");
+        } else if (errors >= CONSECUTIVE_ERRORS && state.ejectedUntil == 0) {
+            eject(server, errors + " consecutive errors");
+        }
+    }
+
+    // --- Ejection bookkeeping (all transitions under the class lock) ---
+
+    private static synchronized void eject(BackendServer server, String reason) {
+        State state = server.getOutlierState();
+        if (state.ejectedUntil != 0 && !state.halfOpen) {
+            return;
+        }
+        long now = System.currentTimeMillis();
+
+        if (!state.halfOpen) {
+            List<BackendServer> servers = backendServers;
+            int total = servers.size();
+            int ejected = 0;
+            int available = 0;
+            for (BackendServer s : servers) {
+                if (s.getOutlierState().isEjected()) {
+                    ejected++;
+                } else if (s.isProbeHealthy()) {
+                    available++;
+                }
+            }
+            int maxEjected = Math.max(1, total * MAX_EJECTION_PERCENT / 100);
+            if (ejected >= maxEjected || available <= 1) {
+                return; // Keep enough capacity; probes still cover hard-down servers
+            }
+        }
+
+        if (now - state.lastRejoin > MAX_EJECTION_MS && !state.halfOpen) {
+            state.ejectionCount = 0;
+        }
+        state.ejectionCount++;
+        long duration = Math.min(MAX_EJECTION_MS, BASE_EJECTION_MS << Math.min(20, state.ejectionCount - 1));
+        state.ejectedUntil = now + duration;
+        state.halfOpen = false;
+        state.consecutiveErrors.set(0);
+        BackendServer.bumpTopologyVersion();
+
+        System.out.println("🚫 Ejected " + server.getHost() + ":" + server.getPort() + " for " + duration
+                + "ms (" + reason + ")");
+        MetricsReporter.event("outlier_ejected", "\"backend\":\"" + server.getHost() + ":" + server.getPort()
+                + "\",\"duration_ms\":" + duration);
+    }
+
+    private static synchronized void rejoin(BackendServer server, State state) {
+        if (!state.halfOpen) {
+            return;
+        }
+        state.halfOpen = false;
+        state.ejectedUntil = 0;
+        state.lastRejoin = System.currentTimeMillis();
+        BackendServer.bumpTopologyVersion();
+        System.out.println("✅ " + server.getHost() + ":" + server.getPort() + " rejoined after half-open trial");
+        MetricsReporter.event("outlier_rejoined", "\"backend\":\"" + server.getHost() + ":" + server.getPort() + "\"");
+    }
+
+    // --- Periodic analysis ---
+
+    private static void sweep() {
+        try {
+            long now = System.currentTimeMillis();
+            List<BackendServer> servers = backendServers;
+
+            // Expired ejections go half-open
+            for (BackendServer server : servers) {
+                State state = server.getOutlierState();
+                if (state.ejectedUntil != 0 && !state.halfOpen && now >= state.ejectedUntil) {
+                    synchronized (OutlierDetector.class) {
+                        state.halfOpen = true;
+                    }
+                    BackendServer.bumpTopologyVersion();
+                }
+            }
+
+            // Candidates: in rotation with enough recent traffic to judge
+            List<BackendServer> candidates = new ArrayList<>();
+            List<Double> rates = new ArrayList<>();
+            for (BackendServer server : servers) {
+                if (server.getOutlierState().isEjected() || !server.isProbeHealthy()) {
+                    continue;
+                }
+                long[] w = server.getOutlierState().window();
+                long volume = w[0] + w[1];
+                if (volume >= MIN_REQUESTS) {
+                    candidates.add(server);
+                    rates.add((double) w[0] / volume);
+                }
+            }
+
+            // Success rate: absolute floor, then relative to peers
+            double threshold = -1;
+            if (candidates.size() >= SR_MIN_HOSTS) {
+                double mean = 0;
+                for (double r : rates) {
+                    mean += r;
+                }
+                mean /= rates.size();
+                double var = 0;
+                for (double r : rates) {
+                    var += (r - mean) * (r - mean);
+                }
+                threshold = mean - SR_STDEV_FACTOR * Math.sqrt(var / rates.size());
+            }
+            for (int i = 0; i < candidates.size(); i++) {
+                double rate = rates.get(i);
+                if (rate < 1 - FAILURE_PERCENT / 100) {
+                    eject(candidates.get(i), String.format("success rate %.0f%%", rate * 100));
+                } else if (rate < threshold) {
+                    eject(candidates.get(i), String.format("success rate %.0f%% below peers (%.0f%%)",
+                            rate * 100, threshold * 100));
+                }
+            }
+
+            // Latency: slow-but-alive backends, compared with the median of the others
+            if (candidates.size() >= 3) {
+                double[] ewmas = new double[candidates.size()];
+                for (int i = 0; i < ewmas.length; i++) {
+                    ewmas[i] = candidates.get(i).getLatencyEwma();
+                }
+                for (int i = 0; i < ewmas.length; i++) {
+                    double[] others = new double[ewmas.length - 1];
+                    for (int j = 0, k = 0; j < ewmas.length; j++) {
+                        if (j != i) {
+                            others[k++] = ewmas[j];
+                        }
+                    }
+                    Arrays.sort(others);
+                    double median = others[others.length / 2];
+                    if (ewmas[i] > LATENCY_MIN_MS && ewmas[i] > LATENCY_FACTOR * median) {
+                        eject(candidates.get(i), String.format("latency %.0fms vs peer median %.0fms",
+                                ewmas[i], median));
+                    }
+                }
+            }
+        } catch (Exception e) {
+            System.err.println("Outlier sweep failed: " + e.getMessage());
+        }
+    }
+}
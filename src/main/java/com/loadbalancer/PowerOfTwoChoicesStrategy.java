@@ -0,0 +1,109 @@
+package com.loadbalancer;
+
+import java.util.List;
+import java.util.concurrent.ThreadLocalRandom;
+
+/**
+ * Power of two choices: sample two distinct healthy backends at random and
+ * send the connection to the one with fewer active requests.
+ *
+ * The servers in rotation (probe-healthy, not draining) are kept in an
+ * array snapshot that is only rebuilt when BackendServer's topology version
+ * changes, so the per-connection path is two random draws and two counter
+ * reads, with no allocation. Outlier ejection and half-open trial slots
+ * change with every request, so they are checked on the two picks instead.
+ */
+public class PowerOfTwoChoicesStrategy implements LoadBalancingStrategy {
+
+    private static final class Snapshot {
+        final List<BackendServer> source;
+        final int sourceSize;
+        final long version;
+        final BackendServer[] healthy;
+
+        Snapshot(List<BackendServer> source, int sourceSize, long version, BackendServer[] healthy) {
+            this.source = source;
+            this.sourceSize = sourceSize;
+            this.version = version;
+            this.healthy = healthy;
+        }
+    }
+
+    private volatile Snapshot snapshot;
+
+    @Override
+    public BackendServer getNextServer(List<BackendServer> servers, String clientIp) {
+        if (servers == null || servers.isEmpty()) {
+            return null;
+        }
+
+        BackendServer[] healthy = healthyServers(servers);
+        int n = healthy.length;
+        if (n == 0) {
+            System.err.println("❌ No healthy backend servers available!");
+            return null;
+        }
+        if (n == 1) {
+            return OutlierDetector.isAvailable(healthy[0]) ? healthy[0] : null;
+        }
+
+        ThreadLocalRandom random = ThreadLocalRandom.current();
+        int i = random.nextInt(n);
+        // Second pick from the other n-1 servers, so the two are always distinct
+        int j = random.nextInt(n - 1);
+        if (j >= i) {
+            j++;
+        }
+        BackendServer a = healthy[i];
+        BackendServer b = healthy[j];
+        boolean aAvailable = OutlierDetector.isAvailable(a);
+        boolean bAvailable = OutlierDetector.isAvailable(b);
+        if (aAvailable && bAvailable) {
+            return b.getActiveRequests() < a.getActiveRequests() ? b : a;
+        }
+        if (aAvailable) {
+            return a;
+        }
+        if (bAvailable) {
+            return b;
+        }
+        // Both picks ejected (or half-open and busy): take any server that isn't
+        for (BackendServer server : healthy) {
+            if (OutlierDetector.isAvailable(server)) {
+                return server;
+            }
+        }
+        return null;
+    }
+
+    private BackendServer[] healthyServers(List<BackendServer> servers) {
+        long version = BackendServer.getTopologyVersion();
+        int size = servers.size();
+        Snapshot current = snapshot;
+        if (current != null && current.source == servers && current.sourceSize == size
+                && current.version == version) {
+            return current.healthy;
+        }
+
+        // Rebuild; racing threads may both do this, which is harmless
+        int count = 0;
+        BackendServer[] all = servers.toArray(new BackendServer[0]);
+        for (BackendServer server : all) {
+            if (server.isInRotation()) {
+                count++;
+            }
+        }
+        BackendServer[] healthy = new BackendServer[count];
+        int k = 0;
+        for (BackendServer server : all) {
+            if (server.isInRotation() && k < count) {
+                healthy[k++] = server;
+            }
+        }
+        if (k < count) {
+            healthy = java.util.Arrays.copyOf(healthy, k);
+        }
+        snapshot = new Snapshot(servers, size, version, healthy);
+        return healthy;
+    }
+}
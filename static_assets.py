@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+
+try:
+    import brotli
+except ImportError: # Optional; gzip is always available
+    brotli = None
+
+# Dashboard files served from memory; anything else falls through to SimpleHTTPRequestHandler
+DEFAULT_ASSETS = ("index.html", "index_neon.html", "logo.png", "logo.svg")
+# Content types worth compressing (PNG is already compressed)
+COMPRESSIBLE = ("text/", "image/svg+xml", "application/javascript", "application/json")
+# Seconds between mtime checks per asset, so a burst of loads costs one stat()
+RECHECK_INTERVAL = 1.0
+
+
+class Asset:
+    """One file's bytes, precompressed variants and validators."""
+
+    def __init__(self, path):
+        st = os.stat(path)
+        with open(path, "rb") as f:
+            body = f.read()
+        self.path = path
+        self.mtime = st.st_mtime_ns
+        self.size = st.st_size
+        self.checked = time.monotonic()
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/"):
+            self.content_type += "; charset=utf-8"
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.last_modified = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(st.st_mtime))
+        self.variants = {"identity": body}
+        if self.content_type.startswith(COMPRESSIBLE):
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gz) < len(body):
+                self.variants["gzip"] = gz
+            if brotli is not None:
+                br = brotli.compress(body, quality=11)
+                if len(br) < len(body):
+                    self.variants["br"] = br
+        # Strong validators, one per representation: they change exactly when the bytes do
+        self.etags = {enc: f'"{digest}"' if enc == "identity" else f'"{digest}-{enc}"' for enc in self.variants}
+
+    def encoding_for(self, accept_encoding):
+        """Smallest variant the client accepts."""
+        accepted = parse_accept_encoding(accept_encoding)
+        best = "identity"
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.get(encoding, 0) > 0:
+                if len(self.variants[encoding]) < len(self.variants[best]):
+                    best = encoding
+        return best
+
+
+def parse_accept_encoding(header):
+    """{"gzip": 1.0, "br": 0.5, ...} from an Accept-Encoding header."""
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    if "*" in accepted:
+        for encoding in ("br", "gzip"):
+            accepted.setdefault(encoding, accepted["*"])
+    return accepted
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    tags = (t.strip() for t in if_none_match.split(","))
+    return any(t.removeprefix("W/") == etag for t in tags)
+
+
+class StaticAssetCache:
+    """Keeps the dashboard's static files in memory, ready to send.
+
+    Each file is read once, with gzip (and brotli when the module is
+    installed) variants and a strong ETag computed up front. A lookup stats
+    the file at most once per RECHECK_INTERVAL and reloads it when its mtime
+    or size changed, so edits show up without a restart.
+    """
+
+    def __init__(self, root=".", names=DEFAULT_ASSETS):
+        self.root = root
+        self.lock = threading.Lock()
+        self.assets = {}
+        for name in names:
+            self.assets[name] = self._load(name)
+
+    def _load(self, name):
+        try:
+            return Asset(os.path.join(self.root, name))
+        except OSError:
+            return None
+
+    def get(self, name):
+        """Asset for a request path like "/logo.png", or None if it isn't cached."""
+        name = name.split("?", 1)[0].split("#", 1)[0].lstrip("/")
+        if name not in self.assets:
+            return None
+        asset = self.assets[name]
+        now = time.monotonic()
+        if asset is not None and now - asset.checked < RECHECK_INTERVAL:
+            return asset
+        with self.lock:
+            asset = self.assets[name]
+            if asset is not None and now - asset.checked < RECHECK_INTERVAL:
+                return asset
+            try:
+                st = os.stat(os.path.join(self.root, name))
+            except OSError:
+                self.assets[name] = None
+                return None
+            if asset is None or st.st_mtime_ns != asset.mtime or st.st_size != asset.size:
+                asset = self._load(name)
+                self.assets[name] = asset
+            else:
+                asset.checked = now
+            return asset
@@ -0,0 +1,156 @@
+import array
+import re
+import threading
+import time
+
+# (bucket seconds, buckets kept): 1 hour of seconds, 1 day of minutes, 30 days of hours
+TIERS = ((1, 3600), (60, 1440), (3600, 720))
+# Per-backend series beyond this many backends are folded into "other"
+MAX_BACKENDS = 32
+OTHER_BACKEND = "other"
+
+WINDOW_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhd]?)$")
+WINDOW_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_window(value, default=300):
+    """Seconds from "300", "90s", "15m", "6h" or "7d"."""
+    if not value:
+        return default
+    match = WINDOW_RE.match(value.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid window: {value}")
+    return max(1, int(float(match.group(1)) * WINDOW_UNITS[match.group(2)]))
+
+
+class Tier:
+    """Ring of fixed-width buckets, one typed array per series.
+
+    Slot i holds bucket id `ids[i]` (its start time divided by the
+    resolution). A slot whose id is stale is empty, so gaps in sampling read
+    as zero traffic rather than as old data.
+    """
+
+    def __init__(self, resolution, capacity):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.ids = array.array("q", [-1]) * capacity
+        self.requests = array.array("q", [0]) * capacity
+        self.failed = array.array("q", [0]) * capacity
+        # Cumulative balancer total at the end of the bucket
+        self.totals = array.array("q", [0]) * capacity
+        self.backends = {}
+
+    def _slot(self, bucket):
+        i = bucket % self.capacity
+        if self.ids[i] != bucket:
+            self.ids[i] = bucket
+            self.requests[i] = 0
+            self.failed[i] = 0
+            self.totals[i] = 0
+            for series in self.backends.values():
+                series[i] = 0
+        return i
+
+    def add(self, now, requests, failed, total, backends):
+        i = self._slot(int(now // self.resolution))
+        self.requests[i] += requests
+        self.failed[i] += failed
+        self.totals[i] = total
+        for name, count in backends.items():
+            series = self.backends.get(name)
+            if series is None:
+                series = self.backends[name] = array.array("q", [0]) * self.capacity
+            series[i] += count
+
+    def query(self, start_bucket, end_bucket):
+        """Columns for buckets start..end inclusive; empty slots read as zero."""
+        first = max(start_bucket, end_bucket - self.capacity + 1)
+        columns = {"t": [], "requests": [], "failed": [], "total": [], "rps": []}
+        backends = {name: [] for name in self.backends}
+        # Cumulative totals carry across empty buckets; unknown before the first sample
+        last_total = None
+        for bucket in range(first, end_bucket + 1):
+            i = bucket % self.capacity
+            live = self.ids[i] == bucket
+            requests = self.requests[i] if live else 0
+            if live:
+                last_total = self.totals[i]
+            columns["t"].append(bucket * self.resolution)
+            columns["requests"].append(requests)
+            columns["failed"].append(self.failed[i] if live else 0)
+            columns["total"].append(last_total)
+            columns["rps"].append(requests / self.resolution)
+            for name, series in self.backends.items():
+                backends[name].append(series[i] if live else 0)
+        columns["backends"] = backends
+        return columns
+
+
+class StatsHistory:
+    """Per-second traffic buckets with 1-minute and 1-hour rollups.
+
+    `record()` takes cumulative balancer counters (as `current_stats()`
+    returns them) and adds the change since the previous sample to the
+    current bucket of every tier. Memory is fixed: each tier is a ring of
+    typed arrays sized up front. Rates come from the buckets, so they do not
+    depend on how often, or by how many clients, stats are polled.
+    """
+
+    def __init__(self, tiers=TIERS, max_backends=MAX_BACKENDS):
+        self.tiers = [Tier(resolution, capacity) for resolution, capacity in tiers]
+        self.max_backends = max_backends
+        self.lock = threading.Lock()
+        self._last = None
+
+    def record(self, stats, now=None):
+        now = time.time() if now is None else now
+        total = stats.get("total_requests", 0)
+        failed = stats.get("failed_requests", 0)
+        counts = stats.get("backend_counts", {})
+        source = stats.get("source")
+        with self.lock:
+            last = self._last
+            if last is None or total < last[0] or source != last[3]:
+                # First sample, counters reset, or a switch between feed and lb.log
+                # (which count from different baselines): nothing to attribute yet
+                self._last = (total, failed, dict(counts), source)
+                return
+            backends = {}
+            for name, count in counts.items():
+                delta = count - last[2].get(name, 0)
+                if delta > 0:
+                    backends[self._series_name(name)] = backends.get(self._series_name(name), 0) + delta
+            self._last = (total, failed, dict(counts), source)
+            for tier in self.tiers:
+                tier.add(now, total - last[0], max(0, failed - last[1]), total, backends)
+
+    def _series_name(self, name):
+        name = str(name)
+        known = self.tiers[0].backends
+        if name in known or len(known) < self.max_backends:
+            return name
+        return OTHER_BACKEND
+
+    def rps(self, seconds=1, now=None):
+        """Requests/sec over the last `seconds` complete one-second buckets."""
+        now = time.time() if now is None else now
+        tier = self.tiers[0]
+        end = int(now // tier.resolution) - 1
+        with self.lock:
+            requests = 0
+            for bucket in range(end - seconds + 1, end + 1):
+                i = bucket % tier.capacity
+                if tier.ids[i] == bucket:
+                    requests += tier.requests[i]
+        return requests / (seconds * tier.resolution)
+
+    def query(self, window, now=None):
+        """The last `window` seconds from the finest tier that covers them."""
+        now = time.time() if now is None else now
+        tier = next((t for t in self.tiers if t.resolution * t.capacity >= window), self.tiers[-1])
+        end = int(now // tier.resolution)
+        start = end - max(1, -(-window // tier.resolution)) + 1
+        with self.lock:
+            columns = tier.query(start, end)
+        return {"window": window, "resolution": tier.resolution, **columns}
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import threading
+import time
+
+
+class StatsBroadcaster:
+    """Fans one stats snapshot out to every /stats/stream subscriber.
+
+    A single background thread calls `snapshot_fn` at most `max_rate` times per
+    second, and only while someone is subscribed. Each change is encoded once
+    into a shared full frame and a delta frame (changed keys only). Subscribers
+    that keep up receive deltas; a subscriber that fell behind skips straight to
+    the latest full frame, so slow clients coalesce instead of queueing.
+    """
+
+    # Derived keys that jitter on every tick: on their own they trigger a push
+    # at most once per `volatile_interval`. Passive keys never trigger one, so
+    # an idle system stays quiet apart from keepalives.
+    VOLATILE_KEYS = ("rps",)
+    PASSIVE_KEYS = ("server_time",)
+
+    def __init__(self, snapshot_fn, max_rate=10.0, keepalive=15.0, volatile_interval=1.0):
+        self.snapshot_fn = snapshot_fn
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.keepalive = keepalive
+        self.volatile_interval = volatile_interval
+        self._last_publish = 0.0
+        self.cond = threading.Condition()
+        self.subscribers = 0
+        self.seq = 0
+        self.full_frame = None
+        self.delta_frame = None
+        self._last = {}
+        self._thread = None
+        # Per event loop: asyncio subscribers counted, and a future resolved on the next publish
+        self._loops = {}
+        self._loop_futures = {}
+
+    def _encode(self, event, seq, payload):
+        return f"event: {event}\nid: {seq}\ndata: {json.dumps(payload)}\n\n".encode()
+
+    def publish(self):
+        stats = self.snapshot_fn()
+        delta = {k: v for k, v in stats.items() if self._last.get(k) != v}
+        now = time.monotonic()
+        triggers = [k for k in delta if k not in self.PASSIVE_KEYS]
+        if self.full_frame is not None:
+            if not triggers:
+                return False
+            if all(k in self.VOLATILE_KEYS for k in triggers) and now - self._last_publish < self.volatile_interval:
+                return False
+        self._last = stats
+        self._last_publish = now
+
+        with self.cond:
+            self.seq += 1
+            self.full_frame = self._encode("snapshot", self.seq, stats)
+            self.delta_frame = self._encode("delta", self.seq, delta)
+            # One wake-up per loop, however many streams it serves
+            for loop in self._loops:
+                loop.call_soon_threadsafe(self._wake_loop, loop)
+        return True
+
+    def _wake_loop(self, loop):
+        with self.cond:
+            future = self._loop_futures.pop(loop, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.subscribers == 0:
+                    self.cond.wait()
+            started = time.monotonic()
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Error publishing stats: {e}")
+            elapsed = time.monotonic() - started
+            if elapsed < self.min_interval:
+                time.sleep(self.min_interval - elapsed)
+
+    def _join(self, loop):
+        with self.cond:
+            self.subscribers += 1
+            self._loops[loop] = self._loops.get(loop, 0) + 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self.cond.notify_all()
+
+    def _leave(self, loop):
+        with self.cond:
+            self.subscribers -= 1
+            self._loops[loop] -= 1
+            if not self._loops[loop]:
+                del self._loops[loop]
+                self._loop_futures.pop(loop, None)
+
+    def _publish_future(self, loop):
+        with self.cond:
+            future = self._loop_futures.get(loop)
+            if future is None:
+                future = self._loop_futures[loop] = loop.create_future()
+            return future
+
+    def _next_frame(self, last_seq):
+        """(seq, frame) to send after last_seq, or (last_seq, None) if nothing is new."""
+        with self.cond:
+            seq, full, delta = self.seq, self.full_frame, self.delta_frame
+        if full is None or seq == last_seq:
+            return last_seq, None
+        if last_seq is not None and seq == last_seq + 1:
+            return seq, delta
+        return seq, full
+
+    async def subscribe_async(self, write):
+        """Awaits write(frame_bytes) for every new frame until write raises (client gone).
+
+        Waiting costs no thread: every stream on a loop awaits one shared
+        future, which the publisher thread resolves when a new frame is ready.
+        """
+        loop = asyncio.get_running_loop()
+        self._join(loop)
+        last_seq = None
+        try:
+            while True:
+                # Taken before reading the frame, so a publish in between still wakes us
+                published = self._publish_future(loop)
+                seq, frame = self._next_frame(last_seq)
+                if frame is None:
+                    try:
+                        await asyncio.wait_for(asyncio.shield(published), self.keepalive)
+                    except asyncio.TimeoutError:
+                        await write(b": keepalive\n\n")
+                    continue
+                await write(frame)
+                last_seq = seq
+        finally:
+            self._leave(loop)
@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics_store import MetricsStore, SEGMENT_SECONDS
+
+
+class CompactedQueryTest(unittest.TestCase):
+    """A query after close() and compact() reads the minute rollup, not a recreated raw hour."""
+
+    def test_query_after_close_and_compact(self):
+        with tempfile.TemporaryDirectory() as root:
+            t0 = 1_700_000_000 - 1_700_000_000 % SEGMENT_SECONDS
+            store = MetricsStore(root)
+            for i in range(200):
+                store.record({"total_requests": 5 * i, "source": "feed"}, now=t0 + i)
+            store.close()
+            store.compact(now=t0 + 10 * 86400)
+
+            result = store.query(t0, t0 + SEGMENT_SECONDS)
+            self.assertEqual(result["backends"]["all"]["total_requests"], 995)
+            self.assertEqual(result, MetricsStore(root).query(t0, t0 + SEGMENT_SECONDS))
+
+
+if __name__ == "__main__":
+    unittest.main()
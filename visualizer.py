@@ -6,9 +6,14 @@ import threading
 import socket
 import select
 import subprocess
+import unicodedata
+from metrics_feed import MetricsFeed, describe_event
 
 # --- Configuration ---
-print_lock = threading.Lock()
+# Guards the counters below; held only for updates and snapshots, never while writing to the terminal
+state_lock = threading.Lock()
+# Redraws are capped at this rate no matter how fast log lines arrive
+MAX_FPS = 20
 # ANSI Colors
 RESET = "\033[0m"
 BOLD = "\033[1m"
@@ -37,41 +42,130 @@ last_activity_time = time.time()
 last_rps_time = time.time()
 last_request_count = 0
 current_rps = 0.0
-recent_logs = []
+recent_logs = [] # (style, message)
 MAX_LOGS = 5
 max_req_str = "N/A"
 min_req_str = "N/A"
+# Bumped on every state change; the renderer skips frames when it hasn't moved
+state_version = 0
+
+# Feed counters at the last reset; the dashboard shows counts since then
+feed_baseline = {"total": 0, "success": 0, "failed": 0, "backends": {}}
 
 # System Stats State
 cpu_usage = "..."
 load_avg = "..."
 
+def cell_width(ch):
+    """Terminal cells a code point takes: 0 for combining marks and joiners, 2 for wide (emoji, CJK)."""
+    if unicodedata.combining(ch) or unicodedata.category(ch) in ("Mn", "Me", "Cf"):
+        return 0
+    return 2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1
+
+
+class FrameBuffer:
+    """Character-cell frame buffer that only writes what changed.
+
+    Each frame is composed into `chars`/`styles` (one entry per cell), then
+    compared against the previous frame; changed cells are emitted with the
+    minimum cursor moves and style switches in a single buffered write. The
+    row lists are reused from frame to frame. A wide character fills its
+    cell and leaves "" in the next one, which the terminal covers with it.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.chars = [[" "] * width for _ in range(height)]
+        self.styles = [[""] * width for _ in range(height)]
+        # None forces every cell out on the first flush
+        self.prev_chars = [[None] * width for _ in range(height)]
+        self.prev_styles = [[None] * width for _ in range(height)]
+
+    def clear(self):
+        for row in self.chars:
+            row[:] = " " * self.width
+        for row in self.styles:
+            row[:] = [""] * self.width
+
+    def put(self, y, x, text, style=""):
+        # 1-based coordinates, like the ANSI cursor; text is clipped to the frame
+        y -= 1
+        x -= 1
+        if y < 0 or y >= self.height or x >= self.width:
+            return
+        chars = self.chars[y]
+        styles = self.styles[y]
+        for ch in text:
+            w = cell_width(ch)
+            if w == 0:
+                continue # Combining marks and variation selectors would shift the row
+            if x + w > self.width:
+                break
+            # Don't leave half of a wide character that is being overwritten
+            if chars[x] == "":
+                chars[x - 1] = " "
+            if x + w < self.width and chars[x + w] == "":
+                chars[x + w] = " "
+            chars[x] = ch
+            styles[x] = style
+            if w == 2:
+                chars[x + 1] = ""
+                styles[x + 1] = style
+            x += w
+
+    def flush(self, out):
+        parts = []
+        cur_style = None
+        for y in range(self.height):
+            chars, styles = self.chars[y], self.styles[y]
+            prev_chars, prev_styles = self.prev_chars[y], self.prev_styles[y]
+            if chars == prev_chars and styles == prev_styles:
+                continue
+            cursor_x = -1
+            for x in range(self.width):
+                ch = chars[x]
+                style = styles[x]
+                if not ch or (ch == prev_chars[x] and style == prev_styles[x]):
+                    continue
+                if x != cursor_x:
+                    parts.append(f"\033[{y + 1};{x + 1}H")
+                if style != cur_style:
+                    parts.append(RESET + style)
+                    cur_style = style
+                parts.append(ch)
+                cursor_x = x + (2 if x + 1 < self.width and chars[x + 1] == "" else 1)
+            prev_chars[:] = chars
+            prev_styles[:] = styles
+
+        if parts:
+            parts.append(RESET)
+            out.write("".join(parts))
+            out.flush()
+
+frame = None
+
 def clear_screen():
     sys.stdout.write("\033[2J\033[H")
 
 def move_cursor(y, x):
     sys.stdout.write(f"\033[{y};{x}H")
 
-def draw_box(title, y, x, height, width, color=WHITE):
+def draw_box(fb, title, y, x, height, width, color=WHITE):
     # Top border
-    move_cursor(y, x)
-    sys.stdout.write(color + "┌" + "─" * (width - 2) + "┐" + RESET)
-    
+    fb.put(y, x, "┌" + "─" * (width - 2) + "┐", color)
+
     # Title
     if title:
-        move_cursor(y, x + 2)
-        sys.stdout.write(color + BOLD + f" {title} " + RESET)
+        fb.put(y, x + 2, f" {title} ", color + BOLD)
 
     # Side borders
     for i in range(1, height - 1):
-        move_cursor(y + i, x)
-        sys.stdout.write(color + "│" + RESET)
-        move_cursor(y + i, x + width - 1)
-        sys.stdout.write(color + "│" + RESET)
-    
+        fb.put(y + i, x, "│", color)
+        fb.put(y + i, x + width - 1, "│", color)
+
     # Bottom border
-    move_cursor(y + height - 1, x)
-    sys.stdout.write(color + "└" + "─" * (width - 2) + "┘" + RESET)
+    fb.put(y + height - 1, x, "└" + "─" * (width - 2) + "┘", color)
 
 def get_system_stats():
     global cpu_usage, load_avg
@@ -92,104 +186,143 @@ def get_system_stats():
         cpu_usage = "N/A"
         load_avg = "N/A"
 
+def mark_dirty():
+    global state_version
+    state_version += 1
+
 def print_dashboard():
-    global current_rps, last_rps_time, last_request_count
-    with print_lock:
-        _print_dashboard_internal()
+    # Kept for callers that want a redraw: the render loop picks it up on its next frame
+    with state_lock:
+        mark_dirty()
 
-def _print_dashboard_internal():
+def snapshot_state():
     global current_rps, last_rps_time, last_request_count
+    with state_lock:
+        # Calculate Instant RPS
+        now = time.time()
+        dt = now - last_rps_time
+        if dt >= 0.5: # Update if enough time passed
+            current_rps = (total_requests - last_request_count) / dt
+            last_rps_time = now
+            last_request_count = total_requests
+        return {
+            "total": total_requests,
+            "success": success_requests,
+            "failed": failed_requests,
+            "rps": current_rps,
+            "counts": dict(counts),
+            "logs": recent_logs[-MAX_LOGS:],
+            "max_req": max_req_str,
+            "min_req": min_req_str,
+        }
+
+def get_frame_size():
     # Force default if not a tty or too small
     try:
         w, h = shutil.get_terminal_size((80, 24))
-        if w < 40 or h < 10: 
+        if w < 40 or h < 10:
              width, height = 80, 24
         else:
              width, height = w, h
     except:
         width, height = 80, 24
-    
+
     # Ensure minimum size
     if width < 60 or height < 20:
-         width, height = 80, 24 
+         width, height = 80, 24
+    return width, height
+
+def compose_frame(fb, state):
+    width, height = fb.width, fb.height
+    fb.clear()
 
-    # Hide cursor
-    sys.stdout.write("\033[?25l")
-    
     # Draw Main Border
-    draw_box("Load Balancer Dashboard", 1, 1, height, width, BLUE)
-    
+    draw_box(fb, "Load Balancer Dashboard", 1, 1, height, width, BLUE)
+
     # --- Stats Section ---
-    # Calculate Instant RPS
-    now = time.time()
-    dt = now - last_rps_time
-    if dt >= 0.5: # Update if enough time passed
-        current_rps = (total_requests - last_request_count) / dt
-        last_rps_time = now
-        last_request_count = total_requests
-
-    move_cursor(3, 4)
-    sys.stdout.write(f"{BOLD}Total Requests:{RESET} {total_requests}")
-    
-    move_cursor(3, 25)
-    sys.stdout.write(f"{GREEN}{BOLD}Success:{RESET} {success_requests}")
-    
-    move_cursor(3, 40)
-    sys.stdout.write(f"{RED}{BOLD}Failed:{RESET} {failed_requests}")
-    
-    move_cursor(3, 55)
-    sys.stdout.write(f"{YELLOW}{BOLD}RPS:{RESET} {current_rps:.1f}")
+    fb.put(3, 4, "Total Requests:", BOLD)
+    fb.put(3, 20, str(state["total"]))
+
+    fb.put(3, 25, "Success:", GREEN + BOLD)
+    fb.put(3, 34, str(state["success"]))
+
+    fb.put(3, 40, "Failed:", RED + BOLD)
+    fb.put(3, 48, str(state["failed"]))
+
+    fb.put(3, 55, "RPS:", YELLOW + BOLD)
+    fb.put(3, 60, f"{state['rps']:.1f}")
 
     # Separator
-    move_cursor(5, 2)
-    sys.stdout.write(BLUE + "─" * (width - 2) + RESET)
-    
+    fb.put(5, 2, "─" * (width - 2), BLUE)
+
     # --- System Stats Section ---
-    move_cursor(6, 4)
-    sys.stdout.write(f"{BOLD}System Load:{RESET} {load_avg}  {BOLD}CPU:{RESET} {cpu_usage}")
+    fb.put(6, 4, "System Load:", BOLD)
+    fb.put(6, 17, load_avg)
+    fb.put(6, 19 + len(load_avg), "CPU:", BOLD)
+    fb.put(6, 24 + len(load_avg), cpu_usage)
 
-    move_cursor(7, 4)
-    sys.stdout.write(f"{BOLD}Max Req:{RESET} {max_req_str}  {BOLD}Min Req:{RESET} {min_req_str}")
+    fb.put(7, 4, "Max Req:", BOLD)
+    fb.put(7, 13, state["max_req"])
+    fb.put(7, 15 + len(state["max_req"]), "Min Req:", BOLD)
+    fb.put(7, 24 + len(state["max_req"]), state["min_req"])
 
     # --- Backend Distribution ---
-    move_cursor(9, 4)
-    sys.stdout.write(f"{BOLD}Backend Distribution:{RESET}")
-    
+    fb.put(9, 4, "Backend Distribution:", BOLD)
+
     y_offset = 11
-    max_val = max(counts.values()) if counts.values() else 1
+    backend_counts = state["counts"]
+    max_val = max(backend_counts.values()) if backend_counts else 1
     # max bar width available
-    bar_width_area = width - 20 
-    
-    idx = 0
-    for port in sorted(counts.keys()):
-        count = counts[port]
+    bar_width_area = width - 20
+
+    log_start_y = height - MAX_LOGS - 2
+    for idx, port in enumerate(sorted(backend_counts.keys())):
+        # Leave room for the log section
+        if y_offset + idx >= log_start_y - 1:
+            break
+        count = backend_counts[port]
         color = BACKEND_COLORS[idx % len(BACKEND_COLORS)]
-        
+
         # Calculate bar length
         bar_len = int((count / max_val) * bar_width_area) if max_val > 0 else 0
-        bar_char = "█"
-        bar = color + (bar_char * bar_len) + RESET
-        
-        move_cursor(y_offset + idx, 4)
-        sys.stdout.write(f"Port {port}: {bar} {count}")
-        idx += 1
+        label = f"Port {port}: "
+        fb.put(y_offset + idx, 4, label)
+        fb.put(y_offset + idx, 4 + len(label), "█" * bar_len, color)
+        fb.put(y_offset + idx, 5 + len(label) + bar_len, str(count))
 
     # Separator
-    log_start_y = height - MAX_LOGS - 2
-    move_cursor(log_start_y - 1, 2)
-    sys.stdout.write(BLUE + "─" * (width - 2) + RESET)
+    fb.put(log_start_y - 1, 2, "─" * (width - 2), BLUE)
 
     # --- Recent Logs ---
-    move_cursor(log_start_y, 4)
-    sys.stdout.write(f"{BOLD}Recent Activity:{RESET}")
-    
-    for i, log in enumerate(recent_logs[-MAX_LOGS:]):
-        move_cursor(log_start_y + 1 + i, 4)
+    fb.put(log_start_y, 4, "Recent Activity:", BOLD)
+
+    for i, (style, log) in enumerate(state["logs"]):
         # Truncate log to fit
         display_log = (log[:width-6] + '..') if len(log) > width-6 else log
-        sys.stdout.write(DIM + display_log + RESET)
-        
-    sys.stdout.flush()
+        fb.put(log_start_y + 1 + i, 4, display_log, DIM + style)
+
+def render_loop():
+    global frame
+    rendered_version = -1
+    last_draw = 0.0
+    while True:
+        time.sleep(1.0 / MAX_FPS)
+        now = time.time()
+        # Redraw on change, and at least every 0.5s so the RPS figure decays
+        if state_version == rendered_version and now - last_draw < 0.5:
+            continue
+        rendered_version = state_version
+        last_draw = now
+
+        state = snapshot_state()
+        width, height = get_frame_size()
+        if frame is None or frame.width != width or frame.height != height:
+            clear_screen()
+            # Hide cursor
+            sys.stdout.write("\033[?25l")
+            frame = FrameBuffer(width, height)
+        compose_frame(frame, state)
+        frame.flush(sys.stdout)
 
 def update_counts(port):
     if port not in counts:
@@ -199,23 +332,28 @@ def update_counts(port):
     success_requests += 1
     total_requests += 1
 
-def add_log(msg):
-    recent_logs.append(msg)
+def add_log(msg, style=""):
+    recent_logs.append((style, msg))
     if len(recent_logs) > MAX_LOGS:
         recent_logs.pop(0)
 
 def reset_stats():
     global counts, total_requests, success_requests, failed_requests, start_time, last_request_count, max_req_str, min_req_str
-    counts = {}
-    total_requests = 0
-    success_requests = 0
-    failed_requests = 0
-    start_time = time.time()
-    last_request_count = 0
-    max_req_str = "N/A"
-    min_req_str = "N/A"
-    add_log(f"{YELLOW}--- Stats Cleared ---{RESET}")
-    print_dashboard()
+    with state_lock:
+        counts = {}
+        total_requests = 0
+        success_requests = 0
+        failed_requests = 0
+        start_time = time.time()
+        last_request_count = 0
+        max_req_str = "N/A"
+        min_req_str = "N/A"
+        snap = feed.last_snapshot
+        if snap:
+            feed_baseline.update(total=snap["total"], success=snap["success"], failed=snap["failed"],
+                                 backends=dict(feed.backend_counts))
+        add_log("--- Stats Cleared ---", YELLOW)
+        mark_dirty()
 
 def remote_listener():
     udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -224,7 +362,9 @@ def remote_listener():
     try:
         udp.bind(("localhost", 9999))
     except OSError:
-        add_log(f"{RED}Remote Reset Disabled (Port 9999 in use){RESET}")
+        with state_lock:
+            add_log("Remote Reset Disabled (Port 9999 in use)", RED)
+            mark_dirty()
         return
 
     while True:
@@ -241,7 +381,146 @@ def stats_updater():
         print_dashboard()
         time.sleep(2)
 
+# --- Ingestion ---
+# One pass over each chunk classifies every line we care about; the group
+# that matched says which case it is.
+LOG_PATTERN = re.compile(
+    rb"Forwarding request to localhost:(?P<fwd>\d+)"
+    rb"|(?P<nobackend>No backend servers available)"
+    rb"|(?P<fwderr>Error forwarding to backend)"
+    rb"|status changed to:\s*(?P<status>\S+)"
+    rb"|Max Requests: Port (?P<maxp>\d+) \((?P<maxv>\d+)\) \| Min Requests: Port (?P<minp>\d+) \((?P<minv>\d+)\)"
+)
+READ_CHUNK = 1 << 16
+
+def ingest_chunk(data):
+    global total_requests, success_requests, failed_requests, max_req_str, min_req_str
+    if feed.active:
+        # The metrics feed already carries everything these lines would tell us
+        return
+    forwarded = {}
+    no_backend = 0
+    fwd_errors = 0
+    logs = []
+    stats = None
+    for m in LOG_PATTERN.finditer(data):
+        # Case 1: "Forwarding request to localhost:8081"
+        port = m.group("fwd")
+        if port is not None:
+            forwarded[port] = forwarded.get(port, 0) + 1
+            logs.append((port, ""))
+            continue
+        # Case 2: "No backend servers available"
+        if m.group("nobackend") is not None:
+            no_backend += 1
+            logs.append(("No Backends!", RED))
+            continue
+        # Case 3: Connection Error "Error forwarding to backend"
+        if m.group("fwderr") is not None:
+            fwd_errors += 1
+            logs.append(("Backend Fail!", RED))
+            continue
+        # Case 4: Health Status Change
+        # Log: ⚠️  Server localhost:8081 status changed to: UNHEALTHY
+        status = m.group("status")
+        if status is not None:
+            if b"UNHEALTHY" in status:
+                logs.append(("Server DOWN!", RED + BOLD))
+            else:
+                logs.append(("Server UP!", GREEN + BOLD))
+            continue
+        # Case 5: Stats Parsing
+        # 📊 Stats - Max Requests: Port 8081 (150) | Min Requests: Port 8083 (142)
+        stats = m
+
+    if not (logs or stats):
+        return
+
+    with state_lock:
+        sent = 0
+        for port, n in forwarded.items():
+            port = port.decode()
+            counts[port] = counts.get(port, 0) + n
+            sent += n
+        success_requests += sent - fwd_errors
+        failed_requests += no_backend + fwd_errors
+        total_requests += sent + no_backend
+        # Only the tail can ever be shown
+        for msg, style in logs[-MAX_LOGS:]:
+            if not style:
+                msg = f" -> Sent to {msg.decode()}"
+            add_log(msg, style)
+        if stats is not None:
+            max_req_str = f"Port {stats.group('maxp').decode()} ({stats.group('maxv').decode()})"
+            min_req_str = f"Port {stats.group('minp').decode()} ({stats.group('minv').decode()})"
+        mark_dirty()
+
+def on_feed_message(msg):
+    global total_requests, success_requests, failed_requests, max_req_str, min_req_str
+    with state_lock:
+        if msg["type"] == "event":
+            line = describe_event(msg)
+            if line is None:
+                return
+            style = RED if "❌" in line else YELLOW
+            if msg["event"] == "health":
+                style = (GREEN if msg.get("healthy") else RED) + BOLD
+            add_log(line, style)
+            mark_dirty()
+            return
+
+        base = feed_baseline
+        if msg["total"] < base["total"]:
+            # Balancer restarted: its counters began again from zero
+            base.update(total=0, success=0, failed=0, backends={})
+        total_requests = msg["total"] - base["total"]
+        success_requests = msg["success"] - base["success"]
+        failed_requests = msg["failed"] - base["failed"]
+        counts.clear()
+        for b in msg["backends"]:
+            port = str(b["port"])
+            counts[port] = max(0, b["requests"] - base["backends"].get(port, 0))
+        if counts:
+            busiest = max(counts, key=counts.get)
+            idlest = min(counts, key=counts.get)
+            max_req_str = f"Port {busiest} ({counts[busiest]})"
+            min_req_str = f"Port {idlest} ({counts[idlest]})"
+        for port, n in sorted(msg["deltas"].items())[-MAX_LOGS:]:
+            add_log(f" -> Sent to {port} (+{n})")
+        mark_dirty()
+
+def ingest(stream):
+    # Reads whatever is available (up to READ_CHUNK) and parses all complete
+    # lines in it at once; a partial last line waits for the next read, up to
+    # READ_CHUNK of it (past that it is junk or an unbroken trace: parse it as is).
+    read = getattr(stream, "read1", stream.read)
+    pending = [] # Chunks of the partial last line, joined once it completes
+    pending_size = 0
+    while True:
+        data = read(READ_CHUNK)
+        if not data:
+            break
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            pending.append(data)
+            pending_size += len(data)
+            if pending_size > READ_CHUNK:
+                ingest_chunk(b"".join(pending))
+                pending = []
+                pending_size = 0
+            continue
+        pending.append(data[:cut + 1])
+        ingest_chunk(b"".join(pending))
+        pending = [data[cut + 1:]]
+        pending_size = len(pending[0])
+    if pending_size:
+        ingest_chunk(b"".join(pending))
+
 # --- Main Loop ---
+# Structured counters from the balancer; stdin is only parsed while the feed is down
+feed = MetricsFeed(on_message=on_feed_message)
+feed.start()
+
 # Start Listener
 listener = threading.Thread(target=remote_listener, daemon=True)
 listener.start()
@@ -250,75 +529,16 @@ listener.start()
 stats_thread = threading.Thread(target=stats_updater, daemon=True)
 stats_thread.start()
 
-clear_screen()
-print_dashboard()
+# Start Renderer (fixed FPS, independent of ingestion)
+render_thread = threading.Thread(target=render_loop, daemon=True)
+render_thread.start()
 
 try:
-    for line in sys.stdin:
-        line = line.strip()
-        if not line: continue
-        
-        # Parse Logs
-        # Case 1: "Forwarding request to localhost:8081"
-        match_fwd = re.search(r"Forwarding request to localhost:(\d+)", line)
-        if match_fwd:
-            port = match_fwd.group(1)
-            update_counts(port)
-            add_log(f" -> Sent to {port}")
-            print_dashboard()
-            continue
-            
-        # Case 2: "Accepted connection from /127.0.0.1:56224"
-        if "Accepted connection" in line:
-            pass
+    ingest(sys.stdin.buffer)
 
-        # Case 3: "No backend servers available"
-        if "No backend servers available" in line:
-            failed_requests += 1
-            total_requests += 1
-            add_log(f"{RED}No Backends!{RESET}")
-            print_dashboard()
-            continue
-        
-        # Case 4: Connection Error "Error forwarding to backend"
-        if "Error forwarding to backend" in line:
-            failed_requests += 1
-            success_requests -= 1 
-            
-            add_log(f"{RED}Backend Fail!{RESET}")
-            print_dashboard()
-            continue
-            
-        # Case 5: Health Status Change
-        # Log: ⚠️  Server localhost:8081 status changed to: UNHEALTHY
-        if "status changed to:" in line:
-            parts = line.split("status changed to:")
-            status = parts[1].strip()
-            # Extract server just before "status"
-            # format: ... Server localhost:8081 ...
-            srv_part = parts[0]
-            # Simple parsing:
-            if "UNHEALTHY" in status:
-                add_log(f"{RED}{BOLD}Server DOWN!{RESET}")
-            else:
-                add_log(f"{GREEN}{BOLD}Server UP!{RESET}")
-            print_dashboard()
-            continue
-            
-        # Case 6: Stats Parsing
-        # 📊 Stats - Max Requests: Port 8081 (150) | Min Requests: Port 8083 (142)
-        if "📊 Stats" in line:
-            match_stats = re.search(r"Max Requests: Port (\d+) \((\d+)\) \| Min Requests: Port (\d+) \((\d+)\)", line)
-            if match_stats:
-                max_port = match_stats.group(1)
-                max_val = match_stats.group(2)
-                min_port = match_stats.group(3)
-                min_val = match_stats.group(4)
-                
-                max_req_str = f"Port {max_port} ({max_val})"
-                min_req_str = f"Port {min_port} ({min_val})"
-                print_dashboard()
-            continue
+    # Input ended (e.g. the balancer exited); keep the last frame on screen
+    while True:
+        time.sleep(1)
 
 except KeyboardInterrupt:
     # Cleanup
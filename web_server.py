@@ -1,11 +1,22 @@
-import http.server
-import socketserver
+import asyncio
 import json
+import mimetypes
 import os
+import posixpath
 import subprocess
 import socket
-import re
+from urllib.parse import parse_qs, unquote
+from api import _scanner as scanner
+from async_http import AsyncHTTPServer
 from load_generator import LoadGenerator
+from load_profiles import LoadProfile
+from load_test_jobs import JobRegistry
+from log_follower import LogFollower
+from metrics_feed import MetricsFeed
+from metrics_store import MetricsStore
+from static_assets import StaticAssetCache, etag_matches
+from stats_history import StatsHistory, parse_window
+from stats_stream import StatsBroadcaster
 
 import time
 
@@ -13,9 +24,75 @@ import time
 PORT = int(os.environ.get("PORT", 8000))
 SERVICE_PORT = 9081 # Not used directly but good to track
 
-# Global state for RPS calculation
-last_check_time = time.time()
-last_total_requests = 0
+# Structured counters straight from the balancer; lb.log is only parsed when the feed is down.
+# Started in main(), so importing this module (as spawned load test shards do) starts no threads
+metrics_feed = MetricsFeed()
+# Incremental lb.log parser shared by the loop's executor and the stream publisher
+log_follower = LogFollower("lb.log")
+
+def current_stats():
+    """Balancer counters from the metrics feed, or from lb.log. None if neither is available."""
+    if metrics_feed.active:
+        return metrics_feed.snapshot()
+    if not log_follower.poll():
+        return None
+    return log_follower.snapshot()
+
+# Per-second buckets (with minute and hour rollups) that RPS and /stats/history are read from
+stats_history = StatsHistory()
+# Seconds between history samples; well under a bucket so a late sample barely shifts traffic
+HISTORY_SAMPLE_INTERVAL = 0.25
+
+# Durable per-second counts per backend (see metrics_store.py); lb.log is not the record any more
+metrics_store = MetricsStore(os.environ.get("METRICS_DIR", "metrics"))
+# Seconds between compaction passes over the on-disk store
+METRICS_COMPACT_INTERVAL = 3600
+
+async def sample_history():
+    while True:
+        try:
+            current = await run_blocking(current_stats)
+            if current is not None:
+                stats_history.record(current)
+                await run_blocking(metrics_store.record, current)
+        except Exception as e:
+            print(f"Error sampling stats history: {e}")
+        await asyncio.sleep(HISTORY_SAMPLE_INTERVAL)
+
+async def compact_metrics():
+    while True:
+        try:
+            removed = await run_blocking(metrics_store.compact)
+            if removed:
+                print(f"Compacted metrics store: {removed} segment(s) folded or retired")
+        except Exception as e:
+            print(f"Error compacting metrics store: {e}")
+        await asyncio.sleep(METRICS_COMPACT_INTERVAL)
+
+# Max pushes per second on /stats/stream (changes in between are coalesced)
+STATS_STREAM_MAX_RATE = float(os.environ.get("STATS_STREAM_MAX_RATE", 10))
+
+def stream_snapshot():
+    stats = current_stats() or {
+        "total_requests": 0, "success_requests": 0, "failed_requests": 0,
+        "backend_counts": {}, "recent_logs": [],
+    }
+    stats["rps"] = stats_history.rps()
+    stats["server_time"] = time.strftime("%H:%M:%S")
+    return stats
+
+stats_broadcaster = StatsBroadcaster(stream_snapshot, max_rate=STATS_STREAM_MAX_RATE)
+
+# Background /run-test jobs
+test_jobs = JobRegistry()
+
+# Dashboard files kept in memory with precompressed variants
+static_assets = StaticAssetCache()
+
+CORS_HEADERS = [
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Private-Network', 'true'),
+]
 
 def send_reset_signal():
     try:
@@ -24,318 +101,346 @@ def send_reset_signal():
     except:
         pass
 
-class LoadTestHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        # Serve index.html by default
-        if self.path == "/":
-            self.path = "index.html"
-            send_reset_signal()
-        
-        if self.path.startswith("/stats"):
-            stats = self.get_stats()
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*') 
-            self.send_header('Access-Control-Allow-Private-Network', 'true')
-            self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0')
-            self.end_headers()
-            self.wfile.write(json.dumps(stats).encode())
+async def run_blocking(fn, *args):
+    """Runs disk, subprocess or CPU-bound work off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+async def send_json(request, code, payload):
+    await request.respond(code, [('Content-type', 'application/json')] + CORS_HEADERS, json.dumps(payload).encode())
+
+async def start_event_stream(request, content_type='text/event-stream'):
+    await request.start_stream(200, [('Content-Type', content_type), ('Cache-Control', 'no-store')] + CORS_HEADERS)
+
+
+async def handle(request):
+    if request.method in ("GET", "HEAD"):
+        await do_GET(request)
+    elif request.method == "POST":
+        await do_POST(request)
+    elif request.method == "OPTIONS":
+        await request.respond(200, CORS_HEADERS + [
+            ('Access-Control-Allow-Methods', 'GET, POST, OPTIONS'),
+            ('Access-Control-Allow-Headers', 'Content-Type'),
+        ])
+    else:
+        await request.respond(501, [('Content-Type', 'text/plain')], b"Unsupported method")
+
+
+async def do_GET(request):
+    path = request.path
+    # Serve index.html by default
+    if path == "/":
+        path = "/index.html"
+        send_reset_signal()
+
+    if path.startswith("/run-test/"):
+        parts = path.strip("/").split("/")
+        job = test_jobs.get(parts[1]) if len(parts) >= 2 else None
+        if job is None:
+            await send_json(request, 404, {"error": "Unknown job"})
             return
+        if len(parts) == 3 and parts[2] == "stream":
+            await start_event_stream(request)
+            try:
+                await job.stream_async(request.write)
+            except ConnectionError:
+                pass # Client went away
+            return
+        await send_json(request, 200, job.to_dict())
+        return
 
-        return http.server.SimpleHTTPRequestHandler.do_GET(self)
-
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Private-Network', 'true')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-
-    def get_stats(self):
-        # Default stats
-        stats = {
-            "total_requests": 0,
-            "success_requests": 0,
-            "failed_requests": 0,
-            "rps": 0.0,
-            "backend_counts": {}
-        }
-        
-        log_file = "lb.log"
-        if not os.path.exists(log_file):
-            print(f"Debug: {log_file} not found")
-            return stats
+    if path.startswith("/stats/stream"):
+        await start_event_stream(request)
+        try:
+            await request.write(b"retry: 2000\n\n")
+            await stats_broadcaster.subscribe_async(request.write)
+        except ConnectionError:
+            pass # Client went away
+        return
 
+    if path.startswith("/stats/history"):
         try:
-            # Read last 1000 lines or sufficient amount to get current state
-            # For simplicity, we can read the whole file if small, or use tail logic. 
-            # Since this is a demo, let's just read the file.
-            with open(log_file, 'r') as f:
-                lines = f.readlines()
-            
-            # print(f"Debug: Read {len(lines)} lines from log")
-            
-            # Simple parsing similar to visualizer.py
-            total = 0
-            success = 0
-            failed = 0
-            counts = {}
-            recent_logs = []
-            
-            # Global RPS state
-            global last_check_time, last_total_requests
-            
-            # We can re-parse everything or just grep for "Stats" lines if valid.
-            # But the terminal visualizer parses stream.
-            # Let's do a quick pass.
-            
-            for line in lines:
-                if "Forwarding request to localhost:" in line:
-                    match = re.search(r"Forwarding request to localhost:(\d+)", line)
-                    if match:
-                        port = match.group(1)
-                        counts[port] = counts.get(port, 0) + 1
-                        total += 1
-                        success += 1
-                elif "No backend servers available" in line or "Error forwarding" in line:
-                    failed += 1
-                    total += 1
-                    recent_logs.append("❌ " + line.strip())
-                elif "Forwarding request" in line:
-                    # Optional: Add forwarding logs too, maybe just the last few
-                    # recent_logs.append("➡️ " + line.strip())
-                    pass
-
-            # Capture last 10 "Forwarding" or important lines for the visualizer
-            # Re-iterate or just capture during the first pass?
-            # Let's just grab the last 10 meaningful lines from the file end.
-            
-            meaningful_logs = []
-            for line in reversed(lines):
-                line = line.strip()
-                if not line: continue
-                if "Forwarding request" in line:
-                    meaningful_logs.append("➡️ " + line)
-                elif "status changed" in line:
-                    meaningful_logs.append("⚠️ " + line)
-                elif "No backend" in line:
-                    meaningful_logs.append("❌ NO BACKENDS AVAILABLE")
-                
-                if len(meaningful_logs) >= 10:
-                    break
-            
-            recent_logs = meaningful_logs # They are in reverse order
-            # Reverse back to normal chronological order
-            # But normally visualizer shows newest at bottom? Or top?
-            # Let's send them chronological
-            # recent_logs.reverse() -> No, let's keep newest at top for web or bottom?
-            # Let's send newest first (index 0) for easy display at top? 
-            # Or newest last? Terminal scrolls down. Web console usually new at bottom.
-            # So let's reverse them to be chronological [Oldest ... Newest]
-            recent_logs.reverse()
-            
-            # Calculate RPS
-            current_time = time.time()
-            time_diff = current_time - last_check_time
-            
-            # Only calculate if enough time has passed (e.g., > 0.5s) and we have new data
-            # OR if this is the first real check after some time.
-            # But the frontend polls every 1s.
-            
-            if time_diff > 0:
-                # Delta requests
-                delta_reqs = total - last_total_requests
-                # Only update RPS if delta is non-negative (log rotation/reset might cause negative)
-                if delta_reqs >= 0:
-                    stats["rps"] = delta_reqs / time_diff
-                else:
-                    stats["rps"] = 0.0
-            
-            # Update state for next call
-            last_check_time = current_time
-            last_total_requests = total
-            
-            stats["total_requests"] = total
-            stats["success_requests"] = success
-            stats["failed_requests"] = failed
-            stats["backend_counts"] = counts
-            stats["recent_logs"] = recent_logs
-            stats["server_time"] = time.strftime("%H:%M:%S")
-            
-            # print(f"Debug: Stats parsed: {stats}")
-            
-        except Exception as e:
-            print(f"Error parsing log: {e}")
-            
+            window = parse_window(parse_qs(request.query).get("window", [""])[0])
+        except ValueError as e:
+            await send_json(request, 400, {"error": str(e)})
+            return
+        await request.respond(200, [
+            ('Content-Type', 'application/json'),
+            ('Cache-Control', 'no-store'),
+        ] + CORS_HEADERS, json.dumps(stats_history.query(window)).encode())
+        return
+
+    if path == "/metrics/query":
+        params = parse_qs(request.query)
+        try:
+            now = time.time()
+            start = parse_time(params.get("from", ["1h"])[0], now)
+            end = parse_time(params.get("to", [""])[0], now)
+            step = int(params["step"][0]) if "step" in params else None
+            backends = ",".join(params.get("backend", [])).split(",") if "backend" in params else None
+            result = await run_blocking(metrics_store.query, start, end, step, backends)
+        except ValueError as e:
+            await send_json(request, 400, {"error": str(e)})
+            return
+        await send_json(request, 200, result)
+        return
+
+    if path.startswith("/stats"):
+        stats = await get_stats()
+        await request.respond(200, [
+            ('Content-Type', 'application/json'),
+            ('Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0'),
+        ] + CORS_HEADERS, json.dumps(stats).encode())
+        return
+
+    # May stat and recompress a changed file, so keep it off the loop
+    asset = await run_blocking(static_assets.get, path)
+    if asset is not None:
+        await send_asset(request, asset)
+        return
+
+    await send_file(request, path)
+
+
+def parse_time(value, now):
+    """Epoch seconds, or a window back from now ("90s", "6h", "7d"); empty means now."""
+    if not value:
+        return now
+    if value.isdigit() and len(value) >= 9:
+        return int(value)
+    return now - parse_window(value)
+
+
+async def send_asset(request, asset):
+    encoding = asset.encoding_for(request.headers.get('accept-encoding'))
+    etag = asset.etags[encoding]
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        await request.respond(304, [('ETag', etag), ('Cache-Control', 'no-cache'), ('Vary', 'Accept-Encoding')])
+        return
+    headers = [('Content-Type', asset.content_type)]
+    if encoding != "identity":
+        headers.append(('Content-Encoding', encoding))
+    headers += [
+        ('ETag', etag),
+        ('Last-Modified', asset.last_modified),
+        # Revalidate every load; an unchanged dashboard costs a 304
+        ('Cache-Control', 'no-cache'),
+        ('Vary', 'Accept-Encoding'),
+    ]
+    await request.respond(200, headers, asset.variants[encoding])
+
+
+async def send_file(request, path):
+    # Any other file under the working directory, as SimpleHTTPRequestHandler served it
+    parts = [p for p in posixpath.normpath(unquote(path)).split("/") if p and p not in (".", "..")]
+    file_path = os.path.join(os.getcwd(), *parts)
+    if not parts or not os.path.isfile(file_path):
+        await request.respond(404, [('Content-Type', 'text/plain')], b"File not found")
+        return
+    body = await run_blocking(read_file, file_path)
+    content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+    await request.respond(200, [('Content-Type', content_type)], body)
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def get_stats():
+    # Default stats
+    stats = {
+        "total_requests": 0,
+        "success_requests": 0,
+        "failed_requests": 0,
+        "rps": 0.0,
+        "backend_counts": {}
+    }
+
+    # Reading lb.log is disk I/O: keep it off the loop
+    current = await run_blocking(current_stats)
+    if current is None:
+        print(f"Debug: no metrics feed and {log_follower.path} not found")
         return stats
 
-    def do_POST(self):
-        if self.path == "/run-test":
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            try:
-                data = json.loads(post_data)
-                url = data.get("url", "http://localhost:8080")
-                requests = int(data.get("requests", 100))
-                concurrency = int(data.get("concurrency", 10))
-
-                # Safety: Cap concurrency to avoid "can't start new thread" errors
-                MAX_CONCURRENCY = 200
-                if concurrency > MAX_CONCURRENCY:
-                    print(f"⚠️ Capping concurrency from {concurrency} to {MAX_CONCURRENCY}")
-                    concurrency = MAX_CONCURRENCY
-
-                print(f"Triggering Load Test: {requests} to {url} with {concurrency} threads")
-                
-                # Run the load generator
-                generator = LoadGenerator(url, requests, concurrency)
-                result = generator.run()
-                
-                # Respond
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Access-Control-Allow-Private-Network', 'true')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode())
-                
-            except Exception as e:
-                self.send_response(500)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Access-Control-Allow-Private-Network', 'true')
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": str(e)}).encode())
-        elif self.path == "/scan-ports":
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            try:
-                data = json.loads(post_data)
-                host_url = data.get("host", "google.com")
-                
-                # Run the Java port scanner
-                # FIX: Use 'bin' directory where classes are compiled
-                cmd = ["java", "-cp", "bin", "com.loadbalancer.PortScanner", host_url]
-                process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                stdout, stderr = process.communicate()
-                
-                if process.returncode != 0:
-                    raise Exception(f"Scanner failed: {stderr}")
-                    
-                # The visualizer expects JSON or text. Let's return the raw output for now or parse it.
-                # The Java tool prints lines like "✅ Port 80 is OPEN"
-                # We can just return the raw text to be displayed.
-                
-                response_data = {
-                    "output": stdout
-                }
-
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Access-Control-Allow-Private-Network', 'true')
-                self.end_headers()
-                self.wfile.write(json.dumps(response_data).encode())
+    # Counters are kept by the feed / follower; nothing is re-parsed here
+    stats.update(current)
+    # From the last complete one-second bucket, however often (and by how many clients) this is polled
+    stats["rps"] = stats_history.rps()
+    stats["server_time"] = time.strftime("%H:%M:%S")
 
-            except Exception as e:
-                self.send_response(500)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Access-Control-Allow-Private-Network', 'true')
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": str(e)}).encode())
-
-        elif self.path == "/upload-strategy":
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            try:
-                data = json.loads(post_data)
-                java_code = data.get("code")
-                if not java_code:
-                    raise Exception("No 'code' field in payload")
-                
-                # 1. Save File
-                src_path = "src/main/java/com/loadbalancer/CustomStrategy.java"
-                with open(src_path, "w") as f:
-                    f.write(java_code)
-                    
-                # 2. Recompile
-                # Link against 'bin' because that's where LoadBalancingStrategy.class is
-                print("Compiling CustomStrategy...")
-                result = subprocess.run(["javac", "-d", "bin", src_path, "-cp", "bin"], capture_output=True, text=True)
-                if result.returncode != 0:
-                     print(f"❌ Compilation Failed: {result.stderr}")
-                     raise Exception("Compilation Failed:\n" + result.stderr)
-                
-                print("✅ Compilation Successful. Checking for restart_lb.sh...")
-                
-                # Check script existence
-                if not os.path.exists("restart_lb.sh"):
-                    print("❌ Error: restart_lb.sh not found!")
-                    raise Exception("restart_lb.sh missing on server")
-
-                # 3. Restart Load Balancer (Detached)
-                print("🚀 Triggering restart_lb.sh...")
-                # Use setsid to detach properly
-                subprocess.Popen(["bash", "restart_lb.sh"], start_new_session=True)
-                print("✅ Restart Signal Sent.")
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Access-Control-Allow-Private-Network', 'true')
-                self.end_headers()
-                self.wfile.write(json.dumps({"status": "Strategy Uploaded & Compiling. Restarting Service..."}).encode())
+    return stats
 
-            except Exception as e:
-                with open("debug_upload.log", "a") as f:
-                    f.write(f"Error: {e}\n")
-                self.send_response(500)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Access-Control-Allow-Private-Network', 'true')
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": str(e)}).encode())
-
-        elif self.path == "/network-ip":
+
+async def do_POST(request):
+    path = request.path
+    if path == "/run-test":
+        try:
+            data = request.json()
+            url = data.get("url", "http://localhost:8080")
+            requests = int(data.get("requests", 100))
+            concurrency = int(data.get("concurrency", 10))
+            # asyncio engine by default: no OS thread per in-flight request
+            engine = data.get("engine", "async")
+
+            # Safety: Cap concurrency to avoid "can't start new thread" errors
+            # (thread engine) or running out of file descriptors (async engine)
+            MAX_CONCURRENCY = 200 if engine == "thread" else 20000
+            if concurrency > MAX_CONCURRENCY:
+                print(f"⚠️ Capping concurrency from {concurrency} to {MAX_CONCURRENCY}")
+                concurrency = MAX_CONCURRENCY
+
+            print(f"Triggering Load Test: {requests} to {url} with {concurrency} concurrent ({engine} engine)")
+
+            # Open-loop arrival-rate profile (constant/ramp/step/spike); "closed" keeps the request budget
+            profile = None
+            profile_name = data.get("profile", "closed")
+            if profile_name != "closed":
+                profile = LoadProfile(
+                    profile_name,
+                    float(data.get("rate", 100)),
+                    float(data.get("duration", 10)),
+                    start_rate=float(data.get("start_rate", 0)),
+                    steps=int(data.get("steps", 5)),
+                    peak_rate=data.get("peak_rate"),
+                )
+
+            # Run the load generator
+            keep_alive = bool(data.get("keep_alive", False))
+            # Shard across worker processes (one core each), at most one per CPU
+            processes = max(1, min(int(data.get("processes", 1)), os.cpu_count() or 1))
+            generator = LoadGenerator(url, requests, concurrency, engine=engine, profile=profile,
+                                      keep_alive=keep_alive, processes=processes)
+
+            # Run in the background; progress is streamed from /run-test/<id>/stream
+            description = {
+                "url": url,
+                "requests": requests,
+                "concurrency": concurrency,
+                "engine": engine,
+                "keep_alive": keep_alive,
+                "processes": processes,
+                "profile": profile.describe() if profile else None,
+            }
+            job = test_jobs.submit(generator, description)
+
+            # Respond
+            await send_json(request, 202, {
+                "job_id": job.id,
+                "status": job.status,
+                "stream": f"/run-test/{job.id}/stream",
+                "cancel": f"/run-test/{job.id}/cancel",
+            })
+
+        except Exception as e:
+            await send_json(request, 500, {"error": str(e)})
+    elif path.startswith("/run-test/") and path.endswith("/cancel"):
+        job = test_jobs.get(path.split("/")[2])
+        if job is None:
+            await send_json(request, 404, {"error": "Unknown job"})
+            return
+        job.cancel()
+        await send_json(request, 200, {"job_id": job.id, "status": "cancelling" if not job.finished else job.status})
+    elif path == "/scan-ports":
+        try:
+            data = request.json()
+            data.setdefault("host", "google.com")
+            hosts, ports, options = scanner.parse_request(data)
+        except Exception as e:
+            await send_json(request, 400, {"error": str(e)})
+            return
+
+        # Connects are I/O: the scan runs on the server's own loop
+        if not data.get("stream"):
             try:
-                # Find local IP
-                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                # Doesn't actually connect, just determines route
-                s.connect(("8.8.8.8", 80))
-                local_ip = s.getsockname()[0]
-                s.close()
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Access-Control-Allow-Private-Network', 'true')
-                self.end_headers()
-                self.wfile.write(json.dumps({"ip": local_ip}).encode())
+                await send_json(request, 200, await scanner.run_scan_async(hosts, ports, **options))
             except Exception as e:
-                self.send_response(500)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Access-Control-Allow-Private-Network', 'true')
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": str(e), "ip": "127.0.0.1"}).encode())
+                await send_json(request, 500, {"error": str(e)})
+            return
+
+        # Stream results as JSON lines as ports resolve
+        await start_event_stream(request, 'application/x-ndjson')
+        try:
+            await scanner.stream_scan_async(hosts, ports, request.write, **options)
+        except ConnectionError:
+            pass # Client went away; the scan was cancelled
+        except Exception as e:
+            await request.write(json.dumps({"type": "error", "error": str(e)}).encode() + b"\n")
 
-        else:
-            self.send_error(404)
+    elif path == "/upload-strategy":
+        try:
+            data = request.json()
+            java_code = data.get("code")
+            if not java_code:
+                raise Exception("No 'code' field in payload")
 
-print(f"🌍 Web Interface running at http://localhost:{PORT}")
-print(f"Open your browser to start valid testing!")
+            # Writing, compiling and restarting all block: one executor call
+            await run_blocking(install_strategy, java_code)
 
-class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-    allow_reuse_address = True
-    daemon_threads = True
+            await send_json(request, 200, {"status": "Strategy Uploaded & Compiling. Restarting Service..."})
 
-print(f"🌍 Web Interface running at http://localhost:{PORT}")
-print(f"Open your browser to start valid testing!")
+        except Exception as e:
+            with open("debug_upload.log", "a") as f:
+                f.write(f"Error: {e}\n")
+            await send_json(request, 500, {"error": str(e)})
+
+    elif path == "/network-ip":
+        try:
+            # Find local IP
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            # Doesn't actually connect, just determines route
+            s.connect(("8.8.8.8", 80))
+            local_ip = s.getsockname()[0]
+            s.close()
+
+            await send_json(request, 200, {"ip": local_ip})
+        except Exception as e:
+            await send_json(request, 500, {"error": str(e), "ip": "127.0.0.1"})
+
+    else:
+        await request.respond(404, [('Content-Type', 'text/plain')], b"Not found")
+
+
+def install_strategy(java_code):
+    # 1. Save File
+    src_path = "src/main/java/com/loadbalancer/CustomStrategy.java"
+    with open(src_path, "w") as f:
+        f.write(java_code)
+
+    # 2. Recompile
+    # Link against 'bin' because that's where LoadBalancingStrategy.class is
+    print("Compiling CustomStrategy...")
+    result = subprocess.run(["javac", "-d", "bin", src_path, "-cp", "bin"], capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"❌ Compilation Failed: {result.stderr}")
+        raise Exception("Compilation Failed:\n" + result.stderr)
+
+    print("✅ Compilation Successful. Checking for restart_lb.sh...")
+
+    # Check script existence
+    if not os.path.exists("restart_lb.sh"):
+        print("❌ Error: restart_lb.sh not found!")
+        raise Exception("restart_lb.sh missing on server")
+
+    # 3. Restart Load Balancer (Detached)
+    print("🚀 Triggering restart_lb.sh...")
+    # Use setsid to detach properly
+    subprocess.Popen(["bash", "restart_lb.sh"], start_new_session=True)
+    print("✅ Restart Signal Sent.")
+
+
+async def main():
+    metrics_feed.start()
+    background = [asyncio.create_task(sample_history()), asyncio.create_task(compact_metrics())]
+    # One event loop serves every connection; idle dashboards and open streams hold no thread
+    try:
+        await AsyncHTTPServer(handle, "", PORT).serve_forever()
+    finally:
+        for task in background:
+            task.cancel()
+        metrics_store.close()
 
-with ThreadedTCPServer(("", PORT), LoadTestHandler) as httpd:
-    httpd.serve_forever()
+if __name__ == "__main__":
+    print(f"🌍 Web Interface running at http://localhost:{PORT}")
+    print(f"Open your browser to start valid testing!")
+    asyncio.run(main())